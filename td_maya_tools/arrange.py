@@ -0,0 +1,296 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Lays stacks out on the ground plane.
+
+:description:
+    This module works out where stacks go in x and z from their footprints, the x and z
+    extents of their bounding boxes while they are at the origin. There are four modes:
+
+        line     Every stack along +x, the way offset_objs_in_x always has.
+        grid     Rows of equal cells, wrapping after a number of columns.
+        shelf    Stacks sorted by depth and packed left to right into shelves.
+        scatter  Random places inside a region, with no two stacks closer than the
+                 separation. Overlaps are found with a uniform grid spatial hash, so
+                 each placement only looks at the stacks in the cells around it.
+
+    Only footprints are needed, so no scene calls are made.
+
+:applications:
+    Maya, standalone Python
+
+:see_also:
+    builder.py
+    stacker.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+import math
+import random
+
+# Imports That You Wrote
+from td_maya_tools import stacker
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+LAYOUT_MODES = ('line', 'grid', 'shelf', 'scatter')
+
+# Cells are keyed by x * CELL_STRIDE + z, which is unique while z stays under half of it
+CELL_STRIDE = 1 << 32
+_NEIGHBOURS = [x * CELL_STRIDE + z for x in (-1, 0, 1) for z in (-1, 0, 1)]
+
+# The share of a scatter region that the stacks cover when no region is given
+SCATTER_DENSITY = 0.2
+
+
+def arrange(bounding_boxes, mode='line', separation=0.1, columns=None, width=None,
+            depth=None, seed=0, attempts=32):
+    """
+    Works out where each stack goes.
+
+    :param bounding_boxes: The bounding box of each stack while it is at the origin.
+    :type: list of lists (xmin, ymin, zmin, xmax, ymax, zmax)
+
+    :param mode: One of LAYOUT_MODES. (Def='line')
+    :type: str
+
+    :param separation: The smallest gap between two stacks. (Def=0.1)
+    :type: float
+
+    :param columns: The number of columns of a grid. (Def=as many as rows)
+    :type: int
+
+    :param width: The size in x of a shelf or scatter region. (Def=about square)
+    :type: float
+
+    :param depth: The size in z of a scatter region. (Def=about square)
+    :type: float
+
+    :param seed: The seed of a scatter. (Def=0)
+    :type: int
+
+    :param attempts: How many random places a scatter tries for a stack before it makes
+    the region bigger. (Def=32)
+    :type: int
+
+    :return: The (x, z) position of each stack. In line mode z is None, since the line
+    leaves stacks where they are in z.
+    :type: list of tuples (float, float)
+    """
+    if mode not in LAYOUT_MODES:
+        raise ValueError('Unknown layout mode %r, expected one of %s'
+                         % (mode, ', '.join(LAYOUT_MODES)))
+    if not bounding_boxes:
+        return []
+    if mode == 'line':
+        return [(x, None) for x in stacker.get_row_positions(bounding_boxes, separation)]
+
+    footprints = [(bbox[0], bbox[2], bbox[3], bbox[5]) for bbox in bounding_boxes]
+    if mode == 'grid':
+        return grid_positions(footprints, separation, columns)
+    if mode == 'shelf':
+        return shelf_positions(footprints, separation, width)
+    return scatter_positions(footprints, separation, width, depth, seed, attempts)
+
+
+def grid_positions(footprints, separation, columns=None):
+    """
+    Centers each stack in a cell of a grid. The cells fit the biggest footprint.
+
+    :param footprints: The (xmin, zmin, xmax, zmax) of each stack at the origin.
+    :type: list of tuples
+
+    :param separation: The smallest gap between two stacks.
+    :type: float
+
+    :param columns: The number of columns. (Def=as many as rows)
+    :type: int
+
+    :return: The (x, z) position of each stack
+    :type: list of tuples (float, float)
+    """
+    columns = columns or int(math.ceil(math.sqrt(len(footprints))))
+    cell_width = max(xmax - xmin for xmin, zmin, xmax, zmax in footprints) + separation
+    cell_depth = max(zmax - zmin for xmin, zmin, xmax, zmax in footprints) + separation
+
+    positions = []
+    for index, (xmin, zmin, xmax, zmax) in enumerate(footprints):
+        row, column = divmod(index, columns)
+        positions.append((column * cell_width - (xmin + xmax) / 2.0,
+                          row * cell_depth - (zmin + zmax) / 2.0))
+    return positions
+
+
+def shelf_positions(footprints, separation, width=None):
+    """
+    Packs the stacks into shelves, deepest first. Each shelf is filled left to right
+    until the next stack would go past the width.
+
+    :param footprints: The (xmin, zmin, xmax, zmax) of each stack at the origin.
+    :type: list of tuples
+
+    :param separation: The smallest gap between two stacks.
+    :type: float
+
+    :param width: The width of a shelf. (Def=about square)
+    :type: float
+
+    :return: The (x, z) position of each stack
+    :type: list of tuples (float, float)
+    """
+    if width is None:
+        width = math.sqrt(_padded_area(footprints, separation))
+    order = sorted(range(len(footprints)),
+                   key=lambda index: footprints[index][1] - footprints[index][3])
+
+    positions = [None] * len(footprints)
+    cursor = 0.0
+    shelf_z = 0.0
+    shelf_depth = None
+    for index in order:
+        xmin, zmin, xmax, zmax = footprints[index]
+        if shelf_depth is None:
+            shelf_depth = zmax - zmin
+        elif cursor + xmax - xmin > width:
+            # Start a new shelf, as deep as its first (deepest) stack
+            shelf_z += shelf_depth + separation
+            shelf_depth = zmax - zmin
+            cursor = 0.0
+        positions[index] = (cursor - xmin, shelf_z - zmin)
+        cursor += xmax - xmin + separation
+    return positions
+
+
+def scatter_positions(footprints, separation, width=None, depth=None, seed=0,
+                      attempts=32):
+    """
+    Places each stack at a random spot inside a region where it is at least the
+    separation away from every stack placed before it.
+
+    :param footprints: The (xmin, zmin, xmax, zmax) of each stack at the origin.
+    :type: list of tuples
+
+    :param separation: The smallest gap between two stacks.
+    :type: float
+
+    :param width: The size of the region in x. (Def=about square)
+    :type: float
+
+    :param depth: The size of the region in z. (Def=about square)
+    :type: float
+
+    :param seed: The seed of the random spots. (Def=0)
+    :type: int
+
+    :param attempts: How many spots to try for a stack before the region is made 10%
+    bigger. (Def=32)
+    :type: int
+
+    :return: The (x, z) position of each stack
+    :type: list of tuples (float, float)
+    """
+    side = math.sqrt(_padded_area(footprints, separation) / SCATTER_DENSITY)
+    width = width or side
+    depth = depth or side
+    rand = random.Random(seed)
+
+    # Cells that fit the biggest footprint, so only neighbouring cells need checking
+    biggest = max(max(xmax - xmin, zmax - zmin) for xmin, zmin, xmax, zmax in footprints)
+    spatial_hash = SpatialHash(biggest + separation)
+
+    positions = []
+    for xmin, zmin, xmax, zmax in footprints:
+        tries = 0
+        while True:
+            # Pick a spot that keeps the whole footprint inside the region
+            x = rand.random() * max(0.0, width - (xmax - xmin)) - xmin
+            z = rand.random() * max(0.0, depth - (zmax - zmin)) - zmin
+            rect = (x + xmin, z + zmin, x + xmax, z + zmax)
+            if not spatial_hash.overlaps(rect, separation):
+                break
+            tries += 1
+            if tries >= attempts:
+                width *= 1.1
+                depth *= 1.1
+                tries = 0
+        spatial_hash.insert(rect)
+        positions.append((x, z))
+    return positions
+
+
+def _padded_area(footprints, separation):
+    return sum((xmax - xmin + separation) * (zmax - zmin + separation)
+               for xmin, zmin, xmax, zmax in footprints)
+
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- CLASSES --#
+
+
+class SpatialHash(object):
+    """
+    A uniform grid of square cells over the ground plane. Each rectangle is stored in
+    the cell its center is in, and the cells are at least as big as the biggest
+    rectangle plus the margin it is checked with, so any rectangle close enough to
+    matter is in one of the nine cells around a spot.
+    """
+    def __init__(self, cell_size):
+        """
+        :param cell_size: The size of a cell in x and z.
+        :type: float
+        """
+        self.cell_size = float(cell_size)
+        self.cells = {}
+
+    def insert(self, rect):
+        """
+        :param rect: The (xmin, zmin, xmax, zmax) of a rectangle to store.
+        :type: tuple
+
+        :return: N/A
+        """
+        size = self.cell_size
+        key = int((rect[0] + rect[2]) * 0.5 // size) * CELL_STRIDE + \
+            int((rect[1] + rect[3]) * 0.5 // size)
+        cell = self.cells.get(key)
+        if cell is None:
+            self.cells[key] = [rect]
+        else:
+            cell.append(rect)
+
+    def overlaps(self, rect, margin=0.0):
+        """
+        :param rect: The (xmin, zmin, xmax, zmax) of a rectangle.
+        :type: tuple
+
+        :param margin: The gap the rectangle needs from every stored one. (Def=0.0)
+        :type: float
+
+        :return: Whether a stored rectangle is closer to the rectangle than the margin
+        :type: bool
+        """
+        xmin, zmin, xmax, zmax = rect
+        size = self.cell_size
+        key = int((xmin + xmax) * 0.5 // size) * CELL_STRIDE + \
+            int((zmin + zmax) * 0.5 // size)
+        get = self.cells.get
+        for offset in _NEIGHBOURS:
+            for other in get(key + offset, ()):
+                if xmin < other[2] + margin and other[0] < xmax + margin and \
+                        zmin < other[3] + margin and other[1] < zmax + margin:
+                    return True
+        return False
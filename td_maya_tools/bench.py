@@ -0,0 +1,803 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Benchmarks for stack generation, layout and XML loading.
+
+:description:
+    This module measures how the stacker tools scale. Each phase (building stacks from
+    duplicates, instances or templates, replaying a build journal, stacking, spacing
+    stacks out in x, the grid, shelf and scatter layouts, finding contact points on
+    meshes, reading, applying and exporting layouts, applying a folder of layout files)
+    is run against the memory backend for every combination of stack count and max
+    height asked for, and the wall time, peak memory, number of scene calls and number
+    of scene nodes of each run are recorded. Duplicate and instance builds are also
+    reported side by side. Results can be saved as JSON and compared with an earlier run
+    to flag regressions, and the time spent in each phase of the tools can be saved as
+    a Chrome trace.
+    The cold import time of each core module is measured in a fresh interpreter, which
+    also checks that importing the core doesn't pull in Maya, Qt or numpy.
+    Nothing here needs Maya, so it can run on any machine with Python.
+
+    Run it with:
+        python -m td_maya_tools.bench --output results.json
+        python -m td_maya_tools.bench --compare results.json
+
+:applications:
+    Standalone Python
+
+:see_also:
+    scene.py
+    builder.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+import argparse
+import datetime
+import gc
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+# Imports That You Wrote
+from td_maya_tools import arrange
+from td_maya_tools import scene
+from td_maya_tools import stacker
+from td_maya_tools import builder
+from td_maya_tools import contact
+from td_maya_tools import gen_utils
+from td_maya_tools import instrument
+from td_maya_tools import journal
+from td_maya_tools import layout
+from td_maya_tools import lazy
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+DEFAULT_COUNTS = [10, 100, 1000, 10000, 100000]
+DEFAULT_HEIGHTS = [1, 2, 3, 4, 5, 6]
+DEFAULT_THRESHOLD = 0.2
+
+# Timings closer than this are noise, whatever the threshold says
+MIN_TIME_DELTA = 0.001
+
+# Import times jitter more, since they start a new interpreter
+MIN_IMPORT_DELTA = 0.005
+
+# Modules the core must not import just by being imported
+HEAVY_MODULES = ('maya', 'PySide2', 'shiboken2', 'numpy')
+
+_IMPORT_SCRIPT = '''
+import sys, timeit
+start = timeit.default_timer()
+__import__(sys.argv[1])
+seconds = timeit.default_timer() - start
+heavy = [name for name in sys.argv[2:] if name in sys.modules]
+print('%r %s' % (seconds, ' '.join(heavy)))
+'''
+
+
+def make_part_pools(backend, pool_size=4, seed=0):
+    """
+    Creates base, middle and top parts of random sizes in a memory backend.
+
+    :param backend: The memory backend to create the parts in.
+    :type: scene.MemoryBackend
+
+    :param pool_size: The number of parts in each pool. (Def=4)
+    :type: int
+
+    :param seed: The seed for the part sizes. (Def=0)
+    :type: int
+
+    :return: The top, middle and base part names
+    :type: tuple of lists
+    """
+    rand = random.Random(seed)
+    pools = []
+    for kind in ('top', 'mid', 'base'):
+        names = []
+        for i in range(pool_size):
+            half_width = rand.uniform(0.25, 1.0)
+            half_depth = rand.uniform(0.25, 1.0)
+            height = rand.uniform(0.2, 1.0)
+            bounding_box = [-half_width, 0.0, -half_depth, half_width, height, half_depth]
+            names.append(backend.create_part('%s_part%d' % (kind, i), bounding_box))
+        pools.append(names)
+    return tuple(pools)
+
+
+def write_layout_xml(xml_path, count):
+    """
+    Writes a layout XML file in the same format as exampleXML.xml.
+
+    :param xml_path: The path to write the file to.
+    :type: str
+
+    :param count: The number of stacks in the file.
+    :type: int
+
+    :return: N/A
+    """
+    with open(xml_path, 'w') as xml_fh:
+        xml_fh.write('<?xml version="1.0" ?>\n<stacks>\n    <maya_stacks>\n')
+        for index in range(1, count + 1):
+            xml_fh.write('        <stack%03d>\n' % index)
+            for axis, value in (('tx', index * 1.5), ('ty', 0), ('tz', index * 0.5)):
+                xml_fh.write('            <%s value="%s"/>\n' % (axis, value))
+            xml_fh.write('        </stack%03d>\n' % index)
+        xml_fh.write('    </maya_stacks>\n</stacks>\n')
+
+
+def setup_make_stacks(count, height, workdir):
+    """
+    :return: A backend with part pools and a function that builds the stacks
+    :type: tuple
+    """
+    backend = scene.MemoryBackend()
+    top_objs, mid_objs, base_objs = make_part_pools(backend)
+
+    def run():
+        builder.build_stacks(top_objs, mid_objs, base_objs, count, height, 0.1, seed=0)
+    return backend, run
+
+
+def setup_make_stacks_instanced(count, height, workdir):
+    """
+    :return: A backend with part pools and a function that builds the stacks from
+    instances of the parts
+    :type: tuple
+    """
+    backend = scene.MemoryBackend()
+    top_objs, mid_objs, base_objs = make_part_pools(backend)
+
+    def run():
+        builder.build_stacks(top_objs, mid_objs, base_objs, count, height, 0.1,
+                             instance=True, seed=0)
+    return backend, run
+
+
+def setup_make_stacks_templated(count, height, workdir):
+    """
+    :return: A backend with part pools and a function that builds the stacks, copying
+    stacks with the same parts as one built before
+    :type: tuple
+    """
+    backend = scene.MemoryBackend()
+    top_objs, mid_objs, base_objs = make_part_pools(backend)
+
+    def run():
+        builder.build_stacks(top_objs, mid_objs, base_objs, count, height, 0.1,
+                             seed=0, use_templates=True)
+    return backend, run
+
+
+def setup_replay_journal(count, height, workdir):
+    """
+    :return: A backend with part pools and a function that makes the stacks of a
+    journal recorded from the same build as make_stacks
+    :type: tuple
+    """
+    journal_path = os.path.join(workdir, 'journal_%d_%d.jsonl' % (count, height))
+    if os.path.exists(journal_path):
+        os.remove(journal_path)
+    backend = scene.MemoryBackend()
+    top_objs, mid_objs, base_objs = make_part_pools(backend)
+    with scene.use_backend(backend):
+        builder.build_stacks(top_objs, mid_objs, base_objs, count, height, 0.1, seed=0,
+                             journal=journal.BuildJournal(journal_path))
+
+    backend = scene.MemoryBackend()
+    make_part_pools(backend)
+
+    def run():
+        journal.replay_journal(journal_path)
+    return backend, run
+
+
+def setup_stack_objs(count, height, workdir):
+    """
+    :return: A backend with unstacked parts and a function that stacks them
+    :type: tuple
+    """
+    backend = scene.MemoryBackend()
+    top_objs, mid_objs, base_objs = make_part_pools(backend)
+    rand = random.Random(0)
+    stacks = []
+    for index in range(count):
+        sources = [rand.choice(base_objs)] + \
+                  [rand.choice(mid_objs) for i in range(height)] + [rand.choice(top_objs)]
+        stacks.append([backend.duplicate(source) for source in sources])
+
+    def run():
+        for objects in stacks:
+            stacker.stack_objs(objects, single_pass=True)
+    return backend, run
+
+
+def setup_offset_objs_in_x(count, height, workdir):
+    """
+    :return: A backend with stack groups and a function that spaces them out
+    :type: tuple
+    """
+    backend = scene.MemoryBackend()
+    top_objs, mid_objs, base_objs = make_part_pools(backend)
+    groups = []
+    for index in range(1, count + 1):
+        group = backend.group('stack%03d' % index)
+        part = backend.duplicate(mid_objs[index % len(mid_objs)])
+        backend.parent(part, group)
+        groups.append(group)
+
+    def run():
+        for i in range(len(groups) - 1):
+            stacker.offset_objs_in_x(groups[i], groups[i + 1], 0.1)
+    return backend, run
+
+
+def setup_arrange(count, height, workdir, mode='grid'):
+    """
+    :return: A backend and a function that works out a layout of random footprints
+    :type: tuple
+    """
+    rand = random.Random(0)
+    bounding_boxes = []
+    for index in range(count):
+        width, depth = rand.uniform(0.5, 2.0), rand.uniform(0.5, 2.0)
+        bounding_boxes.append([-width / 2, 0.0, -depth / 2, width / 2, 1.0, depth / 2])
+
+    def run():
+        arrange.arrange(bounding_boxes, mode, 0.1)
+    return scene.MemoryBackend(), run
+
+
+def setup_arrange_grid(count, height, workdir):
+    """
+    :return: A backend and a function that works out a grid layout
+    :type: tuple
+    """
+    return setup_arrange(count, height, workdir, mode='grid')
+
+
+def setup_arrange_shelf(count, height, workdir):
+    """
+    :return: A backend and a function that works out a shelf layout
+    :type: tuple
+    """
+    return setup_arrange(count, height, workdir, mode='shelf')
+
+
+def setup_arrange_scatter(count, height, workdir):
+    """
+    :return: A backend and a function that works out a scatter layout
+    :type: tuple
+    """
+    return setup_arrange(count, height, workdir, mode='scatter')
+
+
+def setup_contact_support(count, height, workdir):
+    """
+    :return: A backend with a part of count vertices and a function that finds the
+    points it rests on and holds up
+    :type: tuple
+    """
+    backend = scene.MemoryBackend()
+    rand = random.Random(0)
+    points = []
+    for index in range(count):
+        # A lumpy ellipsoid, so the bands hold a handful of vertices like a real mesh
+        y = rand.uniform(-1.0, 1.0)
+        angle = rand.uniform(0.0, 2.0 * math.pi)
+        radius = math.sqrt(1.0 - y * y) * rand.uniform(0.9, 1.0)
+        points.extend((radius * math.cos(angle) * 2.0, y, radius * math.sin(angle)))
+    part = backend.create_part('mesh_part', points=points)
+
+    def run():
+        contact.ContactMetrics([part])
+    return backend, run
+
+
+def setup_read_stack_xml(count, height, workdir):
+    """
+    :return: A backend and a function that reads a layout file
+    :type: tuple
+    """
+    xml_path = os.path.join(workdir, 'layout_%d.xml' % count)
+    if not os.path.isfile(xml_path):
+        write_layout_xml(xml_path, count)
+
+    def run():
+        gen_utils.read_stack_xml(xml_path)
+    return scene.MemoryBackend(), run
+
+
+def setup_apply_layout(count, height, workdir, reapply=False):
+    """
+    :return: A backend with stack groups and a function that applies a layout to them
+    :type: tuple
+    """
+    backend = scene.MemoryBackend()
+    stack_layout = gen_utils.StackLayout()
+    for index in range(1, count + 1):
+        stack_layout.add(backend.group('stack%03d' % index), tx=index * 1.5, ty=0.0,
+                         tz=index * 0.5)
+
+    # Put the stacks in place first so only the no-op pass is measured
+    if reapply:
+        with scene.use_backend(backend):
+            layout.apply_layout(stack_layout)
+
+    def run():
+        layout.apply_layout(stack_layout)
+    return backend, run
+
+
+def setup_reapply_layout(count, height, workdir):
+    """
+    :return: A backend with stacks already in place and a function that applies the
+    same layout again
+    :type: tuple
+    """
+    return setup_apply_layout(count, height, workdir, reapply=True)
+
+
+def setup_apply_layout_files(count, height, workdir, file_count=4):
+    """
+    :return: A backend with stack groups and a function that applies a folder of layout
+    files to them, one file per share of the stacks
+    :type: tuple
+    """
+    backend = scene.MemoryBackend()
+    for index in range(1, count + 1):
+        backend.group('stack%03d' % index)
+
+    layout_dir = os.path.join(workdir, 'layouts_%d' % count)
+    if not os.path.isdir(layout_dir):
+        os.makedirs(layout_dir)
+        share = -(-count // file_count)
+        for number in range(file_count):
+            stack_layout = gen_utils.StackLayout()
+            for index in range(number * share + 1, min(count, (number + 1) * share) + 1):
+                stack_layout.add('stack%03d' % index, tx=index * 1.5, ty=0.0,
+                                 tz=index * 0.5)
+            gen_utils.write_stack_xml(stack_layout, os.path.join(
+                layout_dir, 'layout_%d.xml' % (number + 1)))
+
+    def run():
+        layout.apply_layout_files(layout_dir)
+    return backend, run
+
+
+def setup_export_layout(count, height, workdir):
+    """
+    :return: A backend with placed stack groups and a function that exports them to a
+    layout XML file
+    :type: tuple
+    """
+    backend, run_apply = setup_apply_layout(count, height, workdir)
+    with scene.use_backend(backend):
+        run_apply()
+    xml_path = os.path.join(workdir, 'export_%d.xml' % count)
+
+    def run():
+        layout.export_layout(xml_path)
+    return backend, run
+
+
+PHASES = [('make_stacks', setup_make_stacks, True),
+          ('make_stacks_instanced', setup_make_stacks_instanced, True),
+          ('make_stacks_templated', setup_make_stacks_templated, True),
+          ('replay_journal', setup_replay_journal, True),
+          ('stack_objs', setup_stack_objs, True),
+          ('offset_objs_in_x', setup_offset_objs_in_x, False),
+          ('arrange_grid', setup_arrange_grid, False),
+          ('arrange_shelf', setup_arrange_shelf, False),
+          ('arrange_scatter', setup_arrange_scatter, False),
+          ('contact_support', setup_contact_support, False),
+          ('read_stack_xml', setup_read_stack_xml, False),
+          ('apply_layout', setup_apply_layout, False),
+          ('reapply_layout', setup_reapply_layout, False),
+          ('apply_layout_files', setup_apply_layout_files, False),
+          ('export_layout', setup_export_layout, False)]
+
+
+def run_phase(setup, count, height, workdir, repeat=1, memory=True):
+    """
+    Times one phase and counts the scene calls it makes. Peak memory is measured in a
+    separate run so tracing allocations doesn't skew the wall time.
+
+    :param setup: A function returning a backend and the function to measure.
+    :type: function
+
+    :param count: The number of stacks.
+    :type: int
+
+    :param height: The max height of the stacks.
+    :type: int
+
+    :param workdir: A directory for temporary files.
+    :type: str
+
+    :param repeat: The number of timed runs, the fastest of which is kept. (Def=1)
+    :type: int
+
+    :param memory: Whether to measure peak memory. (Def=True)
+    :type: bool
+
+    :return: The wall time, peak memory, scene calls and scene node count of the run
+    :type: dict
+    """
+    seconds = None
+    commands = {}
+    nodes = None
+    for i in range(repeat):
+        backend, run = setup(count, height, workdir)
+        counter = scene.CountingBackend(backend)
+
+        # Don't time collecting what the setup threw away
+        gc.collect()
+        with scene.use_backend(counter):
+            start = timeit.default_timer()
+            run()
+            elapsed = timeit.default_timer() - start
+        if seconds is None or elapsed < seconds:
+            seconds = elapsed
+        commands = dict(counter.counts)
+        nodes = backend.node_count()
+
+    peak_bytes = None
+    if memory and tracemalloc is not None:
+        backend, run = setup(count, height, workdir)
+        with scene.use_backend(backend):
+            tracemalloc.start()
+            try:
+                run()
+                peak_bytes = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+    return {'seconds': seconds,
+            'peak_bytes': peak_bytes,
+            'commands': commands,
+            'total_commands': sum(commands.values()),
+            'nodes': nodes}
+
+
+def measure_import_times(modules=lazy.CORE_MODULES, repeat=3):
+    """
+    Times a cold import of each module, each in a new interpreter so nothing has been
+    imported before it.
+
+    :param modules: The full names of the modules to import. (Def=the core modules)
+    :type: list of strings
+
+    :param repeat: The number of imports per module, the fastest of which is kept.
+    (Def=3)
+    :type: int
+
+    :return: The seconds the import took and the heavy modules it pulled in, per module
+    :type: dict
+    """
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    paths = [package_root] + [path for path in [env.get('PYTHONPATH')] if path]
+    env['PYTHONPATH'] = os.pathsep.join(paths)
+    env.pop(lazy.DEV_ENV, None)
+
+    imports = {}
+    for module in modules:
+        seconds = None
+        heavy = []
+        for i in range(repeat):
+            output = subprocess.check_output([sys.executable, '-c', _IMPORT_SCRIPT,
+                                              module] + list(HEAVY_MODULES), env=env)
+            fields = output.decode('utf-8').split()
+            if seconds is None or float(fields[0]) < seconds:
+                seconds = float(fields[0])
+            heavy = fields[1:]
+        imports[module] = {'seconds': seconds, 'heavy_modules': heavy}
+    return imports
+
+
+def format_import_time(module, result):
+    """
+    :param module: The full name of a module.
+    :type: str
+
+    :param result: The import time of the module from measure_import_times.
+    :type: dict
+
+    :return: The import time as one line of text
+    :type: str
+    """
+    line = '%-32s %10.4fs' % ('import ' + module, result['seconds'])
+    if result['heavy_modules']:
+        line += '  imports ' + ', '.join(result['heavy_modules'])
+    return line
+
+
+def run_benchmarks(counts=None, heights=None, phases=None, repeat=1, memory=True,
+                   log=None, imports=True):
+    """
+    Runs every phase for every stack count and max height.
+
+    :param counts: The stack counts to sweep. (Def=DEFAULT_COUNTS)
+    :type: list of ints
+
+    :param heights: The max heights to sweep. (Def=DEFAULT_HEIGHTS)
+    :type: list of ints
+
+    :param phases: The names of the phases to run. (Def=all of them)
+    :type: list of strings
+
+    :param repeat: The number of timed runs per case. (Def=1)
+    :type: int
+
+    :param memory: Whether to measure peak memory. (Def=True)
+    :type: bool
+
+    :param log: A function called with a line of text after each case. (Def=None)
+    :type: function
+
+    :param imports: Whether to measure the cold import times of the core. (Def=True)
+    :type: bool
+
+    :return: The results with some details about the machine they were run on
+    :type: dict
+    """
+    counts = counts or DEFAULT_COUNTS
+    heights = heights or DEFAULT_HEIGHTS
+    results = []
+
+    import_times = measure_import_times() if imports else {}
+    if log:
+        for module in sorted(import_times):
+            log(format_import_time(module, import_times[module]))
+
+    # Import numpy up front so the first case it speeds up doesn't pay for importing it
+    lazy.get_numpy()
+
+    workdir = tempfile.mkdtemp(prefix='td_maya_tools_bench_')
+    try:
+        for name, setup, uses_height in PHASES:
+            if phases and name not in phases:
+                continue
+            for count in counts:
+                # Phases that don't depend on height only need to run once per count
+                for height in (heights if uses_height else [None]):
+                    result = run_phase(setup, count, height or 1, workdir, repeat,
+                                       memory)
+                    result.update({'phase': name, 'count': count, 'height': height})
+                    results.append(result)
+                    if log:
+                        log(format_result(result))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {'meta': {'python': platform.python_version(),
+                     'platform': platform.platform(),
+                     'date': datetime.datetime.now().isoformat()},
+            'imports': import_times,
+            'results': results}
+
+
+def format_result(result):
+    """
+    :param result: A single benchmark result.
+    :type: dict
+
+    :return: The result as one line of text
+    :type: str
+    """
+    peak = result['peak_bytes']
+    return '%-22s count=%-7d height=%-4s %10.4fs %10s KB %9d cmds' % (
+        result['phase'], result['count'],
+        result['height'] if result['height'] is not None else '-',
+        result['seconds'],
+        '%.1f' % (peak / 1024.0) if peak is not None else '-',
+        result['total_commands'])
+
+
+def format_mode_comparison(results):
+    """
+    Puts the duplicate and instance builds of the same stack count and height side by
+    side.
+
+    :param results: The results returned by run_benchmarks.
+    :type: dict
+
+    :return: One line of text per case that was run in both modes
+    :type: list of strings
+    """
+    cases = {}
+    for result in results['results']:
+        if result['phase'] in ('make_stacks', 'make_stacks_instanced'):
+            key = (result['count'], result['height'])
+            cases.setdefault(key, {})[result['phase']] = result
+
+    def kilobytes(result):
+        peak = result['peak_bytes']
+        return '%.1f' % (peak / 1024.0) if peak is not None else '-'
+
+    lines = ['%-7s %-6s %14s %14s %12s %12s' % ('count', 'height', 'duplicate KB',
+                                                 'instance KB', 'dup nodes',
+                                                 'inst nodes')]
+    for key in sorted(cases):
+        modes = cases[key]
+        if len(modes) < 2:
+            continue
+        duplicate = modes['make_stacks']
+        instanced = modes['make_stacks_instanced']
+        lines.append('%-7d %-6d %14s %14s %12d %12d' % (
+            key[0], key[1], kilobytes(duplicate), kilobytes(instanced),
+            duplicate['nodes'], instanced['nodes']))
+    return lines if len(lines) > 1 else []
+
+
+def save_results(results, json_path):
+    """
+    :param results: The results returned by run_benchmarks.
+    :type: dict
+
+    :param json_path: The path of the JSON file to write.
+    :type: str
+
+    :return: N/A
+    """
+    with open(json_path, 'w') as json_fh:
+        json.dump(results, json_fh, indent=2, sort_keys=True)
+
+
+def load_results(json_path):
+    """
+    :param json_path: The path of a JSON file written by save_results.
+    :type: str
+
+    :return: The results
+    :type: dict
+    """
+    with open(json_path) as json_fh:
+        return json.load(json_fh)
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Finds the cases that got slower, used more memory or made more scene calls than in
+    an earlier run.
+
+    :param baseline: The results of the earlier run.
+    :type: dict
+
+    :param current: The results of the new run.
+    :type: dict
+
+    :param threshold: How much slower or bigger a case can get, as a fraction of the
+    baseline, before it counts as a regression. (Def=0.2)
+    :type: float
+
+    :return: A description of each regression
+    :type: list of strings
+    """
+    baseline_cases = dict(((result['phase'], result['count'], result['height']), result)
+                          for result in baseline['results'])
+    regressions = []
+
+    for result in current['results']:
+        key = (result['phase'], result['count'], result['height'])
+        before = baseline_cases.get(key)
+        if before is None:
+            continue
+
+        label = '%s count=%s height=%s' % key
+        slowdown = result['seconds'] - before['seconds']
+        if slowdown > max(before['seconds'] * threshold, MIN_TIME_DELTA):
+            regressions.append('%s: %.4fs -> %.4fs' % (label, before['seconds'],
+                                                         result['seconds']))
+        if result['peak_bytes'] is not None and before['peak_bytes'] is not None and \
+                result['peak_bytes'] > before['peak_bytes'] * (1 + threshold):
+            regressions.append('%s: %d -> %d peak bytes' % (label, before['peak_bytes'],
+                                                            result['peak_bytes']))
+        # Any extra scene call is a regression, they are exact
+        if result['total_commands'] > before['total_commands']:
+            regressions.append('%s: %d -> %d scene commands' % (
+                label, before['total_commands'], result['total_commands']))
+
+    for module, result in current.get('imports', {}).items():
+        before = baseline.get('imports', {}).get(module)
+        if result['heavy_modules']:
+            regressions.append('import %s: pulls in %s' % (
+                module, ', '.join(result['heavy_modules'])))
+        if before is not None and result['seconds'] - before['seconds'] > \
+                max(before['seconds'] * threshold, MIN_IMPORT_DELTA):
+            regressions.append('import %s: %.4fs -> %.4fs' % (module, before['seconds'],
+                                                              result['seconds']))
+
+    return regressions
+
+
+def main(argv=None):
+    """
+    Runs the benchmarks from the command line.
+
+    :param argv: The command line arguments. (Def=sys.argv)
+    :type: list of strings
+
+    :return: 1 if a regression was found, else 0
+    :type: int
+    """
+    parser = argparse.ArgumentParser(description='Benchmark the stacker tools.')
+    parser.add_argument('--counts', type=int, nargs='+', default=DEFAULT_COUNTS,
+                        help='stack counts to sweep')
+    parser.add_argument('--heights', type=int, nargs='+', default=DEFAULT_HEIGHTS,
+                        help='max stack heights to sweep')
+    parser.add_argument('--phases', nargs='+', choices=[phase[0] for phase in PHASES],
+                        help='phases to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='timed runs per case, the fastest is kept')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip the peak memory runs')
+    parser.add_argument('--no-imports', action='store_true',
+                        help='skip the cold import times of the core')
+    parser.add_argument('--output', help='save the results to this JSON file')
+    parser.add_argument('--compare', help='compare with the results in this JSON file')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='allowed slowdown before a case counts as a regression')
+    parser.add_argument('--trace', help='save a Chrome trace of the tool phases to this '
+                                        'file')
+    args = parser.parse_args(argv)
+
+    def log(line):
+        print(line)
+        sys.stdout.flush()
+
+    # Each run makes its own backend, so only the phases are recorded
+    if args.trace:
+        instrument.enable(count_commands=False)
+    results = run_benchmarks(args.counts, args.heights, args.phases, args.repeat,
+                             not args.no_memory, log, not args.no_imports)
+    if args.trace:
+        recorder = instrument.disable()
+        recorder.save_chrome_trace(args.trace)
+        print(recorder.summary())
+    for line in format_mode_comparison(results):
+        print(line)
+    if args.output:
+        save_results(results, args.output)
+
+    if args.compare:
+        regressions = compare_results(load_results(args.compare), results,
+                                      args.threshold)
+        for regression in regressions:
+            print('REGRESSION ' + regression)
+        if regressions:
+            return 1
+        print('No regressions')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
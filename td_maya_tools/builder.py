@@ -0,0 +1,498 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Builds stacks of randomly chosen parts.
+
+:description:
+    This module holds the stack building logic behind the 'Make Stacks' button of the
+    builder GUI. Parts are picked from the base, middle and top part lists with a seed,
+    duplicated or instanced, stacked on top of each other, grouped and spread out along
+    the x-axis or in one of the other arrange.LAYOUT_MODES.
+    All scene calls go through the active backend, so stacks can be built in Maya or in
+    the memory backend on machines without Maya. A whole build is one undo step, the
+    parts of every stack are duplicated with one call and each group gets its parts with
+    one call. Only the source parts have their bounding boxes queried; where the copies
+    and the stack groups end up is worked out from those. In contact mode the source
+    parts have their vertices scanned instead, so parts rest on what they touch.
+    With templates on, a stack with the same parts as one built before is a copy of
+    that stack's group instead of being built again. A build can be recorded in a
+    journal.BuildJournal, which makes the same stacks again without sampling, querying
+    or stacking anything.
+    A build can also be made a chunk of stacks at a time with StackBuild, which lets a
+    GUI stay responsive and roll back a build it cancels.
+
+:applications:
+    Maya, standalone Python
+
+:see_also:
+    stacker.py
+    scene.py
+    builder_gui.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+import timeit
+
+# Imports That You Wrote
+from td_maya_tools import arrange
+from td_maya_tools import contact
+from td_maya_tools import instrument
+from td_maya_tools import metrics
+from td_maya_tools import recipes
+from td_maya_tools import scene
+from td_maya_tools import stacker
+from td_maya_tools import templates
+from td_maya_tools import validation
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+
+def build_stacks(top_objs, mid_objs, base_objs, stack_count, max_height, separation,
+                 instance=False, duplicate_parts=None, seed=None, part_metrics=None,
+                 validator=None, layout_mode='line',
+                 contact_stacking=False, use_templates=False, journal=None):
+    """
+    Creates stacks of randomly chosen parts and spaces them out along the x-axis, or lays
+    them out another way. The same seed and part lists always make the same stacks.
+
+    :param top_objs: The transforms of the parts that can go on top of a stack.
+    :type: list of strings
+
+    :param mid_objs: The transforms of the parts that can go in the middle of a stack.
+    :type: list of strings
+
+    :param base_objs: The transforms of the parts that can go at the base of a stack.
+    :type: list of strings
+
+    :param stack_count: The number of stacks to make.
+    :type: int
+
+    :param max_height: The most middle parts a stack can have.
+    :type: int
+
+    :param separation: The distance in x between the bounding boxes of two stacks.
+    :type: float
+
+    :param instance: Make instances of the parts, which share the shape of the part,
+    instead of full duplicates. (Def=False)
+    :type: bool
+
+    :param duplicate_parts: Parts that are always fully duplicated, even when making
+    instances. (Def=None)
+    :type: list of strings
+
+    :param seed: The seed the parts are picked with. A new seed is picked when this is
+    None. (Def=None)
+    :type: int
+
+    :param part_metrics: The bounds of the source parts, to reuse them between builds
+    from the same parts. (Def=None)
+    :type: metrics.PartMetrics
+
+    :param validator: The validator that checked the parts, so they aren't checked
+    again. (Def=None)
+    :type: validation.Validator
+
+    :param layout_mode: How the stacks are laid out, one of arrange.LAYOUT_MODES. 'line'
+    spaces them out along the x-axis. (Def='line')
+    :type: str
+
+    :param contact_stacking: Stack the parts on the vertices they rest on instead of
+    their bounding boxes, for rotated and irregular parts. Ignored when part_metrics
+    is given. (Def=False)
+    :type: bool
+
+    :param use_templates: Copy the group of the first stack made from each list of
+    parts for the later stacks with the same parts, instead of building them from
+    scratch. The copied parts are named after the template's parts, so their names
+    differ from a build from scratch. (Def=False)
+    :type: bool
+
+    :param journal: The journal to record the build in, so it can be replayed.
+    (Def=None)
+    :type: journal.BuildJournal
+
+    :return: The name of each stack group with the transforms inside it
+    :type: list of tuples (str, list of strings)
+    """
+    build = StackBuild(top_objs, mid_objs, base_objs, stack_count, max_height,
+                       separation, instance=instance, duplicate_parts=duplicate_parts,
+                       seed=seed, part_metrics=part_metrics, validator=validator,
+                       layout_mode=layout_mode,
+                       contact_stacking=contact_stacking, use_templates=use_templates,
+                       journal=journal)
+    return build.step(stack_count)
+
+
+def copy_parts(batch, parts, instance=False, duplicate_parts=None):
+    """
+    Duplicates or instances parts, with one call for each kind of copy.
+
+    :param batch: The batch to make the copies with.
+    :type: scene.SceneBatch
+
+    :param parts: The parts to copy. A part listed more than once is copied once per
+    entry.
+    :type: list of strings
+
+    :param instance: Make instances instead of full duplicates. (Def=False)
+    :type: bool
+
+    :param duplicate_parts: Parts that are always fully duplicated. (Def=None)
+    :type: list of strings
+
+    :return: The copy of each part, in the same order as the parts
+    :type: list of strings
+    """
+    if not instance:
+        return batch.duplicate(parts)
+
+    # Split off the parts that have to be real duplicates
+    duplicate_parts = set(duplicate_parts or [])
+    is_duplicate = [part in duplicate_parts for part in parts]
+    duplicates = iter(batch.duplicate([part for part, flag in zip(parts, is_duplicate)
+                                       if flag]))
+    instances = iter(batch.instance([part for part, flag in zip(parts, is_duplicate)
+                                     if not flag]))
+
+    return [next(duplicates) if flag else next(instances) for flag in is_duplicate]
+
+
+def next_chunk_size(chunk_size, elapsed, budget):
+    """
+    Scales the number of stacks built per chunk so a chunk takes about as long as the
+    time budget, growing or shrinking by at most a factor of two at a time.
+
+    :param chunk_size: The number of stacks in the last chunk.
+    :type: int
+
+    :param elapsed: The seconds the last chunk took.
+    :type: float
+
+    :param budget: The seconds a chunk should take.
+    :type: float
+
+    :return: The number of stacks to build in the next chunk
+    :type: int
+    """
+    if elapsed <= 0:
+        return chunk_size * 2
+    scale = min(2.0, max(0.5, budget / elapsed))
+    return max(1, int(chunk_size * scale))
+
+
+def format_progress(done, total, elapsed):
+    """
+    :param done: The number of stacks built so far.
+    :type: int
+
+    :param total: The number of stacks being built.
+    :type: int
+
+    :param elapsed: The seconds since the build started.
+    :type: float
+
+    :return: How far along a build is, how fast it is going and how long is left
+    :type: str
+    """
+    text = '%d / %d stacks' % (done, total)
+    if done and elapsed > 0:
+        rate = done / float(elapsed)
+        text += ', %.1f stacks/s, %.1fs left' % (rate, (total - done) / rate)
+    return text
+
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- CLASSES --#
+
+
+class StackBuild(object):
+    """
+    A build of stacks that can be made a chunk at a time, so a GUI can keep responding
+    between chunks, and rolled back part way through. Building every stack in one
+    chunk makes the same scene as building them a few at a time.
+    """
+    def __init__(self, top_objs, mid_objs, base_objs, stack_count, max_height,
+                 separation, instance=False, duplicate_parts=None, seed=None,
+                 part_metrics=None, validator=None, layout_mode='line',
+                 contact_stacking=False, use_templates=False, journal=None):
+        """
+        Takes the same arguments as build_stacks. Raises a ValueError if a part list is
+        empty or has parts that don't exist, or the layout mode is unknown.
+        """
+        if layout_mode not in arrange.LAYOUT_MODES:
+            raise ValueError('Unknown layout mode %r, expected one of %s'
+                             % (layout_mode, ', '.join(arrange.LAYOUT_MODES)))
+        self.backend = scene.get_backend()
+        self.top_objs = list(top_objs)
+        self.mid_objs = list(mid_objs)
+        self.base_objs = list(base_objs)
+        self.stack_count = stack_count
+        self.max_height = max_height
+        self.separation = separation
+        self.instance = instance
+        self.duplicate_parts = duplicate_parts
+        self.seed = recipes.random_seed() if seed is None else seed
+        self.part_metrics = part_metrics
+        self.layout_mode = layout_mode
+        self.contact_stacking = contact_stacking
+        self.template_cache = None
+        if use_templates:
+            self.template_cache = templates.TemplateCache(instance, duplicate_parts)
+        self.stacks = []
+        self._stack_bboxes = []
+        self._last_stack = None
+        self._loose = []
+        self._loose_groups = []
+
+        # Parts the validator has already checked aren't asked about again
+        self.validator = validator or validation.Validator(self.backend)
+        with instrument.phase('validation'):
+            report = self.validator.check([('top', self.top_objs),
+                                           ('mid', self.mid_objs),
+                                           ('base', self.base_objs)])
+        if not report.is_valid():
+            raise ValueError(report.summary())
+
+        self.journal = journal
+        if journal is not None:
+            journal.write_build(self)
+
+    def is_finished(self):
+        """
+        :return: Whether every stack has been built
+        :type: bool
+        """
+        return len(self.stacks) >= self.stack_count
+
+    def step(self, count):
+        """
+        Builds the next stacks as a single undo step.
+
+        :param count: The most stacks to build.
+        :type: int
+
+        :return: The name of each new stack group with the transforms inside it
+        :type: list of tuples (str, list of strings)
+        """
+        start = len(self.stacks)
+        count = min(count, self.stack_count - start)
+        if count <= 0:
+            return []
+        backend = self.backend
+
+        # Pick the parts of every stack in the chunk up front
+        with instrument.phase('sampling'):
+            batch_recipes = recipes.sample_recipes(len(self.top_objs), len(self.mid_objs),
+                                                   len(self.base_objs), count,
+                                                   self.max_height, self.seed,
+                                                   start=start)
+            stack_parts = [batch_recipes.parts(index, self.top_objs, self.mid_objs,
+                                               self.base_objs)
+                           for index in range(count)]
+
+        # Stacks with the same parts as one built before are copied from it
+        built, copied = self._find_templates(stack_parts)
+
+        # The copies are where their source parts are, so only the sources are queried
+        if self.part_metrics is None:
+            with instrument.phase('part_metrics'):
+                sources = self.base_objs + self.mid_objs + self.top_objs
+                if self.contact_stacking:
+                    self.part_metrics = contact.ContactMetrics(sources, backend)
+                else:
+                    self.part_metrics = metrics.PartMetrics(sources, backend)
+
+        stacks = [None] * count
+        stack_bboxes = [None] * count
+        translations = [None] * count
+        with scene.SceneBatch(backend, undo_name='Make Stacks') as batch:
+            build_start = timeit.default_timer()
+
+            # Copy the parts of every stack in bulk
+            with instrument.phase('duplication'):
+                all_parts = [part for offset in built for part in stack_parts[offset]]
+                all_transforms = copy_parts(batch, all_parts, self.instance,
+                                            self.duplicate_parts)
+            self._loose = all_transforms
+            transforms_lists = []
+            position = 0
+            for offset in built:
+                parts = stack_parts[offset]
+                transforms_lists.append(all_transforms[position:position + len(parts)])
+                position += len(parts)
+
+            with instrument.phase('stacking'):
+                for offset, transforms_list in zip(built, transforms_lists):
+                    base_translation, offsets, stack_bbox = \
+                        self.part_metrics.plan_stack(stack_parts[offset])
+                    if self.journal is not None:
+                        translations[offset] = self.part_metrics.copy_translations(
+                            stack_parts[offset], base_translation, offsets)
+
+                    # Move the base object to the world origin, on top of the grid
+                    backend.move(transforms_list[0], base_translation)
+
+                    # Stack objects
+                    for obj, offset_move in zip(transforms_list[1:], offsets[1:]):
+                        backend.move(obj, offset_move, relative=True)
+                    stack_bboxes[offset] = stack_bbox
+
+            with instrument.phase('grouping'):
+                # Create groups and queue the stacked objects to be placed in them
+                for offset, transforms_list in zip(built, transforms_lists):
+                    stack_group = batch.group("stack%s" % ("%03d" % (start + offset + 1)))
+                    self._loose_groups.append(stack_group)
+                    batch.parent(transforms_list, stack_group)
+                    stacks[offset] = (stack_group, transforms_list)
+
+                # The groups need their contents before they can be moved or copied
+                batch.flush()
+                self._loose = []
+
+            if self.template_cache is not None:
+                self.template_cache.build_seconds += timeit.default_timer() - build_start
+                self._copy_templates(stack_parts, stacks, stack_bboxes, built, copied,
+                                     start)
+            self.stacks.extend(stacks)
+            self._loose_groups = []
+
+            # Space the stacks out along the x-axis, carrying on from the last chunk.
+            # The other layouts need every stack, so they wait for the last one.
+            placed = []
+            if self.layout_mode == 'line':
+                with instrument.phase('x_offset'):
+                    placed = self._place_in_line(stacks, stack_bboxes, start)
+            else:
+                self._stack_bboxes.extend(stack_bboxes)
+                if self.is_finished():
+                    with instrument.phase('arrange'):
+                        placed = self._arrange()
+
+        if self.journal is not None:
+            self._write_journal(stack_parts, stacks, translations, copied, placed)
+        return self.stacks[start:]
+
+    def _find_templates(self, stack_parts):
+        # Splits a chunk into the stacks to build and the stacks to copy, where the
+        # first stack in the chunk with new parts is built and becomes their template
+        cache = self.template_cache
+        if cache is None:
+            return list(range(len(stack_parts))), []
+
+        built = []
+        copied = []
+        new_keys = set()
+        for offset, parts in enumerate(stack_parts):
+            key = cache.key(parts)
+            if key is None:
+                cache.uncached += 1
+                built.append(offset)
+            elif key in new_keys or cache.get(key) is not None:
+                cache.hits += 1
+                copied.append(offset)
+            else:
+                cache.misses += 1
+                new_keys.add(key)
+                built.append(offset)
+        return built, copied
+
+    def _copy_templates(self, stack_parts, stacks, stack_bboxes, built, copied, start):
+        cache = self.template_cache
+        for offset in built:
+            key = cache.key(stack_parts[offset])
+            if key is not None and cache.get(key) is None:
+                cache.add(key, stacks[offset][0], stack_bboxes[offset])
+        if not copied:
+            return
+
+        copy_start = timeit.default_timer()
+        with instrument.phase('template_copy'):
+            for offset in copied:
+                template_group, stack_bbox = cache.get(cache.key(stack_parts[offset]))
+                stack = self.backend.duplicate_group(
+                    template_group, "stack%s" % ("%03d" % (start + offset + 1)),
+                    instance_leaf=self.instance)
+                self._loose_groups.append(stack[0])
+                stacks[offset] = stack
+                stack_bboxes[offset] = stack_bbox
+        cache.copy_seconds += timeit.default_timer() - copy_start
+
+    def _place_in_line(self, stacks, stack_bboxes, start):
+        if self._last_stack is None:
+            positions = stacker.get_row_positions(stack_bboxes, self.separation)
+        else:
+            last_bbox, last_x = self._last_stack
+            positions = stacker.get_row_positions([last_bbox] + stack_bboxes,
+                                                  self.separation, start=last_x)[1:]
+        for index, (stack_group, transforms_list) in enumerate(stacks, start):
+            if index:
+                self.backend.move(stack_group, [positions[index - start], None, None])
+        self._last_stack = (stack_bboxes[-1], positions[-1])
+        return [(stack[0], [x_move, 0.0, 0.0])
+                for stack, x_move in zip(stacks, positions)]
+
+    def _arrange(self):
+        positions = arrange.arrange(self._stack_bboxes, self.layout_mode,
+                                    self.separation, seed=self.seed)
+        for (stack_group, transforms_list), (x_move, z_move) in zip(self.stacks,
+                                                                     positions):
+            self.backend.move(stack_group, [x_move, None, z_move])
+        return [(stack[0], [x_move, 0.0, z_move])
+                for stack, (x_move, z_move) in zip(self.stacks, positions)]
+
+    def _write_journal(self, stack_parts, stacks, translations, copied, placed):
+        # Copies of templates are recorded the same way as the stacks that were built
+        for offset in copied:
+            base_translation, offsets, stack_bbox = \
+                self.part_metrics.plan_stack(stack_parts[offset])
+            translations[offset] = self.part_metrics.copy_translations(
+                stack_parts[offset], base_translation, offsets)
+        self.journal.write_stacks([stack[0] for stack in stacks], stack_parts,
+                                  translations)
+        if placed:
+            self.journal.write_places([stack_group for stack_group, move in placed],
+                                      [move for stack_group, move in placed])
+
+    def rollback(self):
+        """
+        Deletes everything the build has made so far, leaving the scene as it was.
+
+        :return: N/A
+        """
+        backend = self.backend
+        with backend.undo_chunk('Cancel Stacks'):
+            # Groups from a chunk that didn't finish are made before they are filled,
+            # and its copies may or may not be in a group yet. Deleting a group along
+            # with copies inside it is fine, so everything goes in one call
+            unfinished = self._loose_groups + self._loose
+            names = [stack_group for stack_group, transforms_list in self.stacks]
+            names += [name for name, found in zip(unfinished,
+                                                  backend.objs_exist(unfinished))
+                      if found]
+            if names:
+                backend.delete(names)
+
+        self.stacks = []
+        self._stack_bboxes = []
+        self._last_stack = None
+        self._loose = []
+        self._loose_groups = []
+        if self.template_cache is not None:
+            self.template_cache.clear()
+        if self.journal is not None:
+            self.journal.write_rollback()
@@ -0,0 +1,567 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Generates stack layouts from the command line, without Maya.
+
+:description:
+    This module makes the layout files of many sets of stacks in one run. A JSON config
+    lists each set's top, middle and base parts with their world space bounding boxes,
+    with the stack count, max height, separation, layout mode and seed of the set:
+
+        {
+            "separation": 0.1,
+            "sets": [
+                {
+                    "name": "crates",
+                    "seed": 7,
+                    "stack_count": 100000,
+                    "max_height": 4,
+                    "layout_mode": "line",
+                    "top": [{"name": "lid", "bbox": [-1, 0, -1, 1, 0.2, 1]}],
+                    "mid": [{"name": "crate", "bbox": [-1, 0, -1, 1, 1, 1]}],
+                    "base": [{"name": "pallet", "bbox": [-1.2, 0, -1.2, 1.2, 0.3, 1.2],
+                              "translation": [0, 0, 0]}]
+                }
+            ]
+        }
+
+    Settings outside of "sets" are the defaults of every set. Each set is split into
+    shards of stacks that are planned in a process pool: the recipes of a shard are
+    sampled from its first stack on, the way builder.StackBuild samples a chunk, and
+    the bounds of each stack are worked out from the part bounds, once per recipe. The
+    stacks are then laid out, which is a running sum in line mode, and the shards are
+    written in the pool again, either as one layout file each or as pieces joined into
+    one file per set. The files are in the format gen_utils.read_stack_xml reads and
+    match exporting a build of the same set from the scene.
+
+        python -m td_maya_tools.cli sets.json --output-dir layouts --processes 8
+
+:applications:
+    standalone Python
+
+:see_also:
+    builder.py
+    gen_utils.py
+    arrange.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+from array import array
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import timeit
+
+# Imports That You Wrote
+from td_maya_tools import arrange
+from td_maya_tools import gen_utils
+from td_maya_tools import metrics
+from td_maya_tools import recipes
+from td_maya_tools import scene
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+POOLS = ('top', 'mid', 'base')
+
+# The settings of a set that can be given once for every set
+SET_DEFAULTS = {'stack_count': 100,
+                'max_height': 3,
+                'separation': 0.1,
+                'layout_mode': 'line',
+                'seed': None}
+
+DEFAULT_SHARD_SIZE = 50000
+
+
+def load_config(config_path):
+    """
+    :param config_path: The path of a JSON config.
+    :type: str
+
+    :return: The sets in the config. Raises a ValueError if the config is invalid.
+    :type: list of LayoutSets
+    """
+    with open(config_path) as config_fh:
+        try:
+            config = json.load(config_fh)
+        except ValueError as error:
+            raise ValueError('%s is not valid JSON: %s' % (config_path, error))
+    return parse_config(config)
+
+
+def parse_config(config):
+    """
+    :param config: A config as loaded from JSON, either a list of sets or an object
+    with a "sets" list and the defaults of every set.
+    :type: dict or list
+
+    :return: The sets in the config. Raises a ValueError if the config is invalid.
+    :type: list of LayoutSets
+    """
+    if isinstance(config, list):
+        config = {'sets': config}
+    if not isinstance(config, dict) or not isinstance(config.get('sets'), list):
+        raise ValueError('The config needs a list of sets')
+
+    defaults = dict(SET_DEFAULTS)
+    defaults.update((key, value) for key, value in config.items() if key != 'sets')
+
+    layout_sets = []
+    names = set()
+    for index, entry in enumerate(config['sets']):
+        if not isinstance(entry, dict):
+            raise ValueError('Set %d is not an object' % (index + 1))
+        settings = dict(defaults)
+        settings.update(entry)
+        layout_set = LayoutSet.from_config(settings, 'set%d' % (index + 1))
+        if layout_set.name in names:
+            raise ValueError('More than one set is named %r' % layout_set.name)
+        names.add(layout_set.name)
+        layout_sets.append(layout_set)
+    return layout_sets
+
+
+def plan_shards(stack_count, shard_size):
+    """
+    :param stack_count: The number of stacks in a set.
+    :type: int
+
+    :param shard_size: The most stacks in a shard.
+    :type: int
+
+    :return: The first stack and the number of stacks of each shard
+    :type: list of tuples (int, int)
+    """
+    return [(start, min(shard_size, stack_count - start))
+            for start in range(0, stack_count, shard_size)]
+
+
+def plan_shard(layout_set, start, count):
+    """
+    Works out the bounds of a shard's stacks the way builder.StackBuild would, without
+    building them.
+
+    :param layout_set: The set the shard is in.
+    :type: LayoutSet
+
+    :param start: The index of the shard's first stack in the set.
+    :type: int
+
+    :param count: The number of stacks in the shard.
+    :type: int
+
+    :return: The bounding box of each stack while it is at the origin, six values per
+    stack one after the other
+    :type: array of doubles
+    """
+    backend = scene.MemoryBackend()
+    pools = []
+    for pool in POOLS:
+        names = []
+        for name, bounding_box, translation in layout_set.pools[pool]:
+            if not backend.obj_exists(name):
+                backend.create_part(name, bounding_box, translation)
+            names.append(name)
+        pools.append(names)
+    top_objs, mid_objs, base_objs = pools
+    part_metrics = metrics.PartMetrics(base_objs + mid_objs + top_objs, backend)
+
+    batch_recipes = recipes.sample_recipes(len(top_objs), len(mid_objs), len(base_objs),
+                                           count, layout_set.max_height,
+                                           layout_set.seed, start=start)
+
+    # Stacks with the same picks have the same bounds, so each recipe is planned once.
+    # A recipe is keyed by its row of picks up to its last middle part, and its top.
+    width = layout_set.max_height + 3
+    picks = batch_recipes.picks.tolist()
+    planned = {}
+    stack_bboxes = array('d')
+    for index, row in enumerate(range(0, count * width, width)):
+        key = (picks[row + width - 1],) + tuple(picks[row:row + picks[row + 1] + 3])
+        stack_bbox = planned.get(key)
+        if stack_bbox is None:
+            parts = batch_recipes.parts(index, top_objs, mid_objs, base_objs)
+            stack_bbox = part_metrics.plan_stack(parts)[2]
+            planned[key] = stack_bbox
+        stack_bboxes.extend(stack_bbox)
+    return stack_bboxes
+
+
+def get_line_positions(stack_bboxes, separation):
+    """
+    The same running sum as stacker.get_row_positions, over flat bounding boxes.
+
+    :param stack_bboxes: The bounding box of each stack while it is at the origin, six
+    values per stack one after the other.
+    :type: array of doubles
+
+    :param separation: The distance in x between the bounding boxes of two stacks.
+    :type: float
+
+    :return: The x position of each stack
+    :type: array of doubles
+    """
+    count = len(stack_bboxes) // 6
+    positions = array('d', [0.0]) * count
+    position = 0.0
+    for index in range(1, count):
+        moved = index * 6
+        position = position + stack_bboxes[moved - 3] + separation + \
+            abs((stack_bboxes[moved + 3] - stack_bboxes[moved]) / 2)
+        positions[index] = position
+    return positions
+
+
+def write_shard(xml_path, start, xs, zs, compress=False, fragment=False):
+    """
+    Writes the stacks of a shard to a layout file.
+
+    :param xml_path: The path of the file to write.
+    :type: str
+
+    :param start: The index of the shard's first stack in the set.
+    :type: int
+
+    :param xs: The x position of each stack.
+    :type: array of doubles
+
+    :param zs: The z position of each stack, or None to leave them at 0.
+    :type: array of doubles
+
+    :param compress: Gzip the file. (Def=False)
+    :type: bool
+
+    :param fragment: Write only the stack elements, to be joined with the other
+    shards. (Def=False)
+    :type: bool
+
+    :return: The number of stacks written
+    :type: int
+    """
+    with gen_utils.StackXmlWriter(xml_path, compress, buffer_size=4096,
+                                  fragment=fragment) as writer:
+        for index, x in enumerate(xs, start):
+            writer.write_stack('stack%03d' % (index + 1), x, 0.0,
+                               zs[index - start] if zs is not None else 0.0)
+        return writer.count
+
+
+def _map_jobs(pool, func, jobs):
+    if pool is None:
+        return [func(job) for job in jobs]
+    return pool.map(func, jobs, chunksize=1)
+
+
+def _plan_job(job):
+    return plan_shard(*job)
+
+
+def _write_job(job):
+    return write_shard(*job)
+
+
+def generate_layouts(layout_sets, output_dir, processes=None,
+                     shard_size=DEFAULT_SHARD_SIZE, merge=True, compress=False,
+                     log=None):
+    """
+    Plans, lays out and writes the stacks of every set, sharing the shards of all of
+    the sets between the processes.
+
+    :param layout_sets: The sets to make layouts for.
+    :type: list of LayoutSets
+
+    :param output_dir: The directory to write the layout files to.
+    :type: str
+
+    :param processes: How many processes to plan and write shards in. 1 does all of
+    the work in this process. (Def=the number of CPUs)
+    :type: int
+
+    :param shard_size: The most stacks in a shard. (Def=DEFAULT_SHARD_SIZE)
+    :type: int
+
+    :param merge: Write one file per set instead of one per shard. (Def=True)
+    :type: bool
+
+    :param compress: Gzip the files. (Def=False)
+    :type: bool
+
+    :param log: Called with a line of text as each step finishes. (Def=None)
+    :type: function
+
+    :return: The name, seed, stack count, shard count and files of each set, with the
+    seconds each step took
+    :type: dict
+    """
+    log = log or (lambda line: None)
+    processes = processes or multiprocessing.cpu_count()
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    extension = '.xml.gz' if compress else '.xml'
+
+    set_shards = [plan_shards(layout_set.stack_count, shard_size)
+                  for layout_set in layout_sets]
+    plan_jobs = [(layout_set, start, count)
+                 for layout_set, shards in zip(layout_sets, set_shards)
+                 for start, count in shards]
+    results = []
+    write_jobs = []
+    seconds = {}
+    pool = None
+    if processes > 1 and len(plan_jobs) > 1:
+        pool = multiprocessing.Pool(min(processes, len(plan_jobs)))
+    try:
+        step_start = timeit.default_timer()
+        shard_bboxes = iter(_map_jobs(pool, _plan_job, plan_jobs))
+        seconds['plan'] = timeit.default_timer() - step_start
+        log('Planned %d stacks in %d shards (%.3fs)'
+            % (sum(job[2] for job in plan_jobs), len(plan_jobs), seconds['plan']))
+
+        # Each set is laid out across all of its shards
+        step_start = timeit.default_timer()
+        for layout_set, shards in zip(layout_sets, set_shards):
+            stack_bboxes = array('d')
+            for start, count in shards:
+                stack_bboxes.extend(next(shard_bboxes))
+            xs, zs = layout_set.arrange(stack_bboxes)
+
+            paths = []
+            for index, (start, count) in enumerate(shards):
+                if merge:
+                    handle, xml_path = tempfile.mkstemp(extension,
+                                                        '.%s_' % layout_set.name,
+                                                        output_dir)
+                    os.close(handle)
+                else:
+                    xml_path = os.path.join(output_dir, '%s_shard%03d%s'
+                                            % (layout_set.name, index + 1, extension))
+                paths.append(xml_path)
+                write_jobs.append((xml_path, start, xs[start:start + count],
+                                   zs[start:start + count] if zs is not None else None,
+                                   compress, merge))
+            results.append({'name': layout_set.name, 'seed': layout_set.seed,
+                            'stacks': layout_set.stack_count, 'shards': len(shards),
+                            'paths': paths})
+        seconds['arrange'] = timeit.default_timer() - step_start
+        log('Laid out %d sets (%.3fs)' % (len(layout_sets), seconds['arrange']))
+
+        step_start = timeit.default_timer()
+        _map_jobs(pool, _write_job, write_jobs)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    # The pieces of each set are joined into one file
+    if merge:
+        for result in results:
+            xml_path = os.path.join(output_dir, result['name'] + extension)
+            gen_utils.join_stack_xml(result['paths'], xml_path, result['stacks'],
+                                     compress)
+            for fragment_path in result['paths']:
+                os.remove(fragment_path)
+            result['paths'] = [xml_path]
+    seconds['write'] = timeit.default_timer() - step_start
+    log('Wrote %d files (%.3fs)' % (sum(len(result['paths']) for result in results),
+                                    seconds['write']))
+    return {'sets': results, 'seconds': seconds}
+
+
+def main(argv=None):
+    """
+    Generates the layouts of a config from the command line.
+
+    :param argv: The command line arguments. (Def=sys.argv)
+    :type: list of strings
+
+    :return: 0 once the layouts are written
+    :type: int
+    """
+    parser = argparse.ArgumentParser(description='Generate stack layout files from a '
+                                                 'JSON config, without Maya.')
+    parser.add_argument('config', help='JSON config of the sets to lay out')
+    parser.add_argument('--output-dir', default='.',
+                        help='directory to write the layout files to')
+    parser.add_argument('--processes', type=int,
+                        help='processes to run the shards in (default: one per CPU)')
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE,
+                        help='most stacks in a shard')
+    parser.add_argument('--per-shard', action='store_true',
+                        help='write one file per shard instead of one per set')
+    parser.add_argument('--compress', action='store_true',
+                        help='gzip the layout files')
+    args = parser.parse_args(argv)
+    if args.shard_size < 1:
+        parser.error('--shard-size must be at least 1')
+
+    try:
+        layout_sets = load_config(args.config)
+    except (IOError, ValueError) as error:
+        parser.error(str(error))
+
+    def log(line):
+        print(line)
+        sys.stdout.flush()
+
+    summary = generate_layouts(layout_sets, args.output_dir, args.processes,
+                               args.shard_size, not args.per_shard, args.compress, log)
+    for result in summary['sets']:
+        log('%s: %d stacks, seed %d, %d shards -> %s'
+            % (result['name'], result['stacks'], result['seed'], result['shards'],
+               ', '.join(result['paths'])))
+    return 0
+
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- CLASSES --#
+
+
+class LayoutSet(object):
+    """
+    A set of stacks to lay out: its part pools with their bounds and the settings of
+    its build.
+    """
+    def __init__(self, name, pools, stack_count, max_height, separation,
+                 layout_mode='line', seed=None):
+        """
+        :param name: The name of the set, used to name its layout files.
+        :type: str
+
+        :param pools: The name, world space bounding box and translation of each part
+        in the 'top', 'mid' and 'base' pools.
+        :type: dict of lists of tuples (str, list, list)
+
+        :param stack_count: The number of stacks to make.
+        :type: int
+
+        :param max_height: The most middle parts a stack can have.
+        :type: int
+
+        :param separation: The distance between the bounding boxes of two stacks.
+        :type: float
+
+        :param layout_mode: One of arrange.LAYOUT_MODES. (Def='line')
+        :type: str
+
+        :param seed: The seed the parts are picked with. A new seed is picked when
+        this is None. (Def=None)
+        :type: int
+        """
+        self.name = name
+        self.pools = pools
+        self.stack_count = stack_count
+        self.max_height = max_height
+        self.separation = separation
+        self.layout_mode = layout_mode
+        self.seed = recipes.random_seed() if seed is None else seed
+
+    @classmethod
+    def from_config(cls, settings, default_name):
+        """
+        :param settings: The settings of a set from a config, with the defaults
+        filled in.
+        :type: dict
+
+        :param default_name: The name of the set if the settings don't name it.
+        :type: str
+
+        :return: The set. Raises a ValueError if a setting is invalid.
+        :type: LayoutSet
+        """
+        name = settings.get('name', default_name)
+        if not name or os.path.basename(name) != name:
+            raise ValueError('Set name %r can\'t be used as a file name' % name)
+
+        def number(key, kind, minimum):
+            value = settings[key]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or \
+                    (kind is int and value != int(value)) or value < minimum:
+                raise ValueError('Set %r: %s must be a number of at least %s, not %r'
+                                 % (name, key, minimum, value))
+            return kind(value)
+
+        stack_count = number('stack_count', int, 0)
+        max_height = number('max_height', int, 1)
+        separation = number('separation', float, 0.0)
+        seed = None if settings['seed'] is None else number('seed', int, 0)
+        layout_mode = settings['layout_mode']
+        if layout_mode not in arrange.LAYOUT_MODES:
+            raise ValueError('Set %r: unknown layout mode %r, expected one of %s'
+                             % (name, layout_mode, ', '.join(arrange.LAYOUT_MODES)))
+
+        pools = {}
+        bounds = {}
+        for pool in POOLS:
+            parts = []
+            for part in settings.get(pool) or []:
+                try:
+                    part_name = str(part['name'])
+                    bounding_box = [float(value) for value in part['bbox']]
+                    translation = [float(value)
+                                   for value in part.get('translation', (0, 0, 0))]
+                except (KeyError, TypeError, ValueError):
+                    raise ValueError('Set %r: every %s part needs a name and a bbox '
+                                     'of numbers' % (name, pool))
+                if len(bounding_box) != 6 or len(translation) != 3 or \
+                        any(bounding_box[axis] > bounding_box[axis + 3]
+                            for axis in range(3)):
+                    raise ValueError('Set %r: part %r needs a bbox of xmin, ymin, zmin, '
+                                     'xmax, ymax, zmax and a translation of x, y, z'
+                                     % (name, part_name))
+
+                # A part can be in more than one pool, but only with the same bounds
+                if bounds.setdefault(part_name, (bounding_box, translation)) != \
+                        (bounding_box, translation):
+                    raise ValueError('Set %r: part %r has more than one bbox'
+                                     % (name, part_name))
+
+                # The memory backend takes object space bounds
+                object_bbox = [value - translation[index % 3]
+                               for index, value in enumerate(bounding_box)]
+                parts.append((part_name, object_bbox, translation))
+            if not parts:
+                raise ValueError('Set %r has no %s parts' % (name, pool))
+            pools[pool] = parts
+
+        return cls(name, pools, stack_count, max_height, separation, layout_mode, seed)
+
+    def arrange(self, stack_bboxes):
+        """
+        :param stack_bboxes: The bounding box of each stack while it is at the origin,
+        six values per stack one after the other.
+        :type: array of doubles
+
+        :return: The x and z positions of the stacks. The z positions are None in line
+        mode, which leaves the stacks at 0 in z.
+        :type: tuple (array of doubles, array of doubles)
+        """
+        if self.layout_mode == 'line':
+            return get_line_positions(stack_bboxes, self.separation), None
+
+        bounding_boxes = [stack_bboxes[index:index + 6]
+                          for index in range(0, len(stack_bboxes), 6)]
+        positions = arrange.arrange(bounding_boxes, self.layout_mode, self.separation,
+                                    seed=self.seed)
+        return array('d', [x for x, z in positions]), \
+            array('d', [z for x, z in positions])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
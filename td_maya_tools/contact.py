@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Stacks parts on the vertices they actually rest on.
+
+:description:
+    This module works out where parts touch from their vertices instead of their
+    bounding boxes, so rotated and irregular parts neither float above nor sink into
+    the part under them. The vertices of a part are queried as one buffer. The lowest
+    and highest vertices (those within a thin band of the bottom and top of the part)
+    are the ones it rests on and that hold up the part above it. The support point at
+    each end is the centroid of the convex hull of those vertices, seen from above, at
+    the height of the lowest or highest vertex.
+    The bands are found with numpy when it is installed, which also throws away the
+    band vertices that can't be on the hull before the hull is made, so meshes with
+    hundreds of thousands of vertices take milliseconds. Without numpy the same
+    support points are found in pure Python.
+    ContactMetrics works out the support points of each source part once, so the
+    copies of a part never have their geometry scanned.
+
+:applications:
+    Maya, standalone Python
+
+:see_also:
+    metrics.py
+    builder.py
+    scene.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+from array import array
+
+# Imports That You Wrote
+from td_maya_tools import lazy
+from td_maya_tools import metrics
+from td_maya_tools import stacker
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+# The depth of the bottom and top bands, as a share of the height of a part
+BAND_FRACTION = 0.002
+
+# The thinnest a band can be, so flat parts still have a band
+MIN_BAND = 1e-5
+
+# Bands with fewer vertices than this go straight to the hull
+PREFILTER_SIZE = 64
+
+# The directions whose furthest band vertices make the polygon used to throw away
+# vertices inside the hull
+_DIRECTIONS = [(1.0, 0.0), (0.7071067811865476, 0.7071067811865476), (0.0, 1.0),
+               (-0.7071067811865476, 0.7071067811865476), (-1.0, 0.0),
+               (-0.7071067811865476, -0.7071067811865476), (0.0, -1.0),
+               (0.7071067811865476, -0.7071067811865476)]
+
+
+def get_support_profile(points, band_fraction=BAND_FRACTION):
+    """
+    Works out what a part rests on and what it holds up.
+
+    :param points: The world space x, y and z of each vertex, one after the other.
+    :type: array of doubles or list of floats
+
+    :param band_fraction: The depth of the bottom and top bands, as a share of the
+    height of the part. (Def=BAND_FRACTION)
+    :type: float
+
+    :return: The bounds and support points of the vertices, or None if there are no
+    vertices
+    :type: SupportProfile
+    """
+    if not len(points):
+        return None
+
+    numpy = lazy.get_numpy()
+    if numpy is not None:
+        bounding_box, bottom_band, top_band = _find_bands_numpy(numpy, points,
+                                                                band_fraction)
+    else:
+        bounding_box, bottom_band, top_band = _find_bands_python(points, band_fraction)
+
+    bottom_x, bottom_z = support_centroid(bottom_band)
+    top_x, top_z = support_centroid(top_band)
+    return SupportProfile(bounding_box, [bottom_x, bounding_box[1], bottom_z],
+                          [top_x, bounding_box[4], top_z], len(points) // 3)
+
+
+def get_band(ymin, ymax, band_fraction):
+    """
+    :return: How far above the lowest vertex, or below the highest, a vertex can be
+    and still count as resting on or holding up another part
+    :type: float
+    """
+    return max((ymax - ymin) * band_fraction, MIN_BAND)
+
+
+def _find_bands_python(points, band_fraction):
+    points = array('d', points)
+    xs, ys, zs = points[0::3], points[1::3], points[2::3]
+    bounding_box = [min(xs), min(ys), min(zs), max(xs), max(ys), max(zs)]
+
+    band = get_band(bounding_box[1], bounding_box[4], band_fraction)
+    bottom_limit = bounding_box[1] + band
+    top_limit = bounding_box[4] - band
+    bottom_band = [(xs[index], zs[index]) for index, y in enumerate(ys)
+                   if y <= bottom_limit]
+    top_band = [(xs[index], zs[index]) for index, y in enumerate(ys) if y >= top_limit]
+    return bounding_box, bottom_band, top_band
+
+
+def _find_bands_numpy(numpy, points, band_fraction):
+    if isinstance(points, array):
+        vertices = numpy.frombuffer(points, dtype=numpy.float64).reshape(-1, 3)
+    else:
+        vertices = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 3)
+    lowest = vertices.min(axis=0)
+    highest = vertices.max(axis=0)
+    bounding_box = [float(value) for value in lowest] + \
+                   [float(value) for value in highest]
+
+    band = get_band(bounding_box[1], bounding_box[4], band_fraction)
+    ys = vertices[:, 1]
+    bottom_band = vertices[ys <= bounding_box[1] + band][:, 0::2]
+    top_band = vertices[ys >= bounding_box[4] - band][:, 0::2]
+    return bounding_box, _drop_inner_points(numpy, bottom_band), \
+        _drop_inner_points(numpy, top_band)
+
+
+def _drop_inner_points(numpy, band):
+    # Vertices strictly inside the polygon of the furthest vertices in a few
+    # directions can't be on the hull, so the hull is made from far fewer of them
+    if len(band) >= PREFILTER_SIZE:
+        directions = numpy.array(_DIRECTIONS)
+        extremes = band[numpy.argmax(band.dot(directions.T), axis=0)]
+        corners = extremes[numpy.any(extremes != numpy.roll(extremes, 1, axis=0),
+                                     axis=1)]
+        if len(corners) >= 3:
+            edges = numpy.roll(corners, -1, axis=0) - corners
+            relative = band[:, None, :] - corners[None, :, :]
+            cross = edges[None, :, 0] * relative[:, :, 1] - \
+                edges[None, :, 1] * relative[:, :, 0]
+            band = band[~numpy.all(cross > 0.0, axis=1)]
+    return [tuple(point) for point in band.tolist()]
+
+
+def convex_hull(points):
+    """
+    Makes the convex hull of points with Andrew's monotone chain.
+
+    :param points: The (x, z) of each point.
+    :type: list of tuples
+
+    :return: The corners of the hull, counter clockwise in the x-z plane, without
+    points on its edges
+    :type: list of tuples
+    """
+    points = sorted(set(points))
+    if len(points) < 3:
+        return points
+
+    def half(ordered):
+        chain = []
+        for point in ordered:
+            while len(chain) > 1 and \
+                    (chain[-1][0] - chain[-2][0]) * (point[1] - chain[-2][1]) - \
+                    (chain[-1][1] - chain[-2][1]) * (point[0] - chain[-2][0]) <= 0.0:
+                chain.pop()
+            chain.append(point)
+        return chain
+
+    lower = half(points)
+    upper = half(reversed(points))
+    return lower[:-1] + upper[:-1]
+
+
+def support_centroid(points):
+    """
+    :param points: The (x, z) of each vertex in a band.
+    :type: list of tuples
+
+    :return: The (x, z) of the centroid of the convex hull of the points. A hull with
+    no area gives the mean of its corners.
+    :type: tuple
+    """
+    hull = convex_hull(points)
+
+    # Work relative to the first corner to keep the products small
+    origin_x, origin_z = hull[0]
+    area = 0.0
+    sum_x = 0.0
+    sum_z = 0.0
+    for index in range(len(hull)):
+        x0, z0 = hull[index - 1]
+        x1, z1 = hull[index]
+        x0 -= origin_x
+        z0 -= origin_z
+        x1 -= origin_x
+        z1 -= origin_z
+        cross = x0 * z1 - x1 * z0
+        area += cross
+        sum_x += (x0 + x1) * cross
+        sum_z += (z0 + z1) * cross
+
+    if len(hull) < 3 or area == 0.0:
+        return (sum(point[0] for point in hull) / float(len(hull)),
+                sum(point[1] for point in hull) / float(len(hull)))
+    return (origin_x + sum_x / (3.0 * area), origin_z + sum_z / (3.0 * area))
+
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- CLASSES --#
+
+
+class SupportProfile(object):
+    """
+    The bounds of a part's vertices and the points it rests on and holds parts up at.
+    """
+    __slots__ = ('bounding_box', 'bottom', 'top', 'vertex_count')
+
+    def __init__(self, bounding_box, bottom, top, vertex_count):
+        """
+        :param bounding_box: The bounds of the vertices.
+        :type: list (xmin, ymin, zmin, xmax, ymax, zmax)
+
+        :param bottom: The point the part rests on.
+        :type: list (x, y, z)
+
+        :param top: The point the part holds up the part above it at.
+        :type: list (x, y, z)
+
+        :param vertex_count: The number of vertices.
+        :type: int
+        """
+        self.bounding_box = bounding_box
+        self.bottom = bottom
+        self.top = top
+        self.vertex_count = vertex_count
+
+
+class ContactMetrics(metrics.PartMetrics):
+    """
+    Source part bounds taken from their vertices, with the support points of each
+    part worked out once, stacking parts so their support points meet.
+    """
+    def __init__(self, parts, backend=None, band_fraction=BAND_FRACTION):
+        """
+        :param parts: The source parts. Parts listed more than once are scanned once.
+        :type: list of strings
+
+        :param backend: The backend to query. (Def=the active backend)
+        :type: scene.SceneBackend
+
+        :param band_fraction: The depth of the bottom and top bands, as a share of the
+        height of a part. (Def=BAND_FRACTION)
+        :type: float
+        """
+        self.band_fraction = band_fraction
+        self._profiles = {}
+        metrics.PartMetrics.__init__(self, parts, backend)
+
+    def _query(self, parts, backend):
+        for part, translation in zip(parts, backend.translations(parts)):
+            profile = get_support_profile(backend.vertices(part), self.band_fraction)
+            if profile is None:
+                # Parts without meshes fall back on their bounding boxes
+                bounding_box = list(backend.bounding_box(part))
+                profile = SupportProfile(bounding_box,
+                                         stacker.get_bbox_center(bounding_box,
+                                                                 bottom=True),
+                                         stacker.get_bbox_center(bounding_box, top=True),
+                                         0)
+            self._profiles[part] = profile
+            self._bboxes[part] = profile.bounding_box
+            self._translations[part] = translation
+
+    def profile(self, part):
+        """
+        :return: The bounds and support points of a source part
+        :type: SupportProfile
+        """
+        return self._profiles[part]
+
+    def _stack_offsets(self, parts, bounding_boxes):
+        # Only the base has been moved from where its source part is
+        moved = [bounding_boxes[0][axis] - self._bboxes[parts[0]][axis]
+                 for axis in range(3)]
+        offsets = [[0.0, 0.0, 0.0]]
+        for below, above in zip(parts, parts[1:]):
+            top = self._profiles[below].top
+            bottom = self._profiles[above].bottom
+            moved = [top[axis] + moved[axis] - bottom[axis] for axis in range(3)]
+            offsets.append(moved)
+        return offsets
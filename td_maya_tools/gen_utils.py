@@ -14,9 +14,16 @@
     A utility file to handle XML files and XML data
 
 :description:
-    This module is a utility class for the other parts of the stacker code. It has two
-    features. The first is a function which puts the contents of an XML file into a dict
-    and the second is a class which is a Python implementation of the autovivification
+    This module is a utility class for the other parts of the stacker code. It has a
+    function which puts the contents of an XML file into a StackLayout, built on a reader
+    that streams the stacks out of the file one at a time. A StackLayout keeps the stack
+    names with their translations in typed float columns, so a layout with hundreds of
+    thousands of stacks stays small. Layouts can also be saved in a binary format that
+    is mapped straight into memory when it is read, with converters to and from XML.
+    Parsed layouts are kept in a cache so loading an unchanged file again is free.
+    Layout XML is written a stack at a time by StackXmlWriter, optionally gzipped, and
+    gzipped XML files are read the same way as plain ones.
+    The module also has a class which is a Python implementation of the autovivification
     feature in Perl.
 
 :applications:
@@ -30,51 +37,885 @@
 #----------------------------------------------------------------------------- IMPORTS --#
 
 # Default Python Imports
-from xml.dom import minidom
-import xml.etree.ElementTree as et
+from array import array
+from xml.parsers import expat
+import collections
+import gzip
+import hashlib
+import io
+import mmap
 import os
+import shutil
+import struct
+import sys
+import tempfile
 
 # Imports That You Wrote
-
+from td_maya_tools import instrument
+from td_maya_tools import lazy
 
 #----------------------------------------------------------------------------------------#
 #--------------------------------------------------------------------------- FUNCTIONS --#
+
+AXES = ('tx', 'ty', 'tz')
+NAN = float('nan')
+
+# Binary layout files start with a header of the magic bytes, the format version, the
+# number of stacks and the size of the name table
+BINARY_MAGIC = b'TDSTKLYT'
+BINARY_VERSION = 1
+BINARY_HEADER = '<8sIQQ'
+BINARY_EXTENSION = '.stkl'
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# What a layout XML file starts and ends with around its stack elements
+XML_HEAD = '<?xml version="1.0" ?>\n<stacks>\n'
+XML_OPEN = '    <maya_stacks>\n'
+XML_CLOSE = '    </maya_stacks>\n</stacks>\n'
+XML_EMPTY = '    <maya_stacks/>\n</stacks>\n'
+
+# Set this to a directory to keep parsed layouts on disk between sessions
+CACHE_DIR_ENV = 'TD_MAYA_TOOLS_LAYOUT_CACHE'
+
+
+@instrument.timed('xml_parse')
 def read_stack_xml(xml_path):
     """
-    Places the XML contents into a dictionary
+    Places the XML contents into a StackLayout
 
     :param xml_path: the path to an XML file on disk
     :type: str
 
     :return: XML Contents
-    :type: dict
+    :type: StackLayout
     """
     #Make sure file exists
     if not os.path.isfile(xml_path):
-        print'The file does not exist'
+        print('The file does not exist')
         return None
 
-    #Read in the XML and get the root
-    xml_fh = et.parse(xml_path)
-    root = xml_fh.getroot()
-
-    #children
-    contents = Autovivification()
-    main_xml = root.getchildren()
-    for maya_stacks_xml in main_xml:
-        stacks_xml_list = maya_stacks_xml.getchildren()
-        for stack_xml in stacks_xml_list:
-            stack_value = stack_xml.tag
-            for obj_xml in stack_xml:
-                obj_value = obj_xml.tag
-                trans_value = obj_xml.attrib['value']
-                contents[stack_value][obj_value] = trans_value
+    #Collect the streamed stacks
+    contents = StackLayout()
+    for stack_value, transforms in iter_stack_xml(xml_path):
+        contents.add(stack_value, **transforms)
     return contents
 
 
+def iter_stack_xml(xml_path, chunk_size=64 * 1024):
+    """
+    Streams the stacks out of an XML file one at a time, as soon as each stack element
+    has been read. Nothing is kept once a stack has been handed out, so memory use stays
+    close to flat however many stacks the file holds. The only thing that grows is the
+    parser's own table of tag names, a few dozen bytes per stack.
+
+    :param xml_path: the path to an XML file on disk, which can be gzipped
+    :type: str
+
+    :param chunk_size: How many bytes of the file to parse at a time. (Def=64 KB)
+    :type: int
+
+    :return: The stack name and its transform values, e.g. ('stack001', {'tx': 2.0})
+    :type: generator of tuples (str, dict)
+    """
+    reader = _StackXmlReader()
+    try:
+        with open_layout_file(xml_path) as xml_fh:
+            while True:
+                data = xml_fh.read(chunk_size)
+                reader.parser.Parse(data, not data)
+
+                #Hand out the stacks that closed in this chunk
+                finished = reader.finished
+                reader.finished = []
+                for stack in finished:
+                    yield stack
+
+                if not data:
+                    break
+    finally:
+        reader.close()
+
+
+@instrument.timed('xml_write')
+def write_stack_xml(layout, xml_path, compress=None):
+    """
+    Writes a layout to an XML file in the format read_stack_xml reads.
+
+    :param layout: The stacks and their transform values.
+    :type: StackLayout
+
+    :param xml_path: The path of the XML file to write.
+    :type: str
+
+    :param compress: Gzip the file. (Def=when the path ends in .gz)
+    :type: bool
+
+    :return: N/A
+    """
+    with StackXmlWriter(xml_path, compress) as writer:
+        for stack_value, transforms in layout.items():
+            writer.write_stack(stack_value, **transforms)
+
+
+def join_stack_xml(fragment_paths, xml_path, count, compress=None):
+    """
+    Joins files of stack elements written by StackXmlWriter(fragment=True) into one
+    layout XML file, copying their bytes without parsing them. Gzipped fragments are
+    copied as they are, since gzip files can be joined end to end.
+
+    :param fragment_paths: The fragment files, in order.
+    :type: list of strings
+
+    :param xml_path: The path of the XML file to write.
+    :type: str
+
+    :param count: The number of stacks in all of the fragments.
+    :type: int
+
+    :param compress: The fragments are gzipped. (Def=when the path ends in .gz)
+    :type: bool
+
+    :return: N/A
+    """
+    if compress is None:
+        compress = xml_path.endswith('.gz')
+
+    def encode(text):
+        data = text.encode('utf-8')
+        if compress:
+            data = gzip_bytes(data)
+        return data
+
+    with open(xml_path, 'wb') as xml_fh:
+        if not count:
+            xml_fh.write(encode(XML_HEAD + XML_EMPTY))
+            return
+        xml_fh.write(encode(XML_HEAD + XML_OPEN))
+        for fragment_path in fragment_paths:
+            with open(fragment_path, 'rb') as fragment_fh:
+                shutil.copyfileobj(fragment_fh, xml_fh, 1024 * 1024)
+        xml_fh.write(encode(XML_CLOSE))
+
+
+def gzip_bytes(data):
+    """
+    :param data: The bytes to compress.
+    :type: bytes
+
+    :return: The bytes as a gzip file
+    :type: bytes
+    """
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode='wb', compresslevel=6) as gzip_fh:
+        gzip_fh.write(data)
+    return buf.getvalue()
+
+
+def open_layout_file(layout_path):
+    """
+    :param layout_path: the path to a layout file on disk
+    :type: str
+
+    :return: The file opened for reading bytes, unzipping it if it is gzipped
+    :type: file
+    """
+    with open(layout_path, 'rb') as layout_fh:
+        is_gzip = layout_fh.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+    if is_gzip:
+        return gzip.open(layout_path, 'rb')
+    return open(layout_path, 'rb')
+
+
+def format_value(value):
+    """
+    :param value: A transform value.
+    :type: float
+
+    :return: The shortest text that reads back as the same value, without a trailing
+    '.0' for whole numbers
+    :type: str
+    """
+    text = repr(float(value))
+    if text.endswith('.0'):
+        text = text[:-2]
+    return text
+
+
+def is_stack_binary(layout_path):
+    """
+    :param layout_path: the path to a layout file on disk
+    :type: str
+
+    :return: Whether the file is a binary layout file rather than XML
+    :type: bool
+    """
+    with open(layout_path, 'rb') as layout_fh:
+        return layout_fh.read(len(BINARY_MAGIC)) == BINARY_MAGIC
+
+
+def write_stack_binary(layout, binary_path):
+    """
+    Writes a layout to a binary file. The file holds a header, a table of the stack
+    names and then the tx, ty and tz columns as one contiguous block of little endian
+    float64 values, so it can be mapped straight into memory when it is read.
+
+    :param layout: The stacks and their transform values.
+    :type: StackLayout
+
+    :param binary_path: The path of the binary file to write.
+    :type: str
+
+    :return: N/A
+    """
+    names = u'\0'.join(layout.names).encode('utf-8')
+    header = struct.pack(BINARY_HEADER, BINARY_MAGIC, BINARY_VERSION, len(layout),
+                         len(names))
+
+    #Line the float block up on 8 bytes
+    padding = -(len(header) + len(names)) % 8
+
+    with open(binary_path, 'wb') as binary_fh:
+        binary_fh.write(header)
+        binary_fh.write(names)
+        binary_fh.write(b'\0' * padding)
+        for column in (layout.tx, layout.ty, layout.tz):
+            column = array('d', column)
+            if sys.byteorder != 'little':
+                column.byteswap()
+            binary_fh.write(_array_bytes(column))
+
+
+@instrument.timed('binary_load')
+def read_stack_binary(binary_path, copy=False):
+    """
+    Maps a binary layout file into memory. The transform values are not parsed or
+    copied, the columns of the layout read straight from the mapped file, so even very
+    large layouts open almost instantly. The layout can still be added to, which copies
+    the columns first.
+    A mapped file can't be changed or deleted on Windows until the layout is closed or
+    freed, so layouts that are kept around should be read with copy, which reads the
+    columns into arrays and closes the file straight away.
+
+    :param binary_path: the path to a binary layout file on disk
+    :type: str
+
+    :param copy: Read the columns into arrays instead of mapping them. (Def=False)
+    :type: bool
+
+    :return: The stacks and their transform values. Raises a ValueError if the file
+    isn't a binary layout or has been cut short.
+    :type: StackLayout
+    """
+    with open(binary_path, 'rb') as binary_fh:
+        header = binary_fh.read(struct.calcsize(BINARY_HEADER))
+        magic, version, count, names_size = struct.unpack(BINARY_HEADER, header)
+        if magic != BINARY_MAGIC or version != BINARY_VERSION:
+            raise ValueError('%s is not a version %d binary layout file' %
+                             (binary_path, BINARY_VERSION))
+
+        # A file cut short is refused the same way whether it is mapped or copied
+        start = len(header) + names_size
+        start += -start % 8
+        if os.fstat(binary_fh.fileno()).st_size < start + count * 8 * 3:
+            raise ValueError('%s has been cut short' % binary_path)
+        names = binary_fh.read(names_size).decode('utf-8')
+
+        mapped = None
+        if copy or not count:
+            binary_fh.seek(start)
+            columns = _load_columns(binary_fh.read(count * 8 * 3), count)
+        else:
+            mapped = mmap.mmap(binary_fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    layout = StackLayout()
+    layout.names = names.split(u'\0') if count else []
+    layout.index = dict(zip(layout.names, range(count)))
+    if mapped is not None:
+        columns, layout._mapped = _map_columns(mapped, start, count)
+    layout.tx, layout.ty, layout.tz = columns
+    return layout
+
+
+def xml_to_binary(xml_path, binary_path):
+    """
+    Converts a layout XML file to a binary layout file.
+
+    :param xml_path: the path to an XML file on disk
+    :type: str
+
+    :param binary_path: The path of the binary file to write.
+    :type: str
+
+    :return: N/A
+    """
+    write_stack_binary(read_stack_xml(xml_path), binary_path)
+
+
+def binary_to_xml(binary_path, xml_path):
+    """
+    Converts a binary layout file to a layout XML file.
+
+    :param binary_path: the path to a binary layout file on disk
+    :type: str
+
+    :param xml_path: The path of the XML file to write.
+    :type: str
+
+    :return: N/A
+    """
+    write_stack_xml(read_stack_binary(binary_path), xml_path)
+
+
+def read_stack_layout(layout_path, copy=False):
+    """
+    Reads a layout file, choosing the reader from the type of the file.
+
+    :param layout_path: the path to an XML or binary layout file on disk
+    :type: str
+
+    :param copy: Read a binary file into arrays instead of mapping it, see
+    read_stack_binary. (Def=False)
+    :type: bool
+
+    :return: The stacks and their transform values, or None if the file doesn't exist
+    :type: StackLayout
+    """
+    if os.path.isfile(layout_path) and is_stack_binary(layout_path):
+        return read_stack_binary(layout_path, copy)
+    return read_stack_xml(layout_path)
+
+
+def iter_stack_layout(layout_path):
+    """
+    Streams the stacks out of a layout file, choosing the reader from the type of the
+    file.
+
+    :param layout_path: the path to an XML or binary layout file on disk
+    :type: str
+
+    :return: The stack name and its transform values, e.g. ('stack001', {'tx': 2.0})
+    :type: generator of tuples (str, dict)
+    """
+    if is_stack_binary(layout_path):
+        return read_stack_binary(layout_path).items()
+    return iter_stack_xml(layout_path)
+
+
+def get_layout_cache():
+    """
+    Returns the layout cache shared by the tools. It is created the first time, with an
+    on-disk cache in the directory named by the TD_MAYA_TOOLS_LAYOUT_CACHE environment
+    variable if it is set.
+
+    :return: The shared layout cache
+    :type: LayoutCache
+    """
+    global _layout_cache
+    if _layout_cache is None:
+        _layout_cache = LayoutCache(cache_dir=os.environ.get(CACHE_DIR_ENV) or None)
+    return _layout_cache
+
+
+_layout_cache = None
+
+
+def _map_columns(mapped, start, count):
+    #Zero copy views with numpy or memoryview, else one bulk copy into arrays and the
+    #map is closed
+    numpy = lazy.get_numpy()
+    if numpy is not None:
+        columns = numpy.frombuffer(mapped, dtype='<f8', count=count * 3,
+                                   offset=start).reshape(3, count)
+        return (columns[0], columns[1], columns[2]), mapped
+
+    size = count * 8
+    if sys.byteorder == 'little' and hasattr(memoryview, 'cast'):
+        view = memoryview(mapped)
+        return [view[start + size * axis:start + size * (axis + 1)].cast('d')
+                for axis in range(3)], mapped
+
+    columns = _load_columns(mapped[start:start + size * 3], count)
+    mapped.close()
+    return columns, None
+
+
+def _load_columns(data, count):
+    #The three little endian float64 columns of a binary file as arrays
+    size = count * 8
+    columns = []
+    for axis in range(3):
+        column = array('d')
+        _array_load(column, data[size * axis:size * (axis + 1)])
+        if sys.byteorder != 'little':
+            column.byteswap()
+        columns.append(column)
+    return columns
+
+
+def _copy_column(column):
+    #A mapped column as an array, which holds its own copy of the values
+    if isinstance(column, array):
+        return column
+    copy = array('d')
+    _array_load(copy, column.tobytes())
+    if sys.byteorder != 'little':
+        copy.byteswap()
+    return copy
+
+
+def _array_bytes(column):
+    #Python 2 arrays only have tostring
+    return column.tobytes() if hasattr(column, 'tobytes') else column.tostring()
+
+
+def _array_load(column, data):
+    #Python 2 arrays only have fromstring
+    if hasattr(column, 'frombytes'):
+        column.frombytes(data)
+    else:
+        column.fromstring(data)
+
+
 #----------------------------------------------------------------------------------------#
 #----------------------------------------------------------------------------- CLASSES --#
 
+class _StackXmlReader(object):
+    """
+    Collects the stacks of a layout XML file as an expat parser reads it. The parser is
+    used directly because ElementTree keeps every distinct tag name it sees, and every
+    stack in a layout file has its own tag.
+    """
+    def __init__(self):
+        self.parser = expat.ParserCreate(intern=None)
+        self.parser.StartElementHandler = self.start_element
+        self.parser.EndElementHandler = self.end_element
+        self.depth = 0
+        self.stack_value = None
+        self.transforms = None
+        self.finished = []
+
+    def start_element(self, tag, attrib):
+        self.depth += 1
+
+        #<stacks><maya_stacks><stackNNN><tx value="..."/>
+        if self.depth == 3:
+            self.stack_value = tag
+            self.transforms = {}
+        elif self.depth == 4:
+            self.transforms[tag] = float(attrib['value'])
+
+    def end_element(self, tag):
+        if self.depth == 3:
+            self.finished.append((self.stack_value, self.transforms))
+            self.transforms = None
+        self.depth -= 1
+
+    def close(self):
+        #The handlers point back at the reader, so break the cycle to free the parser
+        self.parser.StartElementHandler = None
+        self.parser.EndElementHandler = None
+        self.parser = None
+
+
+class StackXmlWriter(object):
+    """
+    Writes a layout XML file a stack at a time, so only a small buffer of stacks is held
+    in memory however many are written. The file matches the one write_stack_xml has
+    always made. Used as a context manager the file is finished when the block ends.
+    A fragment holds only the stack elements, to be joined with join_stack_xml.
+    """
+    def __init__(self, xml_path, compress=None, buffer_size=1024, fragment=False):
+        """
+        :param xml_path: The path of the XML file to write.
+        :type: str
+
+        :param compress: Gzip the file. (Def=when the path ends in .gz)
+        :type: bool
+
+        :param buffer_size: How many stacks to collect before writing them. (Def=1024)
+        :type: int
+
+        :param fragment: Write the stack elements without the rest of the file.
+        (Def=False)
+        :type: bool
+        """
+        if compress is None:
+            compress = xml_path.endswith('.gz')
+        if compress:
+            self._fh = gzip.open(xml_path, 'wb', 6)
+        else:
+            self._fh = open(xml_path, 'wb')
+        self.count = 0
+        self.buffer_size = buffer_size
+        self.fragment = fragment
+        self._buffer = [] if fragment else [XML_HEAD]
+
+    def write_stack(self, name, tx=None, ty=None, tz=None):
+        """
+        Adds a stack to the file. Axes that are None or NaN are left out.
+
+        :param name: The name of the stack group.
+        :type: str
+
+        :return: N/A
+        """
+        lines = self._buffer
+        if not self.count and not self.fragment:
+            lines.append(XML_OPEN)
+
+        values = [(axis, value) for axis, value in zip(AXES, (tx, ty, tz))
+                  if value is not None and value == value]
+        if values:
+            lines.append('        <%s>\n' % name)
+            for axis, value in values:
+                lines.append('            <%s value="%s"/>\n'
+                             % (axis, format_value(value)))
+            lines.append('        </%s>\n' % name)
+        else:
+            lines.append('        <%s/>\n' % name)
+
+        self.count += 1
+        if not self.count % self.buffer_size:
+            self._flush()
+
+    def close(self):
+        """
+        Ends the file and closes it.
+
+        :return: N/A
+        """
+        if self._fh is None:
+            return
+        if not self.fragment:
+            self._buffer.append(XML_CLOSE if self.count else XML_EMPTY)
+        self._flush()
+        self._fh.close()
+        self._fh = None
+
+    def _flush(self):
+        self._fh.write(''.join(self._buffer).encode('utf-8'))
+        self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class StackLayout(object):
+    """
+    The translations of a set of stacks, stored as a list of stack names with a typed
+    float column per axis and a name to row lookup. An axis a stack doesn't set is kept
+    as NaN. Looking up a stack that isn't in the layout raises a KeyError and never adds
+    anything. Layouts can be pickled, e.g. to send them back from a process pool.
+    A layout mapped from a binary file keeps the file open until it is closed or freed.
+    """
+    __slots__ = ('names', 'index', 'tx', 'ty', 'tz', '_mapped')
+
+    def __init__(self):
+        self.names = []
+        self.index = {}
+        self.tx = array('d')
+        self.ty = array('d')
+        self.tz = array('d')
+        self._mapped = None
+
+    def add(self, name, tx=None, ty=None, tz=None):
+        """
+        Adds a stack, or updates the axes given for a stack that is already in the
+        layout.
+
+        :param name: The name of the stack group.
+        :type: str
+
+        :param tx: The translation in x, or None if the stack doesn't set it.
+        :type: float
+
+        :param ty: The translation in y, or None if the stack doesn't set it.
+        :type: float
+
+        :param tz: The translation in z, or None if the stack doesn't set it.
+        :type: float
+
+        :return: The row of the stack
+        :type: int
+        """
+        #Mapped columns are read only, so copy them before changing anything
+        self.close()
+        if not isinstance(self.tx, array):
+            self.tx, self.ty, self.tz = [array('d', column)
+                                         for column in (self.tx, self.ty, self.tz)]
+
+        row = self.index.get(name)
+        if row is None:
+            row = len(self.names)
+            self.index[name] = row
+            self.names.append(name)
+            for column in (self.tx, self.ty, self.tz):
+                column.append(NAN)
+
+        for column, value in ((self.tx, tx), (self.ty, ty), (self.tz, tz)):
+            if value is not None:
+                column[row] = value
+        return row
+
+    def translation(self, name):
+        """
+        :param name: The name of a stack group in the layout.
+        :type: str
+
+        :return: The (tx, ty, tz) of the stack, with NaN for axes it doesn't set
+        :type: tuple of floats
+        """
+        row = self._row(name)
+        return float(self.tx[row]), float(self.ty[row]), float(self.tz[row])
+
+    def keys(self):
+        """
+        :return: The stack names in the order they were added
+        :type: list of strings
+        """
+        return list(self.names)
+
+    def items(self):
+        """
+        :return: Each stack name with its transform values
+        :type: generator of tuples (str, dict)
+        """
+        for name in self.names:
+            yield name, self[name]
+
+    def get(self, name, default=None):
+        """
+        :param name: The name of a stack group.
+        :type: str
+
+        :param default: What to return if the stack isn't in the layout. (Def=None)
+
+        :return: The transform values the stack sets, e.g. {'tx': 2.0}
+        :type: dict
+        """
+        if name not in self.index:
+            return default
+        return self[name]
+
+    def close(self):
+        """
+        Copies the columns of a layout mapped from a binary file into arrays and closes
+        the file, so it can be changed or deleted. The layout can still be used. Does
+        nothing for a layout that isn't mapped.
+
+        :return: N/A
+        """
+        mapped = self._mapped
+        if mapped is None:
+            return
+        self._mapped = None
+        self.tx, self.ty, self.tz = [_copy_column(column)
+                                     for column in (self.tx, self.ty, self.tz)]
+        #Python 2 doesn't check whether a map is still in use before closing it, so
+        #there, and whenever a column taken from the layout before it was closed is
+        #still in use, the map is closed once nothing uses it
+        if hasattr(memoryview, 'cast'):
+            try:
+                mapped.close()
+            except BufferError:
+                pass
+
+    def nbytes(self):
+        """
+        :return: Roughly how many bytes the layout takes up
+        :type: int
+        """
+        columns = sum(column.itemsize * len(column)
+                      for column in (self.tx, self.ty, self.tz))
+        names = sum(sys.getsizeof(name) for name in self.names)
+        return sys.getsizeof(self.names) + sys.getsizeof(self.index) + names + columns
+
+    def _row(self, name):
+        try:
+            return self.index[name]
+        except KeyError:
+            raise KeyError('Stack %s is not in the layout' % name)
+
+    def __getitem__(self, name):
+        values = self.translation(name)
+        return dict((axis, value) for axis, value in zip(AXES, values)
+                    if value == value)
+
+    def __getstate__(self):
+        #Mapped columns can't be pickled, so they are sent as arrays
+        return self.names, [_copy_column(column)
+                            for column in (self.tx, self.ty, self.tz)]
+
+    def __setstate__(self, state):
+        self.names, (self.tx, self.ty, self.tz) = state
+        self.index = dict(zip(self.names, range(len(self.names))))
+        self._mapped = None
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+
+class LayoutCache(object):
+    """
+    Keeps parsed layouts so loading the same file again is free. Entries are keyed on
+    the absolute path, modification time and size of the file, plus a hash of the
+    contents for small files, and a file that has changed is always parsed again. The
+    cache holds at most max_entries layouts and max_bytes of layout data, dropping the
+    least recently used first. With a cache_dir, parsed layouts are also saved there as
+    binary layout files so later sessions can read them instead of parsing. Binary
+    layouts are read into arrays rather than mapped, so no file is held open by the
+    cache. Layouts handed out are shared with the cache and should not be changed.
+    """
+    def __init__(self, max_entries=16, max_bytes=256 * 1024 * 1024, cache_dir=None,
+                 hash_limit=1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.hash_limit = hash_limit
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.evictions = 0
+        self.total_bytes = 0
+        self._entries = collections.OrderedDict()
+
+    @instrument.timed('layout_load')
+    def load(self, layout_path):
+        """
+        Returns the parsed layout of a file, from the cache when the file hasn't changed.
+
+        :param layout_path: the path to an XML or binary layout file on disk
+        :type: str
+
+        :return: The stacks and their transform values, or None if the file doesn't
+        exist
+        :type: StackLayout
+        """
+        if not os.path.isfile(layout_path):
+            print('The file does not exist')
+            return None
+
+        key = self.file_key(layout_path)
+        entry = self._entries.get(key[0])
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            self._entries.pop(key[0])
+            self._entries[key[0]] = entry
+            return entry[1]
+
+        # The file is new or has changed since it was cached
+        self.misses += 1
+        if entry is not None:
+            self._remove(key[0])
+        layout = self._load_from_disk(key)
+        if layout is None:
+            layout = read_stack_layout(layout_path, copy=True)
+            self._save_to_disk(key, layout)
+        self._add(key, layout)
+        return layout
+
+    def file_key(self, layout_path):
+        """
+        :param layout_path: the path to a layout file on disk
+        :type: str
+
+        :return: The absolute path, modification time and size of the file, and a hash
+        of its contents if it is no bigger than hash_limit
+        :type: tuple
+        """
+        abs_path = os.path.abspath(layout_path)
+        stat = os.stat(abs_path)
+        mtime = getattr(stat, 'st_mtime_ns', stat.st_mtime)
+
+        content_hash = None
+        if stat.st_size <= self.hash_limit:
+            with open(abs_path, 'rb') as layout_fh:
+                content_hash = hashlib.sha1(layout_fh.read()).hexdigest()
+        return abs_path, mtime, stat.st_size, content_hash
+
+    def stats(self):
+        """
+        :return: The hit, miss, disk hit and eviction counts, with the number of entries
+        and bytes held
+        :type: dict
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'disk_hits': self.disk_hits,
+                'evictions': self.evictions, 'entries': len(self._entries),
+                'bytes': self.total_bytes}
+
+    def clear(self):
+        """
+        Drops every layout held in memory. The on-disk cache is left alone.
+
+        :return: N/A
+        """
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def _add(self, key, layout):
+        nbytes = layout.nbytes()
+        if nbytes > self.max_bytes:
+            return
+        self._entries[key[0]] = (key, layout, nbytes)
+        self.total_bytes += nbytes
+
+        # Drop the least recently used layouts until the limits are met
+        while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, abs_path):
+        entry = self._entries.pop(abs_path)
+        self.total_bytes -= entry[2]
+
+    def _disk_path(self, key):
+        name = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, name + BINARY_EXTENSION)
+
+    def _load_from_disk(self, key):
+        if not self.cache_dir:
+            return None
+        disk_path = self._disk_path(key)
+        if not os.path.isfile(disk_path):
+            return None
+        try:
+            layout = read_stack_binary(disk_path, copy=True)
+        except (IOError, OSError, ValueError, struct.error):
+            return None
+        self.disk_hits += 1
+        return layout
+
+    def _save_to_disk(self, key, layout):
+        if not self.cache_dir or layout is None:
+            return
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+        # Write to a temporary file first so a half written file is never read
+        handle, temp_path = tempfile.mkstemp(suffix=BINARY_EXTENSION, dir=self.cache_dir)
+        os.close(handle)
+        try:
+            write_stack_binary(layout, temp_path)
+            disk_path = self._disk_path(key)
+            if hasattr(os, 'replace'):
+                os.replace(temp_path, disk_path)
+            else:
+                os.rename(temp_path, disk_path)
+        except (IOError, OSError):
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
 class Autovivification(dict):
     """
     This is a python implementation of Perl's autovivification feature
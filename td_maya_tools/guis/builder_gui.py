@@ -21,39 +21,66 @@
     geometry from the three sectioned out groups (base, middle, top).
     Random objects will be selected from the 3 groups of objects and they will be used
     to make the stacks.
+    The stacks that were made are listed in a tree that can be filtered by name.
+    Stacks are built a chunk at a time between GUI events, with a progress bar and a
+    'Cancel Build' button that deletes everything the build has made so far.
+    The stacks in the scene can be exported to a layout XML file with 'Export XML', and
+    'Load Folder' applies every layout file in a folder at once.
+    Builds are recorded in a journal file once one is set, and 'Replay Journal' makes
+    the stacks of a journal again without working them out.
+    The Maya UI modules are only imported when the window opens. Set TD_MAYA_TOOLS_DEV
+    to have the tools reloaded each time this module is imported again.
 
 :applications:
     Maya
 
 :see_also:
     stacker.py
+    builder.py
 """
 
 #----------------------------------------------------------------------------------------#
 #----------------------------------------------------------------------------- IMPORTS --#
 
 # Default Python Imports
-import maya.cmds as cmds
-from maya import OpenMayaUI as omui
-from PySide2 import QtGui, QtWidgets
-from shiboken2 import wrapInstance
-import random
+import time
+
+from PySide2 import QtCore, QtWidgets
 
 # Imports That You Wrote
-from td_maya_tools import stacker;reload(stacker)
-from td_maya_tools import gen_utils;reload(gen_utils)
+from td_maya_tools import lazy
+from td_maya_tools import scene
+from td_maya_tools import arrange
+from td_maya_tools import builder
+from td_maya_tools import gen_utils
+from td_maya_tools import instrument
+from td_maya_tools import journal
+from td_maya_tools import layout
+from td_maya_tools import recipes
+from td_maya_tools import validation
+from td_maya_tools.guis import stack_model
+
+# Pick up edits to the tools when the GUI is imported again, in development mode only
+lazy.reload_if_dev_mode()
 
 #----------------------------------------------------------------------------------------#
 #--------------------------------------------------------------------------- FUNCTIONS --#
 
+# The seconds each chunk of a build should take, so the GUI stays responsive
+FRAME_BUDGET = 0.05
+
 
 def get_maya_window():
     """
     :return: A pointer to the Maya window
     :type: pointer
     """
+    # The Maya UI modules are only needed once a window is opened
+    from maya import OpenMayaUI as omui
+    from shiboken2 import wrapInstance
+
     maya_main_window_ptr = omui.MQtUtil.mainWindow()
-    return wrapInstance(long(maya_main_window_ptr), QtWidgets.QWidget)
+    return wrapInstance(int(maya_main_window_ptr), QtWidgets.QWidget)
 
 
 #----------------------------------------------------------------------------------------#
@@ -72,16 +99,38 @@ class BuilderGUI(QtWidgets.QDialog):
         self.main_hLayout = None
         self.optLayout = None
         self.tree_view = None
+        self.stack_model = None
+        self.tree_selection = None
+        self.filter_lineEdit = None
         self.top_lineEdit = None
         self.mid_lineEdit = None
         self.base_lineEdit = None
         self.top_objs = []
         self.mid_objs = []
         self.base_objs = []
+        self.duplicate_lineEdit = None
+        self.duplicate_objs = []
+        self.journal_lineEdit = None
+        self.journal_path = ''
         self.stack_box = None
         self.height_box = None
         self.offset_box = None
-        
+        self.instance_box = None
+        self.contact_box = None
+        self.template_box = None
+        self.seed_box = None
+        self.layout_box = None
+        self.conflict_box = None
+        self.progress_bar = None
+        self.progress_label = None
+        self.stack_button = None
+        self.cancel_build_button = None
+        self.build = None
+        self.validator = None
+        self.build_timer = None
+        self.build_start = 0.0
+        self.chunk_size = 1
+
     def init_gui(self):
         """
         Builds GUI window with the ability to set selected objects, set stack size,
@@ -96,15 +145,46 @@ class BuilderGUI(QtWidgets.QDialog):
         # Call make_options_layout to get the options layout portion of the GUI.
         self.main_hLayout.addLayout(self.make_options_layout())
 
-        # Add tree view widget that tracks added stack groups
-        self.tree_view = QtWidgets.QTreeWidget()
-        self.tree_view.setHeaderLabel('Object Stacks')
-        self.main_hLayout.addWidget(self.tree_view)
+        # Add tree view widget that tracks added stack groups, with a line edit above it
+        # that filters the stacks by name
+        tree_vLayout = QtWidgets.QVBoxLayout()
+        self.filter_lineEdit = QtWidgets.QLineEdit()
+        self.filter_lineEdit.setPlaceholderText('Filter Stacks')
+        self.stack_model = stack_model.StackTreeModel(self)
+        self.filter_lineEdit.textChanged.connect(self.stack_model.set_filter)
+        self.tree_view = QtWidgets.QTreeView()
+        self.tree_view.setUniformRowHeights(True)
+        self.tree_view.setModel(self.stack_model)
+        tree_vLayout.addWidget(self.filter_lineEdit)
+        tree_vLayout.addWidget(self.tree_view)
+        self.main_hLayout.addLayout(tree_vLayout)
+
+        # Clicking on an item in the tree view selects that item in Maya. The selection
+        # model is kept so it isn't garbage collected
+        self.tree_selection = self.tree_view.selectionModel()
+        self.tree_selection.currentChanged.connect(self.tree_item_clicked)
 
         # Add widgets to horizontal layout
         self.main_vLayout.addLayout(self.main_hLayout)
 
-        # A horizontal layout to hold the 'Load XML', 'Make Stacks', and 'Cancel' buttons
+        # A progress bar, label and button for builds, shown while a build is running
+        progress_hLayout = QtWidgets.QHBoxLayout()
+        self.main_vLayout.addLayout(progress_hLayout)
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_label = QtWidgets.QLabel()
+        self.cancel_build_button = QtWidgets.QPushButton('Cancel Build')
+        self.cancel_build_button.clicked.connect(self.cancel_build)
+        progress_hLayout.addWidget(self.progress_bar)
+        progress_hLayout.addWidget(self.progress_label)
+        progress_hLayout.addWidget(self.cancel_build_button)
+
+        # A timer that builds the next chunk of stacks each time the event loop is idle
+        self.build_timer = QtCore.QTimer(self)
+        self.build_timer.setInterval(0)
+        self.build_timer.timeout.connect(self.build_chunk)
+
+        # A horizontal layout to hold the 'Load XML', 'Export XML', 'Replay Journal',
+        # 'Make Stacks', and 'Cancel' buttons
         buttons_hLayout = QtWidgets.QHBoxLayout()
         self.main_vLayout.addLayout(buttons_hLayout)
 
@@ -113,10 +193,27 @@ class BuilderGUI(QtWidgets.QDialog):
         xml_button.setStyleSheet("background-color: DarkOrange")
         xml_button.clicked.connect(self.apply_xml)
 
+        # A 'Load Folder' button to load every layout file in a folder by calling
+        # 'apply_layout_folder'
+        folder_button = QtWidgets.QPushButton('Load Folder')
+        folder_button.setStyleSheet("background-color: DarkOrange")
+        folder_button.clicked.connect(self.apply_layout_folder)
+
+        # An 'Export XML' button to save the stacks in the scene by calling 'export_xml'
+        export_button = QtWidgets.QPushButton('Export XML')
+        export_button.setStyleSheet("background-color: DarkOrange")
+        export_button.clicked.connect(self.export_xml)
+
+        # A 'Replay Journal' button to make the stacks of a journal by calling
+        # 'replay_journal'
+        replay_button = QtWidgets.QPushButton('Replay Journal')
+        replay_button.setStyleSheet("background-color: DarkOrange")
+        replay_button.clicked.connect(self.replay_journal)
+
         # A 'Make Stacks' button to make each stack by calling 'make_stacks'
-        stack_button = QtWidgets.QPushButton('Make Stacks')
-        stack_button.setStyleSheet("background-color: green")
-        stack_button.clicked.connect(self.make_stacks)
+        self.stack_button = QtWidgets.QPushButton('Make Stacks')
+        self.stack_button.setStyleSheet("background-color: green")
+        self.stack_button.clicked.connect(self.make_stacks)
 
         # A 'Cancel' button, which calls 'self.close' to close the GUI
         cancel_button = QtWidgets.QPushButton('Cancel')
@@ -125,8 +222,12 @@ class BuilderGUI(QtWidgets.QDialog):
 
         # Add the buttons to the button row
         buttons_hLayout.addWidget(xml_button)
-        buttons_hLayout.addWidget(stack_button)
+        buttons_hLayout.addWidget(folder_button)
+        buttons_hLayout.addWidget(export_button)
+        buttons_hLayout.addWidget(replay_button)
+        buttons_hLayout.addWidget(self.stack_button)
         buttons_hLayout.addWidget(cancel_button)
+        self.show_progress(False)
 
         # Configure the window
         self.setGeometry(300, 300, 450, 250)
@@ -140,7 +241,11 @@ class BuilderGUI(QtWidgets.QDialog):
         acknowledge when the top, middle, and bottom parts have been set, 3 labels
         indicating the stack count, max height, and separation values, and 3 spin boxes
         which allow the user to set the values for the stack count, max height, and
-        separation values.
+        separation values. A spin box sets the seed the parts are picked with and a combo
+        box picks how the stacks are laid out. A check box switches to instancing the
+        parts, with a button and line edit for the parts that should still be fully
+        duplicated. A button and line edit set the journal builds are recorded in, and a
+        last combo box picks how folders of layout files settle conflicting stacks.
 
         :return: QFormLayout
         """
@@ -154,6 +259,12 @@ class BuilderGUI(QtWidgets.QDialog):
         stack_hLayout = QtWidgets.QHBoxLayout()
         height_hLayout = QtWidgets.QHBoxLayout()
         offset_hLayout = QtWidgets.QHBoxLayout()
+        seed_hLayout = QtWidgets.QHBoxLayout()
+        layout_hLayout = QtWidgets.QHBoxLayout()
+        instance_hLayout = QtWidgets.QHBoxLayout()
+        duplicate_hLayout = QtWidgets.QHBoxLayout()
+        journal_hLayout = QtWidgets.QHBoxLayout()
+        conflict_hLayout = QtWidgets.QHBoxLayout()
 
         # Add the row layouts to the main layout
         self.optLayout.addRow(top_hLayout)
@@ -162,6 +273,12 @@ class BuilderGUI(QtWidgets.QDialog):
         self.optLayout.addRow(stack_hLayout)
         self.optLayout.addRow(height_hLayout)
         self.optLayout.addRow(offset_hLayout)
+        self.optLayout.addRow(seed_hLayout)
+        self.optLayout.addRow(layout_hLayout)
+        self.optLayout.addRow(instance_hLayout)
+        self.optLayout.addRow(duplicate_hLayout)
+        self.optLayout.addRow(journal_hLayout)
+        self.optLayout.addRow(conflict_hLayout)
 
         # Create the buttons and line edits
         button1 = QtWidgets.QPushButton('Set Top Parts')
@@ -223,6 +340,71 @@ class BuilderGUI(QtWidgets.QDialog):
         offset_hLayout.addWidget(offset_label)
         offset_hLayout.addWidget(self.offset_box)
 
+        # A label and a spin box for the seed, where the lowest value picks a new seed
+        seed_label = QtWidgets.QLabel('Set Seed')
+        self.seed_box = QtWidgets.QSpinBox()
+        self.seed_box.setRange(-1, recipes.MAX_SEED)
+        self.seed_box.setSpecialValueText('Random')
+        self.seed_box.setValue(-1)
+
+        # Add the label / spin box to the a new row
+        seed_hLayout.addWidget(seed_label)
+        seed_hLayout.addWidget(self.seed_box)
+
+        # A label and a combo box that picks how the stacks are laid out
+        layout_label = QtWidgets.QLabel('Set Layout')
+        self.layout_box = QtWidgets.QComboBox()
+        self.layout_box.addItems(list(arrange.LAYOUT_MODES))
+
+        # Add the label / combo box to the a new row
+        layout_hLayout.addWidget(layout_label)
+        layout_hLayout.addWidget(self.layout_box)
+
+        # A check box that makes instances of the parts instead of duplicates
+        self.instance_box = QtWidgets.QCheckBox('Instance Geometry')
+        instance_hLayout.addWidget(self.instance_box)
+
+        # A check box that stacks parts on their vertices instead of bounding boxes
+        self.contact_box = QtWidgets.QCheckBox('Contact Stacking')
+        instance_hLayout.addWidget(self.contact_box)
+
+        # A check box that copies stacks with the same parts instead of rebuilding them.
+        # It is off by default since the copied parts are named differently
+        self.template_box = QtWidgets.QCheckBox('Reuse Stack Templates (Renames Parts)')
+        self.template_box.setToolTip('Copy stacks with the same parts as one already '
+                                     'built. Every part ends up where it would without '
+                                     'it, but the copied parts are named differently '
+                                     'from a build without templates.')
+        instance_hLayout.addWidget(self.template_box)
+
+        # A button and line edit for the parts that are always fully duplicated
+        button4 = QtWidgets.QPushButton('Set Duplicate Parts')
+        button4.setObjectName('button4')
+        button4.clicked.connect(self.set_selection)
+        self.duplicate_lineEdit = QtWidgets.QLineEdit()
+        self.duplicate_lineEdit.setEnabled(False)
+        duplicate_hLayout.addWidget(button4)
+        duplicate_hLayout.addWidget(self.duplicate_lineEdit)
+
+        # A button and line edit for the journal builds are recorded in
+        journal_button = QtWidgets.QPushButton('Set Journal')
+        journal_button.clicked.connect(self.set_journal)
+        self.journal_lineEdit = QtWidgets.QLineEdit()
+        self.journal_lineEdit.setEnabled(False)
+        self.journal_lineEdit.setPlaceholderText('No journal')
+        journal_hLayout.addWidget(journal_button)
+        journal_hLayout.addWidget(self.journal_lineEdit)
+
+        # A label and a combo box that picks which file wins when the layout files of a
+        # folder place a stack differently
+        conflict_label = QtWidgets.QLabel('Set Layout Conflicts')
+        self.conflict_box = QtWidgets.QComboBox()
+        self.conflict_box.addItems(list(layout.CONFLICT_POLICIES))
+
+        # Add the label / combo box to the a new row
+        conflict_hLayout.addWidget(conflict_label)
+        conflict_hLayout.addWidget(self.conflict_box)
+
         return self.optLayout
 
     def set_selection(self):
@@ -233,7 +415,7 @@ class BuilderGUI(QtWidgets.QDialog):
         """
         sender = self.sender()
         if sender:
-            user_selection = cmds.ls(selection=True)
+            user_selection = scene.get_backend().ls(selection=True)
             if len(user_selection) < 1:
                 return
             numObjs = str(len(user_selection)) + " objects"
@@ -252,66 +434,138 @@ class BuilderGUI(QtWidgets.QDialog):
                 self.base_lineEdit.setText(numObjs)
                 self.base_lineEdit.setStyleSheet(
                     "background-color: DarkOliveGreen; color: white")
+            if sender.objectName() == 'button4':
+                self.duplicate_objs = user_selection
+                self.duplicate_lineEdit.setText(numObjs)
+                self.duplicate_lineEdit.setStyleSheet(
+                    "background-color: DarkOliveGreen; color: white")
+
+    def set_journal(self):
+        """
+        Asks for the journal file builds are added to. Cancelling the dialog stops
+        recording builds.
+
+        :return: N/A
+        """
+        filename, ffilter = QtWidgets.QFileDialog.getSaveFileName(
+            caption='Set Build Journal', dir='C:/Users/', filter='Journals (*.jsonl)',
+            options=QtWidgets.QFileDialog.DontConfirmOverwrite)
+        self.journal_path = filename or ''
+        self.journal_lineEdit.setText(self.journal_path)
 
     def make_stacks(self):
         """
-        Verifies user input and creates stacks of objects
+        Verifies user input and starts building stacks of objects. The stacks are built a
+        chunk at a time by build_chunk so the GUI keeps responding.
 
-        :return: True if it completes without an error
+        :return: True if the build started
         """
         # Return none if verification fails
         if self.verify_args() is None:
             return None
 
-        # Create lists of object transforms from text boxes
-        top_list = self.top_objs
-        mid_list = self.mid_objs
-        base_list = self.base_objs
-
-        stack_groups_list = []
-        self.tree_view.clear()
-
-        # Create specified number of stacks
-        stacks_count = int(self.stack_box.text())
-        for index in range(1, stacks_count + 1):
-            stack_objs_list = []
-
-            # Randomize top and base objects
-            random.shuffle(base_list)
-            stack_objs_list.append(base_list[0])
+        self.stack_model.clear()
+
+        # Print the seed so a random build can be made again
+        seed = self.seed_box.value()
+        if seed < 0:
+            seed = recipes.random_seed()
+        print('Making stacks with seed %d' % seed)
+
+        build_journal = None
+        if self.journal_path:
+            build_journal = journal.BuildJournal(self.journal_path)
+
+        # Start building the specified number of stacks
+        self.build = builder.StackBuild(self.top_objs, self.mid_objs, self.base_objs,
+                                        int(self.stack_box.text()),
+                                        int(self.height_box.value()),
+                                        self.offset_box.value(),
+                                        instance=self.instance_box.isChecked(),
+                                        duplicate_parts=self.duplicate_objs,
+                                        seed=seed, validator=self.validator,
+                                        layout_mode=self.layout_box.currentText(),
+                                        contact_stacking=self.contact_box.isChecked(),
+                                        use_templates=self.template_box.isChecked(),
+                                        journal=build_journal)
+        self.build_start = time.time()
+        self.chunk_size = 1
+        self.progress_bar.setRange(0, self.build.stack_count)
+        self.progress_bar.setValue(0)
+        self.progress_label.setText('')
+        self.show_progress(True)
+        self.build_timer.start()
 
-            # Randomize middle objects based on max_height
-            for i in range(random.randint(1, int(self.height_box.value()))):
-                random.shuffle(mid_list)
-                stack_objs_list.append(mid_list[0])
+        return True
 
-            random.shuffle(top_list)
-            stack_objs_list.append(top_list[0])
+    def build_chunk(self):
+        """
+        Builds the next chunk of stacks, sized so each chunk fits in the frame budget,
+        and updates the progress bar and tree view
 
-            # Duplicate objects and move base to world origin
-            transforms_list = []
-            for i in range(len(stack_objs_list)):
-                transforms_list.append(cmds.duplicate(stack_objs_list[i])[0])
+        :return: N/A
+        """
+        chunk_start = time.time()
+        try:
+            stacks = self.build.step(self.chunk_size)
+        except Exception:
+            # Don't leave half a build behind
+            self.cancel_build()
+            raise
+        now = time.time()
+        self.chunk_size = builder.next_chunk_size(self.chunk_size, now - chunk_start,
+                                                  FRAME_BUDGET)
+
+        with instrument.phase('tree_population'):
+            self.stack_model.add_stacks(stacks)
+        done = len(self.build.stacks)
+        self.progress_bar.setValue(done)
+        self.progress_label.setText(builder.format_progress(done, self.build.stack_count,
+                                                            now - self.build_start))
+
+        if self.build.is_finished():
+            self.build_timer.stop()
+            if self.build.template_cache is not None:
+                print(self.build.template_cache.summary())
+            self.build = None
+            self.show_progress(False)
+
+    def cancel_build(self):
+        """
+        Stops the running build and deletes the stacks it has made
 
-            # Move the base object to the world origin, on top of the grid
-            base_move = cmds.xform(transforms_list[0], boundingBox=True, query=True)
-            cmds.move(0, -base_move[1], 0, transforms_list[0], absolute=True)
+        :return: N/A
+        """
+        self.build_timer.stop()
+        if self.build is not None:
+            self.build.rollback()
+            self.build = None
+        self.stack_model.clear()
+        self.show_progress(False)
+
+    def show_progress(self, building):
+        """
+        Shows the progress widgets while a build is running and hides them otherwise
 
-            # Stack objects
-            stacker.stack_objs(transforms_list)
+        :param building: Whether a build is running.
+        :type: bool
 
-            # Create group and place stacked objects in it
-            stack_group = cmds.group(em=True, name="stack%s" % ("%03d" % index))
-            stack_groups_list.append(stack_group)
-            for transform in transforms_list:
-                cmds.parent(transform, stack_group)
-            self.add_stack_to_tree_view(stack_group, transforms_list)
+        :return: N/A
+        """
+        self.progress_bar.setVisible(building)
+        self.progress_label.setVisible(building)
+        self.cancel_build_button.setVisible(building)
+        self.stack_button.setEnabled(not building)
 
-        for i in range(len(stack_groups_list) - 1):
-            stacker.offset_objs_in_x(stack_groups_list[i], stack_groups_list[i + 1],
-                                     self.offset_box.value())
+    def closeEvent(self, event):
+        """
+        Rolls back a build that is still running when the GUI is closed
 
-        return True
+        :return: N/A
+        """
+        if self.build is not None:
+            self.cancel_build()
+        QtWidgets.QDialog.closeEvent(self, event)
 
     def verify_args(self):
         """
@@ -319,31 +573,20 @@ class BuilderGUI(QtWidgets.QDialog):
 
         :return: None if verification fails, else True
         """
+        # Verify number and validity of the top, middle and base objects with one query,
+        # which the build reuses instead of checking them again
+        self.validator = validation.Validator()
+        with instrument.phase('validation'):
+            report = self.validator.check([('top', self.top_objs),
+                                           ('mid', self.mid_objs),
+                                           ('base', self.base_objs)])
         error = ""
-
-        # Verify number and validity of top objects
-        if len(self.top_objs) < 1:
-            error += "You must set a selection for the top parts.\n"
-        else:
-            for transform in self.top_objs:
-                if cmds.objExists(transform) is False:
-                    error += "Top Stack transforms are invalid\n"
-
-        # Verify number and validity of middle objects
-        if len(self.mid_objs) < 1:
-            error += "You must set a selection for the mid parts.\n"
-        else:
-            for transform in self.mid_objs:
-                if cmds.objExists(transform) is False:
-                    error += "Mid Stack transforms are invalid\n"
-
-        # Verify number and validity of base objects
-        if len(self.base_objs) < 1:
-            error += "You must set a selection for the base parts.\n"
-        else:
-            for transform in self.base_objs:
-                if cmds.objExists(transform) is False:
-                    error += "Base Stack transforms are invalid\n"
+        for label, missing in report.missing.items():
+            if label in report.empty:
+                error += "You must set a selection for the %s parts.\n" % label
+            elif missing:
+                error += "%s Stack transforms are invalid: %s\n" \
+                         % (label.title(), validation.format_names(missing))
 
         # Warn user if selection errors exist
         if error != "":
@@ -370,78 +613,128 @@ class BuilderGUI(QtWidgets.QDialog):
 
         return True
 
-    def add_stack_to_tree_view(self, stack_node, contents_list):
+    @classmethod
+    def apply_xml(cls):
+        """
+        Allows the user to select an XML or binary layout file and applies the values of
+        the file to the stacks in the scene.
+
+        :return: None if an invalid file is selected, else True
         """
-        Builds GUI window with the ability to set selected objects, modify text boxes,
-        set the number of stacks, and create stacks.
+        # Prompt the user to select a file
+        filename, ffilter = QtWidgets.QFileDialog.getOpenFileName(caption='Open File',
+                                                                  dir='C:/Users/',
+                                                                  filter='Layout Files ('
+                                                                        '*.txt *.xml '
+                                                                        '*.xml.gz '
+                                                                        '*.stkl)')
+        if not filename:
+            return None
 
-        :param stack_node: The name of a group node, e.g. 'stack001'
-        :type: str
+        # Checks to see that the file exists, parsing it if it isn't cached already
+        xml_data = gen_utils.get_layout_cache().load(filename)
+        if xml_data is None:
+            return None
 
-        :param contents_list: A list of the contents of that group (the stack node)
-        :type: list of transforms
+        # Checks to see that the file had some values
+        if not len(xml_data):
+            return None
 
-        :return: N/A
+        # Move the stacks that aren't where the file puts them
+        report = layout.apply_layout(xml_data)
+        print(report.summary())
+
+        return True
+
+    def apply_layout_folder(self):
         """
-        # Add the group name to the tree
-        root = QtWidgets.QTreeWidgetItem(self.tree_view, [stack_node])
+        Allows the user to select a folder and applies every layout file in it to the
+        stacks in the scene, settling conflicts with the policy picked in the options.
+        Files that can't be read are listed in a warning.
 
-        # Add all of the children nodes under the group
-        for obj in contents_list:
-            child = QtWidgets.QTreeWidgetItem(root, [obj])
+        :return: None if no folder is picked or nothing was applied, else True
+        """
+        # Prompt the user to select a folder
+        folder = QtWidgets.QFileDialog.getExistingDirectory(caption='Load Layout Folder',
+                                                            dir='C:/Users/')
+        if not folder:
+            return None
 
-        # Clicking on an item in the tree view selects that item in Maya
-        self.tree_view.currentItemChanged['QTreeWidgetItem*', 'QTreeWidgetItem*']\
-            .connect(self.tree_item_clicked)
+        report = layout.apply_layout_files(folder,
+                                           conflict=self.conflict_box.currentText())
+        print(report.summary())
+
+        failed = report.failed()
+        if failed:
+            self.warn_user('Builder - Layouts',
+                           '%d layout files could not be read: %s'
+                           % (len(failed), validation.format_names(
+                               [layout_file.path for layout_file in failed])))
+        if report.applied is None:
+            return None
+
+        return True
 
     @classmethod
-    def apply_xml(cls):
+    def export_xml(cls):
         """
-        Allows the user to select an XML file and applies the values of the file to the
-        stacks in the scene.
+        Allows the user to pick a file and saves the translations of the stacks in the
+        scene to it as a layout XML file, gzipped if the name ends in .gz.
 
-        :return: None if an invalid file is selected, else True
+        :return: None if no file is picked, else True
         """
-        # Prompt the user to select a file
-        filename, ffilter = QtWidgets.QFileDialog.getOpenFileName(caption='Open File',
+        # Prompt the user to pick a file
+        filename, ffilter = QtWidgets.QFileDialog.getSaveFileName(caption='Export Layout',
                                                                   dir='C:/Users/',
-                                                                  filter='Text Files ('
-                                                                        '*.txt *.xml)')
+                                                                  filter='Layout Files ('
+                                                                        '*.xml *.xml.gz)')
+        if not filename:
+            return None
+
+        count = layout.export_layout(filename)
+        print('Exported %d stacks to %s' % (count, filename))
+
+        return True
+
+    def replay_journal(self):
+        """
+        Allows the user to pick a journal and makes the stacks recorded in it again,
+        listing them in the tree view.
+
+        :return: None if no file is picked or it can't be replayed, else True
+        """
+        # Prompt the user to select a file
+        filename, ffilter = QtWidgets.QFileDialog.getOpenFileName(
+            caption='Replay Journal', dir='C:/Users/', filter='Journals (*.jsonl)')
         if not filename:
             return None
 
-        # Checks to see that the dictionary has some values
-        xml_data = gen_utils.read_stack_xml(filename)
-        if not xml_data:
+        try:
+            stacks = journal.replay_journal(filename)
+        except (IOError, ValueError) as error:
+            self.warn_user('Builder - Journal', str(error))
             return None
 
-        stacks = xml_data.keys()
-        for stack in stacks:
-            # Apply values to the stacks in scene
-            for transform in xml_data[stack]:
-                print(stack + " moves " + xml_data[stack][transform] + " in " + transform)
-                if transform == "tx":
-                    cmds.move(xml_data[stack][transform], stack, moveX=True,
-                              absolute=True)
-                if transform == "ty":
-                    cmds.move(xml_data[stack][transform], stack, moveY=True,
-                              absolute=True)
-                if transform == "tz":
-                    cmds.move(xml_data[stack][transform], stack, moveZ=True,
-                              absolute=True)
+        self.stack_model.clear()
+        self.stack_model.add_stacks(stacks)
+        print('Replayed %d stacks from %s' % (len(stacks), filename))
 
-    # noinspection PyMethodMayBeStatic
-    def tree_item_clicked(self, item):
+        return True
+
+    def tree_item_clicked(self, current, previous):
         """
         Selects objects highlighted in the tree view
 
-        :param item: A QTreeWidgetItem.
-        :type: QtWidgets.QTreeWidgetItem
+        :param current: The index of the item that was clicked.
+        :type: QtCore.QModelIndex
+
+        :param previous: The index of the item that was current before.
+        :type: QtCore.QModelIndex
 
         :return: N/A
         """
-        if item:
-            cmds.select(item.text(0))
+        if current.isValid():
+            scene.get_backend().select(self.stack_model.name(current))
 
     # noinspection PyMethodMayBeStatic
     def warn_user(self, title, message):
@@ -456,6 +749,8 @@ class BuilderGUI(QtWidgets.QDialog):
 
         :return: N/A
         """
+        import maya.cmds as cmds
+
         # Create warning dialog
         cmds.confirmDialog(title=title,
                            message=message,
@@ -0,0 +1,238 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    A lazy item model over the stacks made by a build.
+
+:description:
+    This module holds the model behind the 'Object Stacks' panel of the builder GUI. It
+    wraps the list of stacks a build returns without making an item per stack. The view
+    is handed stacks a page at a time as it scrolls, the parts of a stack are only
+    handed over when it is expanded and filtering by name only checks the stacks that
+    matched the last filter when the filter text grows.
+
+:applications:
+    Maya
+
+:see_also:
+    builder_gui.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+from PySide2 import QtCore
+
+# Imports That You Wrote
+# N/A
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+# The number of stacks handed to the view each time it scrolls to the end
+FETCH_SIZE = 256
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- CLASSES --#
+
+
+class StackTreeModel(QtCore.QAbstractItemModel):
+    """
+    Stack groups at the top level with their parts under them. A top level index has
+    an internal id of 0 and a part's index has the position of its stack plus one.
+    """
+    def __init__(self, parent=None):
+        QtCore.QAbstractItemModel.__init__(self, parent)
+        self._stacks = []
+        self._rows = None
+        self._row_of = None
+        self._loaded = 0
+        self._fetched = set()
+        self._filter = ''
+        self._search_keys = []
+
+    def add_stacks(self, stacks):
+        """
+        Adds stacks to the end of the model.
+
+        :param stacks: The name of each stack group with the transforms inside it.
+        :type: list of tuples (str, list of strings)
+
+        :return: N/A
+        """
+        first = len(self._stacks)
+        self._stacks.extend(stacks)
+        if self._rows is not None:
+            for stack in range(first, len(self._stacks)):
+                if self._matches(stack, self._filter):
+                    self._row_of[stack] = len(self._rows)
+                    self._rows.append(stack)
+
+        # Fill the first page straight away, the view fetches the rest as it scrolls
+        if self._loaded < FETCH_SIZE:
+            self.fetchMore(QtCore.QModelIndex())
+
+    def clear(self):
+        """
+        Removes every stack from the model, keeping the filter.
+
+        :return: N/A
+        """
+        self.beginResetModel()
+        self._stacks = []
+        self._search_keys = []
+
+        # The filter stays on for the stacks added next
+        self._rows = [] if self._filter else None
+        self._row_of = {} if self._filter else None
+        self._loaded = 0
+        self._fetched = set()
+        self.endResetModel()
+
+    def set_filter(self, text):
+        """
+        Only shows the stacks whose group or parts have the text in their name, ignoring
+        case.
+
+        :param text: The text to look for. An empty string shows every stack.
+        :type: str
+
+        :return: N/A
+        """
+        text = text.lower()
+        if text == self._filter:
+            return
+
+        self.beginResetModel()
+        if not text:
+            self._rows = None
+            self._row_of = None
+        else:
+            # A longer filter can only match stacks the shorter one did
+            if self._rows is not None and text.startswith(self._filter):
+                candidates = self._rows
+            else:
+                candidates = range(len(self._stacks))
+            self._rows = [stack for stack in candidates if self._matches(stack, text)]
+            self._row_of = dict((stack, row) for row, stack in enumerate(self._rows))
+        self._filter = text
+        self._loaded = min(FETCH_SIZE, self._row_count())
+        self._fetched = set()
+        self.endResetModel()
+
+    def name(self, index):
+        """
+        :param index: An index of the model.
+        :type: QtCore.QModelIndex
+
+        :return: The name of the stack group or part at the index
+        :type: str
+        """
+        parent_id = index.internalId()
+        if parent_id:
+            return self._stacks[parent_id - 1][1][index.row()]
+        return self._stacks[self._stack_at(index.row())][0]
+
+    def _row_count(self):
+        if self._rows is None:
+            return len(self._stacks)
+        return len(self._rows)
+
+    def _stack_at(self, row):
+        if self._rows is None:
+            return row
+        return self._rows[row]
+
+    def _matches(self, stack, text):
+        # Every name of a stack is joined into one lower case string the first time the
+        # stack is filtered
+        keys = self._search_keys
+        if len(keys) <= stack:
+            keys.extend([None] * (len(self._stacks) - len(keys)))
+        if keys[stack] is None:
+            group, transforms = self._stacks[stack]
+            keys[stack] = '\n'.join([group] + list(transforms)).lower()
+        return text in keys[stack]
+
+    # The rest are the QAbstractItemModel overrides
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QtCore.QModelIndex()
+        if not parent.isValid():
+            return self.createIndex(row, column, 0)
+        return self.createIndex(row, column, self._stack_at(parent.row()) + 1)
+
+    def parent(self, index):
+        if not index.isValid() or not index.internalId():
+            return QtCore.QModelIndex()
+        stack = index.internalId() - 1
+        row = stack if self._row_of is None else self._row_of[stack]
+        return self.createIndex(row, 0, 0)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if not parent.isValid():
+            return self._loaded
+        if parent.internalId():
+            return 0
+        stack = self._stack_at(parent.row())
+        return len(self._stacks[stack][1]) if stack in self._fetched else 0
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):
+        if not parent.isValid():
+            return self._loaded > 0
+        if parent.internalId():
+            return False
+        return bool(self._stacks[self._stack_at(parent.row())][1])
+
+    def canFetchMore(self, parent):
+        if not parent.isValid():
+            return self._loaded < self._row_count()
+        if parent.internalId():
+            return False
+        return self._stack_at(parent.row()) not in self._fetched
+
+    def fetchMore(self, parent):
+        if not parent.isValid():
+            count = min(FETCH_SIZE, self._row_count() - self._loaded)
+            if count <= 0:
+                return
+            self.beginInsertRows(parent, self._loaded, self._loaded + count - 1)
+            self._loaded += count
+            self.endInsertRows()
+            return
+
+        # A stack's parts are only handed to the view when it is expanded
+        stack = self._stack_at(parent.row())
+        if parent.internalId() or stack in self._fetched:
+            return
+        transforms = self._stacks[stack][1]
+        if transforms:
+            self.beginInsertRows(parent, 0, len(transforms) - 1)
+            self._fetched.add(stack)
+            self.endInsertRows()
+        else:
+            self._fetched.add(stack)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if index.isValid() and role == QtCore.Qt.DisplayRole:
+            return self.name(index)
+        return None
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return 'Object Stacks'
+        return None
@@ -0,0 +1,335 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Opt-in timing of the phases of a build and counting of scene calls.
+
+:description:
+    This module records how long each phase of the stacker tools takes (validation,
+    sampling, duplication, stacking, grouping, spacing in x, tree population and layout
+    parsing and applying) and how many scene calls of each kind are made. The tools
+    wrap their phases in phase(name), which hands back a shared do-nothing context
+    while recording is off, or decorate them with timed(name), which only checks
+    whether recording is on, so the calls can stay in production code.
+    Recordings can be read through the Recorder, saved as JSON or saved as a Chrome
+    trace that can be opened in chrome://tracing or Perfetto.
+
+        recorder = instrument.enable()
+        builder.build_stacks(...)
+        instrument.disable()
+        recorder.save_chrome_trace('build_trace.json')
+
+:applications:
+    Maya, standalone Python
+
+:see_also:
+    scene.py
+    builder.py
+    bench.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+import contextlib
+import functools
+import json
+import os
+import threading
+import timeit
+
+# Imports That You Wrote
+from td_maya_tools import scene
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+# Past this many events only the per-phase totals are kept
+MAX_EVENTS = 100000
+
+_recorder = None
+
+
+def phase(name):
+    """
+    Times a phase with a with block while recording is on.
+
+    :param name: The name of the phase, e.g. 'duplication'.
+    :type: str
+
+    :return: A context manager that times the block, or one that does nothing
+    :type: context manager
+    """
+    if _recorder is None:
+        return _NULL_PHASE
+    return _Phase(_recorder, name)
+
+
+def timed(name):
+    """
+    Decorates a function so every call is timed as a phase while recording is on.
+
+    :param name: The name of the phase.
+    :type: str
+
+    :return: The decorator
+    :type: function
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if _recorder is None:
+                return function(*args, **kwargs)
+            with _Phase(_recorder, name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def enable(count_commands=True):
+    """
+    Starts recording. Only one recording can run at a time, so a recording that is
+    already running is stopped first.
+
+    :param count_commands: Count the scene calls by wrapping the active backend in a
+    scene.CountingBackend until recording stops. (Def=True)
+    :type: bool
+
+    :return: The new recording
+    :type: Recorder
+    """
+    global _recorder
+    disable()
+
+    recorder = Recorder()
+    if count_commands:
+        recorder.counting = scene.CountingBackend(scene.get_backend())
+        recorder.commands = recorder.counting.counts
+        recorder.previous_backend = scene.set_backend(recorder.counting)
+    _recorder = recorder
+    return recorder
+
+
+def disable():
+    """
+    Stops recording and puts back the backend that was active when it started.
+
+    :return: The recording that was stopped, or None if nothing was recording
+    :type: Recorder
+    """
+    global _recorder
+    recorder = _recorder
+    _recorder = None
+    if recorder is not None:
+        recorder.stop()
+        if recorder.counting is not None and scene.get_backend() is recorder.counting:
+            scene.set_backend(recorder.previous_backend)
+    return recorder
+
+
+def get_recorder():
+    """
+    :return: The running recording, or None if nothing is recording
+    :type: Recorder
+    """
+    return _recorder
+
+
+@contextlib.contextmanager
+def recording(count_commands=True):
+    """
+    Records everything inside a with block.
+
+    :param count_commands: Count the scene calls. (Def=True)
+    :type: bool
+
+    :return: The recording
+    :type: Recorder
+    """
+    recorder = enable(count_commands)
+    try:
+        yield recorder
+    finally:
+        if _recorder is recorder:
+            disable()
+
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- CLASSES --#
+
+
+class Recorder(object):
+    """
+    The phases timed and the scene calls counted while recording.
+    """
+    def __init__(self):
+        self.start = timeit.default_timer()
+        self.end = None
+        self.events = []
+        self.totals = {}
+        self.commands = {}
+        self.counting = None
+        self.previous_backend = None
+
+    def add(self, name, start, duration):
+        """
+        Records one run of a phase.
+
+        :param name: The name of the phase.
+        :type: str
+
+        :param start: The timer value when the phase started.
+        :type: float
+
+        :param duration: The seconds the phase took.
+        :type: float
+
+        :return: N/A
+        """
+        total = self.totals.get(name)
+        if total is None:
+            self.totals[name] = [1, duration, duration]
+        else:
+            total[0] += 1
+            total[1] += duration
+            if duration > total[2]:
+                total[2] = duration
+
+        if len(self.events) < MAX_EVENTS:
+            self.events.append((name, start, duration, threading.current_thread().ident))
+
+    def stop(self):
+        """
+        Marks the end of the recording.
+
+        :return: N/A
+        """
+        if self.end is None:
+            self.end = timeit.default_timer()
+
+    def phase_stats(self):
+        """
+        :return: The number of runs, total seconds, mean seconds and longest seconds of
+        each phase
+        :type: dict
+        """
+        return dict((name, {'calls': calls, 'total': total, 'mean': total / calls,
+                            'max': longest})
+                    for name, (calls, total, longest) in self.totals.items())
+
+    def to_dict(self):
+        """
+        :return: The recording as plain data
+        :type: dict
+        """
+        end = self.end if self.end is not None else timeit.default_timer()
+        return {'wall_time': end - self.start,
+                'phases': self.phase_stats(),
+                'commands': dict(self.commands),
+                'total_commands': sum(self.commands.values()),
+                'undo_chunks': self.undo_chunks(),
+                'dropped_events': sum(total[0] for total in self.totals.values()) -
+                len(self.events)}
+
+    def save_json(self, json_path):
+        """
+        Saves the phase totals and command counts as JSON.
+
+        :param json_path: The file to write.
+        :type: str
+
+        :return: N/A
+        """
+        with open(json_path, 'w') as json_fh:
+            json.dump(self.to_dict(), json_fh, indent=2, sort_keys=True)
+
+    def save_chrome_trace(self, trace_path):
+        """
+        Saves every recorded phase as a Chrome trace, with the command counts attached
+        to the trace.
+
+        :param trace_path: The file to write.
+        :type: str
+
+        :return: N/A
+        """
+        pid = os.getpid()
+        trace_events = [{'name': name, 'cat': 'td_maya_tools', 'ph': 'X', 'pid': pid,
+                         'tid': tid, 'ts': (start - self.start) * 1e6,
+                         'dur': duration * 1e6}
+                        for name, start, duration, tid in self.events]
+        with open(trace_path, 'w') as trace_fh:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms',
+                       'otherData': {'commands': dict(self.commands)}}, trace_fh)
+
+    def summary(self):
+        """
+        :return: A table of the phases, slowest first, and the command counts
+        :type: str
+        """
+        lines = ['%-20s %8s %12s %12s' % ('phase', 'calls', 'total (s)', 'mean (s)')]
+        stats = self.phase_stats()
+        for name in sorted(stats, key=lambda name: -stats[name]['total']):
+            stat = stats[name]
+            lines.append('%-20s %8d %12.4f %12.6f' % (name, stat['calls'], stat['total'],
+                                                       stat['mean']))
+        if self.commands:
+            lines.append('')
+            lines.append('%-20s %8s' % ('command', 'calls'))
+            for name in sorted(self.commands):
+                lines.append('%-20s %8d' % (name, self.commands[name]))
+            lines.append('%-20s %8d' % ('(undo chunks)', self.undo_chunks()))
+        return '\n'.join(lines)
+
+    def undo_chunks(self):
+        """
+        :return: The number of undo chunks opened, which aren't counted as commands
+        :type: int
+        """
+        return self.counting.undo_chunks if self.counting is not None else 0
+
+
+class _Phase(object):
+    """
+    Times the with block it is used in.
+    """
+    __slots__ = ('recorder', 'name', 'start')
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = timeit.default_timer()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.recorder.add(self.name, self.start, timeit.default_timer() - self.start)
+        return False
+
+
+class _NullPhase(object):
+    """
+    Stands in for _Phase while nothing is recording.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
@@ -0,0 +1,408 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Records what a build made so it can be made again without working it out again.
+
+:description:
+    A build journal is an append-only file with one JSON record per line. A build
+    starts with a 'build' record of its settings and source parts, and each chunk of
+    stacks it makes adds a 'stacks' record with the group names, the source part of
+    every copy (as an index into the build's parts) and where every copy was moved to.
+    Where the groups were placed is added as a 'place' record, and a build that is
+    rolled back adds a 'rollback' record. Each record is written as soon as its chunk
+    is made, so a journal cut short by a crash still holds every finished chunk.
+    Replaying a journal makes the same stacks again with bulk calls: the copies of a
+    build are made with one call (one per chunk when it mixed duplicates and
+    instances), moved with one call and grouped with one call per group, and the
+    groups are placed with one call. Nothing is sampled, stacked or
+    queried apart from checking the source parts still exist. The copies of a build
+    that used stack templates are made from the source parts like any other, so their
+    names can differ from the build's, as templates.TemplateCache explains.
+
+        build_journal = journal.BuildJournal('stacks.jsonl')
+        builder.build_stacks(top, mid, base, 100, 3, 0.1, journal=build_journal)
+        ...
+        stacks = journal.replay_journal('stacks.jsonl')
+
+:applications:
+    Maya, standalone Python
+
+:see_also:
+    builder.py
+    scene.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+import json
+import os
+
+# Imports That You Wrote
+from td_maya_tools import builder
+from td_maya_tools import instrument
+from td_maya_tools import scene
+from td_maya_tools import validation
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+JOURNAL_VERSION = 1
+
+
+def read_journal(journal_path):
+    """
+    Reads the builds in a journal. A last line that was cut short is left out; any
+    other line that can't be read raises a ValueError.
+
+    :param journal_path: The path of a journal file.
+    :type: str
+
+    :return: The builds in the journal, oldest first
+    :type: list of JournalBuilds
+    """
+    builds = []
+    with open(journal_path) as journal_fh:
+        lines = journal_fh.readlines()
+
+    for number, line in enumerate(lines, 1):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            if number == len(lines):
+                break
+            raise ValueError('%s line %d is not a journal record'
+                             % (journal_path, number))
+
+        kind = record.get('type')
+        if kind == 'build':
+            if record.get('version') != JOURNAL_VERSION:
+                raise ValueError('%s line %d is a version %s journal, expected version %d'
+                                 % (journal_path, number, record.get('version'),
+                                    JOURNAL_VERSION))
+            builds.append(JournalBuild(record))
+        elif not builds:
+            raise ValueError('%s line %d comes before any build'
+                             % (journal_path, number))
+        elif kind == 'stacks':
+            builds[-1].add_stacks(record)
+        elif kind == 'place':
+            builds[-1].add_places(record)
+        elif kind == 'rollback':
+            builds[-1].rollback()
+        else:
+            raise ValueError('%s line %d has an unknown record type %r'
+                             % (journal_path, number, kind))
+    return builds
+
+
+@instrument.timed('journal_replay')
+def replay_journal(journal_path, backend=None):
+    """
+    Makes the stacks of every build in a journal again, each build as one undo step.
+    Raises a ValueError if any of the source parts are missing.
+
+    :param journal_path: The path of a journal file.
+    :type: str
+
+    :param backend: The backend to make the stacks in. (Def=the active backend)
+    :type: scene.SceneBackend
+
+    :return: The name of each stack group with the transforms inside it
+    :type: list of tuples (str, list of strings)
+    """
+    backend = backend or scene.get_backend()
+    builds = read_journal(journal_path)
+
+    # Check every source part with one query before anything is made
+    parts = sorted(set(part for build in builds for part in build.parts))
+    missing = [part for part, found in zip(parts, backend.objs_exist(parts))
+               if not found]
+    if missing:
+        raise ValueError('The journal needs parts that are missing: %s'
+                         % validation.format_names(missing))
+
+    stacks = []
+    for build in builds:
+        stacks.extend(replay_build(build, backend))
+    return stacks
+
+
+def replay_build(build, backend=None):
+    """
+    Makes the stacks of a build again.
+
+    :param build: A build read from a journal.
+    :type: JournalBuild
+
+    :param backend: The backend to make the stacks in. (Def=the active backend)
+    :type: scene.SceneBackend
+
+    :return: The name of each stack group with the transforms inside it
+    :type: list of tuples (str, list of strings)
+    """
+    backend = backend or scene.get_backend()
+    if not build.stacks:
+        return []
+
+    stacks = []
+    with scene.SceneBatch(backend, undo_name='Replay Stacks') as batch:
+        with instrument.phase('duplication'):
+            # Duplicates and instances are named in the order they are made, so a
+            # build that made both is copied a chunk at a time, the way it was built
+            rounds = [len(build.stacks)]
+            if build.instance and build.duplicate_parts:
+                rounds = build.chunk_sizes
+            all_transforms = []
+            start = 0
+            for size in rounds:
+                parts = [build.parts[index] for name, indices, translations
+                         in build.stacks[start:start + size] for index in indices]
+                all_transforms.extend(builder.copy_parts(batch, parts, build.instance,
+                                                         build.duplicate_parts))
+                start += size
+
+        # The translations are sliced as they are used, so the scene isn't slowed by
+        # a list for every copy being kept alive
+        with instrument.phase('stacking'):
+            backend.set_translations(all_transforms,
+                                     (translations[position:position + 3]
+                                      for name, indices, translations in build.stacks
+                                      for position in range(0, len(translations), 3)))
+
+        with instrument.phase('grouping'):
+            position = 0
+            for name, indices, translations in build.stacks:
+                transforms_list = all_transforms[position:position + len(indices)]
+                position += len(indices)
+                stack_group = batch.group(name)
+                batch.parent(transforms_list, stack_group)
+                stacks.append((stack_group, transforms_list))
+            batch.flush()
+
+        # Groups are placed under the names they were made with, which the scene may
+        # have changed
+        with instrument.phase('placement'):
+            groups = dict((name, stack[0]) for (name, indices, translations), stack
+                          in zip(build.stacks, stacks))
+            placed = [(groups[name], translation)
+                      for name, translation in build.places.items() if name in groups]
+            if placed:
+                backend.set_translations([group for group, translation in placed],
+                                         [translation for group, translation in placed])
+    return stacks
+
+
+def end_last_line(journal_path):
+    """
+    Makes sure a journal ends with a whole line, so the next record isn't joined onto
+    a line a crash cut short. A last line that is a whole record only gets its
+    newline; one that was cut short is removed, as read_journal would skip it anyway.
+
+    :param journal_path: The path of a journal file. Nothing is done if it doesn't
+    exist.
+    :type: str
+
+    :return: N/A
+    """
+    if not os.path.exists(journal_path):
+        return
+
+    with open(journal_path, 'rb+') as journal_fh:
+        journal_fh.seek(0, os.SEEK_END)
+        end = journal_fh.tell()
+        if not end:
+            return
+        journal_fh.seek(end - 1)
+        if journal_fh.read(1) == b'\n':
+            return
+
+        # Read back a block at a time to the newline before the last line
+        last_line = b''
+        start = end
+        while start > 0:
+            block_start = max(0, start - 65536)
+            journal_fh.seek(block_start)
+            block = journal_fh.read(start - block_start)
+            start = block_start
+            newline = block.rfind(b'\n')
+            if newline != -1:
+                start += newline + 1
+                last_line = block[newline + 1:] + last_line
+                break
+            last_line = block + last_line
+
+        try:
+            json.loads(last_line.decode('utf-8'))
+        except ValueError:
+            journal_fh.seek(start)
+            journal_fh.truncate()
+        else:
+            journal_fh.seek(end)
+            journal_fh.write(b'\n')
+
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- CLASSES --#
+
+
+class BuildJournal(object):
+    """
+    Appends the records of builds to a journal file. The file is opened for each
+    record, so nothing is left open between the chunks of a build.
+    """
+    def __init__(self, journal_path):
+        """
+        :param journal_path: The path of the journal file, which is added to if it
+        already exists. A last line a crash cut short is removed first.
+        :type: str
+        """
+        self.journal_path = journal_path
+        self._part_indices = {}
+        self._is_line_ended = False
+
+    def write_build(self, build):
+        """
+        Starts the record of a build.
+
+        :param build: The build.
+        :type: builder.StackBuild
+
+        :return: N/A
+        """
+        parts = []
+        self._part_indices = {}
+        for part in build.base_objs + build.mid_objs + build.top_objs:
+            if part not in self._part_indices:
+                self._part_indices[part] = len(parts)
+                parts.append(part)
+        self._write({'type': 'build', 'version': JOURNAL_VERSION, 'parts': parts,
+                     'stack_count': build.stack_count, 'max_height': build.max_height,
+                     'separation': build.separation, 'seed': build.seed,
+                     'instance': build.instance,
+                     'duplicate_parts': list(build.duplicate_parts or []),
+                     'layout_mode': build.layout_mode,
+                     'contact_stacking': build.contact_stacking})
+
+    def write_stacks(self, names, stack_parts, translations):
+        """
+        Adds a chunk of stacks to the current build.
+
+        :param names: The name of each stack group.
+        :type: list of strings
+
+        :param stack_parts: The source parts of each stack, from the base up.
+        :type: list of lists of strings
+
+        :param translations: The world space translation of every copy in each stack,
+        three values per copy.
+        :type: list of lists of floats
+
+        :return: N/A
+        """
+        indices = self._part_indices
+        self._write({'type': 'stacks', 'names': names,
+                     'parts': [[indices[part] for part in parts]
+                               for parts in stack_parts],
+                     'translations': translations})
+
+    def write_places(self, names, translations):
+        """
+        Adds where stack groups were placed to the current build.
+
+        :param names: The name of each stack group.
+        :type: list of strings
+
+        :param translations: The world space translation of each group.
+        :type: list of lists (x, y, z)
+
+        :return: N/A
+        """
+        self._write({'type': 'place', 'names': names,
+                     'translations': [value for translation in translations
+                                      for value in translation]})
+
+    def write_rollback(self):
+        """
+        Marks the stacks of the current build as deleted.
+
+        :return: N/A
+        """
+        self._write({'type': 'rollback'})
+
+    def _write(self, record):
+        # Every record this writes ends its line, so only an earlier one can be cut short
+        if not self._is_line_ended:
+            end_last_line(self.journal_path)
+            self._is_line_ended = True
+        with open(self.journal_path, 'a') as journal_fh:
+            journal_fh.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+
+class JournalBuild(object):
+    """
+    A build read back from a journal: its settings, its source parts and the stacks
+    it made that weren't rolled back.
+    """
+    def __init__(self, record):
+        """
+        :param record: The 'build' record that starts the build.
+        :type: dict
+        """
+        self.settings = record
+        self.parts = record['parts']
+        self.instance = record.get('instance', False)
+        self.duplicate_parts = record.get('duplicate_parts')
+        self.stacks = []
+        self.chunk_sizes = []
+        self.places = {}
+
+    def add_stacks(self, record):
+        """
+        :param record: A 'stacks' record.
+        :type: dict
+
+        :return: N/A
+        """
+        self.stacks.extend(zip(record['names'], record['parts'],
+                               record['translations']))
+        self.chunk_sizes.append(len(record['names']))
+
+    def add_places(self, record):
+        """
+        :param record: A 'place' record.
+        :type: dict
+
+        :return: N/A
+        """
+        translations = record['translations']
+        for index, name in enumerate(record['names']):
+            self.places[name] = translations[index * 3:index * 3 + 3]
+
+    def rollback(self):
+        """
+        Forgets the stacks made so far.
+
+        :return: N/A
+        """
+        self.stacks = []
+        self.chunk_sizes = []
+        self.places = {}
+
+    def is_complete(self):
+        """
+        :return: Whether the journal holds every stack the build was asked to make
+        :type: bool
+        """
+        return len(self.stacks) >= self.settings['stack_count']
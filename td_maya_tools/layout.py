@@ -0,0 +1,518 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Applies layouts to the stacks in a scene.
+
+:description:
+    This module moves stack groups to the translations stored in a layout. The current
+    translations of every stack in the layout are read with one bulk query and compared
+    with the layout in a single pass, and only the stacks that are out of place get
+    moved, with one move per stack covering all of its axes. Applying a layout that is
+    already in place makes no moves at all.
+    It also exports the stacks in a scene back out to a layout file. Their translations
+    are queried a chunk at a time and streamed to the file, so the whole scene never has
+    to be held in memory.
+    A directory or glob of layout files can be applied together. The files are read in
+    a thread pool (or a process pool outside of Maya) and merged in the order of their
+    names. A stack that more than one file places differently is a conflict, which is
+    settled by the conflict policy: the last file wins, the first file wins, or nothing
+    is applied. The merged layout is applied in one pass, and the report says how long
+    each file took and why any file couldn't be read, so one bad file never stops the
+    rest from loading.
+
+        report = layout.apply_layout_files('/shots/layouts', conflict='first')
+        print(report.summary())
+
+:applications:
+    Maya, standalone Python
+
+:see_also:
+    gen_utils.py
+    scene.py
+    builder_gui.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+from array import array
+import glob
+import os
+import re
+import timeit
+
+# Imports That You Wrote
+from td_maya_tools import gen_utils
+from td_maya_tools import instrument
+from td_maya_tools import lazy
+from td_maya_tools import scene
+from td_maya_tools import validation
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+DEFAULT_TOLERANCE = 1e-6
+
+# The names the builder gives stack groups
+STACK_NAME = re.compile(r'^stack(\d+)$')
+
+# The files picked up when a directory of layouts is loaded
+LAYOUT_PATTERNS = ('*.txt', '*.xml', '*.xml.gz', '*' + gen_utils.BINARY_EXTENSION)
+
+# How a stack placed differently by more than one file is settled
+CONFLICT_POLICIES = ('last', 'first', 'error')
+
+
+@instrument.timed('layout_apply')
+def apply_layout(layout, tolerance=DEFAULT_TOLERANCE):
+    """
+    Moves the stacks in the scene to the translations in a layout, skipping the ones
+    that are already there.
+
+    :param layout: The stacks and their transform values.
+    :type: gen_utils.StackLayout
+
+    :param tolerance: How far an axis can be from the layout and still count as in
+    place. (Def=1e-6)
+    :type: float
+
+    :return: What was moved, left alone and not found
+    :type: ApplyReport
+    """
+    backend = scene.get_backend()
+    names = layout.names
+    current = backend.translations(names)
+
+    report = ApplyReport(len(names))
+    for row, target in find_changes(layout, current, tolerance):
+        backend.move(names[row], target)
+        report.moved += 1
+    report.missing = [name for name, translation in zip(names, current)
+                      if translation is None]
+    report.unchanged = report.total - report.moved - len(report.missing)
+    return report
+
+
+@instrument.timed('layout_export')
+def export_layout(xml_path, groups=None, compress=None, chunk_size=4096):
+    """
+    Writes the translations of the stacks in the scene to a layout XML file.
+
+    :param xml_path: The path of the XML file to write. A path ending in .gz is gzipped.
+    :type: str
+
+    :param groups: The stack groups to export. (Def=every stack group in the scene)
+    :type: list of strings
+
+    :param compress: Gzip the file. (Def=when the path ends in .gz)
+    :type: bool
+
+    :param chunk_size: How many stacks to query at a time. (Def=4096)
+    :type: int
+
+    :return: The number of stacks written
+    :type: int
+    """
+    backend = scene.get_backend()
+    if groups is None:
+        groups = find_stack_groups()
+
+    with gen_utils.StackXmlWriter(xml_path, compress) as writer:
+        for start in range(0, len(groups), chunk_size):
+            names = groups[start:start + chunk_size]
+            for name, translation in zip(names, backend.translations(names)):
+                # Groups that have been deleted since they were listed are left out
+                if translation is not None:
+                    writer.write_stack(name, *translation)
+        return writer.count
+
+
+def find_stack_groups():
+    """
+    :return: The stack groups in the scene, in the order they were made
+    :type: list of strings
+    """
+    numbered = []
+    for name in scene.get_backend().ls():
+        match = STACK_NAME.match(name)
+        if match:
+            numbered.append((int(match.group(1)), name))
+    numbered.sort()
+    return [name for number, name in numbered]
+
+
+def find_changes(layout, current, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compares the translations in a layout with the current ones.
+
+    :param layout: The stacks and their transform values.
+    :type: gen_utils.StackLayout
+
+    :param current: The current translation of each stack in the layout, or None for a
+    stack that isn't in the scene.
+    :type: list of lists
+
+    :param tolerance: How far an axis can be from the layout and still count as in
+    place. (Def=1e-6)
+    :type: float
+
+    :return: The row of each stack that needs moving with the axes to move it to. Axes
+    the layout doesn't set are None.
+    :type: list of tuples (int, list)
+    """
+    numpy = lazy.get_numpy()
+    if numpy is not None and len(current):
+        return _find_changes_numpy(numpy, layout, current, tolerance)
+
+    changes = []
+    for row, translation in enumerate(current):
+        if translation is None:
+            continue
+        target = [layout.tx[row], layout.ty[row], layout.tz[row]]
+
+        # NaN means the layout doesn't set that axis
+        target = [value if value == value else None for value in target]
+        if any(value is not None and abs(value - translation[axis]) > tolerance
+               for axis, value in enumerate(target)):
+            changes.append((row, target))
+    return changes
+
+
+def _find_changes_numpy(numpy, layout, current, tolerance):
+    target = numpy.array([layout.tx, layout.ty, layout.tz], dtype=float).T
+    found = numpy.array([translation is not None for translation in current])
+    now = numpy.array([translation if translation is not None else (0.0, 0.0, 0.0)
+                       for translation in current], dtype=float)
+
+    # Axes the layout doesn't set never count as out of place
+    is_set = ~numpy.isnan(target)
+    distance = numpy.abs(numpy.where(is_set, target, now) - now)
+    out_of_place = is_set & (distance > tolerance)
+    rows = numpy.nonzero(found & out_of_place.any(axis=1))[0]
+
+    return [(int(row), [float(value) if flag else None
+                        for value, flag in zip(target[row], is_set[row])])
+            for row in rows]
+
+
+@instrument.timed('layout_apply_files')
+def apply_layout_files(source, conflict='last', workers=None, processes=False,
+                       tolerance=DEFAULT_TOLERANCE):
+    """
+    Reads a set of layout files at once, merges them and moves the stacks in the scene
+    to the merged translations in one pass. Files that can't be read are reported and
+    left out.
+
+    :param source: A directory of layout files, a glob of them or a list of paths.
+    :type: str or list of strings
+
+    :param conflict: How a stack placed differently by more than one file is settled,
+    one of CONFLICT_POLICIES: 'last' takes the file that comes last by name, 'first'
+    the one that comes first and 'error' applies nothing. (Def='last')
+    :type: str
+
+    :param workers: How many files to read at a time. (Def=the number of CPUs)
+    :type: int
+
+    :param processes: Read the files in processes instead of threads, which only works
+    outside of Maya. (Def=False)
+    :type: bool
+
+    :param tolerance: How far an axis can be from the layout and still count as in
+    place. (Def=1e-6)
+    :type: float
+
+    :return: How each file was read, the conflicts and what was moved
+    :type: LayoutFilesReport
+    """
+    if conflict not in CONFLICT_POLICIES:
+        raise ValueError('Unknown conflict policy %r, expected one of %s'
+                         % (conflict, ', '.join(CONFLICT_POLICIES)))
+    if isinstance(source, (list, tuple)):
+        paths = list(source)
+    else:
+        paths = find_layout_files(source)
+
+    layout_files = read_layout_files(paths, workers, processes)
+    merged, conflicts = merge_layouts(layout_files, conflict)
+    report = LayoutFilesReport(layout_files, len(merged), conflicts, conflict)
+
+    # With the 'error' policy a conflict means none of the files are applied
+    if len(merged) and not (conflicts and conflict == 'error'):
+        report.applied = apply_layout(merged, tolerance)
+    return report
+
+
+def find_layout_files(source):
+    """
+    :param source: A directory of layout files or a glob of them.
+    :type: str
+
+    :return: The layout files in the directory, or the files the glob matches, sorted
+    by path
+    :type: list of strings
+    """
+    if os.path.isdir(source):
+        paths = set()
+        for pattern in LAYOUT_PATTERNS:
+            paths.update(glob.glob(os.path.join(source, pattern)))
+    else:
+        paths = glob.glob(source)
+    return sorted(path for path in paths if os.path.isfile(path))
+
+
+def read_layout_files(paths, workers=None, processes=False):
+    """
+    Reads layout files in a pool, a file per worker at a time.
+
+    :param paths: The layout files to read.
+    :type: list of strings
+
+    :param workers: How many files to read at a time. 1 reads them one after the
+    other. (Def=the number of CPUs)
+    :type: int
+
+    :param processes: Read the files in processes instead of threads, which only works
+    outside of Maya. (Def=False)
+    :type: bool
+
+    :return: Each file with its layout or the reason it couldn't be read, in the order
+    of the paths
+    :type: list of LayoutFiles
+    """
+    # The pools are imported when first used, since they take longer to import than
+    # this module
+    import multiprocessing
+    import multiprocessing.pool
+
+    workers = min(workers or multiprocessing.cpu_count(), len(paths))
+    if workers < 2:
+        return [read_layout_file(layout_path) for layout_path in paths]
+
+    if processes:
+        pool = multiprocessing.Pool(workers)
+    else:
+        pool = multiprocessing.pool.ThreadPool(workers)
+    try:
+        return pool.map(read_layout_file, paths, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def read_layout_file(layout_path):
+    """
+    Reads a layout file, catching anything that goes wrong so it can be reported.
+
+    :param layout_path: the path to an XML or binary layout file on disk
+    :type: str
+
+    :return: The file with its layout or the reason it couldn't be read
+    :type: LayoutFile
+    """
+    start = timeit.default_timer()
+    layout_file = LayoutFile(layout_path)
+    if not os.path.isfile(layout_path):
+        layout_file.error = 'The file does not exist'
+    else:
+        try:
+            # The layouts are kept in the report, so binary files aren't left mapped
+            layout_file.layout = gen_utils.read_stack_layout(layout_path, copy=True)
+        except Exception as error:
+            # A file that can't be read must not stop the others from loading
+            layout_file.error = '%s: %s' % (type(error).__name__, error)
+    layout_file.seconds = timeit.default_timer() - start
+    return layout_file
+
+
+def merge_layouts(layout_files, conflict='last'):
+    """
+    Merges the layouts of files in the order they are given. A stack in more than one
+    file is only a conflict if the files place it differently.
+
+    :param layout_files: The files to merge. Files that couldn't be read are skipped.
+    :type: list of LayoutFiles
+
+    :param conflict: How a conflict is settled: 'last' takes the later file and 'first'
+    or 'error' keep the earlier one. (Def='last')
+    :type: str
+
+    :return: The merged layout, and each conflict as the stack name with the file it
+    was already placed by and the file that placed it differently
+    :type: tuple (gen_utils.StackLayout, list of tuples (str, str, str))
+    """
+    merged = gen_utils.StackLayout()
+    names = merged.names
+    index = merged.index
+    columns = (merged.tx, merged.ty, merged.tz)
+    sources = []
+    conflicts = []
+    for layout_file in layout_files:
+        if layout_file.layout is None:
+            continue
+
+        # Mapped columns are read as lists, which is much quicker than by item
+        file_columns = [column if isinstance(column, array) else column.tolist()
+                        for column in (layout_file.layout.tx, layout_file.layout.ty,
+                                       layout_file.layout.tz)]
+        for row, name in enumerate(layout_file.layout.names):
+            values = [column[row] for column in file_columns]
+            existing = index.get(name)
+            if existing is None:
+                index[name] = len(names)
+                names.append(name)
+                sources.append(layout_file.path)
+                for column, value in zip(columns, values):
+                    column.append(value)
+                continue
+
+            if _is_same_translation(values, [column[existing] for column in columns]):
+                continue
+            conflicts.append((name, sources[existing], layout_file.path))
+            if conflict == 'last':
+                for column, value in zip(columns, values):
+                    column[existing] = value
+                sources[existing] = layout_file.path
+    return merged, conflicts
+
+
+def _is_same_translation(values, others):
+    # NaN marks an axis that isn't set, so two NaNs match
+    return all(value == other or (value != value and other != other)
+               for value, other in zip(values, others))
+
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- CLASSES --#
+
+
+class ApplyReport(object):
+    """
+    The outcome of applying a layout.
+    """
+    def __init__(self, total):
+        self.total = total
+        self.moved = 0
+        self.unchanged = 0
+        self.missing = []
+
+    def summary(self):
+        """
+        :return: A one line summary of the report
+        :type: str
+        """
+        text = 'Applied layout to %d stacks: %d moved, %d already in place, %d missing' \
+               % (self.total, self.moved, self.unchanged, len(self.missing))
+        if self.missing:
+            shown = ', '.join(self.missing[:5])
+            text += ' (%s%s)' % (shown, ', ...' if len(self.missing) > 5 else '')
+        return text
+
+
+class LayoutFile(object):
+    """
+    A layout file that was read, with its layout or the reason it couldn't be read.
+    """
+    def __init__(self, path, layout=None, seconds=0.0, error=None):
+        """
+        :param path: The path of the file.
+        :type: str
+
+        :param layout: The stacks and their transform values. (Def=None)
+        :type: gen_utils.StackLayout
+
+        :param seconds: How long reading the file took. (Def=0.0)
+        :type: float
+
+        :param error: Why the file couldn't be read. (Def=None)
+        :type: str
+        """
+        self.path = path
+        self.layout = layout
+        self.seconds = seconds
+        self.error = error
+
+    def is_valid(self):
+        """
+        :return: Whether the file was read
+        :type: bool
+        """
+        return self.error is None and self.layout is not None
+
+    def summary(self):
+        """
+        :return: A one line summary of the file
+        :type: str
+        """
+        if self.is_valid():
+            return '%s: %d stacks (%.3fs)' % (self.path, len(self.layout), self.seconds)
+        return '%s: not read, %s (%.3fs)' % (self.path, self.error, self.seconds)
+
+
+class LayoutFilesReport(object):
+    """
+    The outcome of applying a set of layout files.
+    """
+    def __init__(self, files, stack_count, conflicts, conflict='last'):
+        """
+        :param files: The files that were read.
+        :type: list of LayoutFiles
+
+        :param stack_count: The number of stacks in the merged layout.
+        :type: int
+
+        :param conflicts: Each stack placed differently by more than one file, with the
+        two files.
+        :type: list of tuples (str, str, str)
+
+        :param conflict: The conflict policy used. (Def='last')
+        :type: str
+        """
+        self.files = files
+        self.stack_count = stack_count
+        self.conflicts = conflicts
+        self.conflict = conflict
+        self.applied = None
+
+    def failed(self):
+        """
+        :return: The files that couldn't be read
+        :type: list of LayoutFiles
+        """
+        return [layout_file for layout_file in self.files if not layout_file.is_valid()]
+
+    def summary(self):
+        """
+        :return: A summary of the report, with a line for each file
+        :type: str
+        """
+        if not self.files:
+            return 'No layout files found'
+
+        lines = ['Read %d of %d layout files, %d stacks after merging (%.3fs reading)'
+                 % (len(self.files) - len(self.failed()), len(self.files),
+                    self.stack_count,
+                    sum(layout_file.seconds for layout_file in self.files))]
+        lines.extend('    ' + layout_file.summary() for layout_file in self.files)
+        if self.conflicts:
+            settled = {'last': 'the last file was used',
+                       'first': 'the first file was used',
+                       'error': 'nothing was applied'}[self.conflict]
+            lines.append('%d conflicting stacks, %s (%s)'
+                         % (len(self.conflicts), settled,
+                            validation.format_names([conflict[0] for conflict
+                                                     in self.conflicts])))
+        if self.applied is not None:
+            lines.append(self.applied.summary())
+        return '\n'.join(lines)
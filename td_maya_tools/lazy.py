@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Imports heavy and optional dependencies on first use and reloads the tools during
+    development.
+
+:description:
+    The core of the stacker tools (the scene backends, stacking, layouts, recipes and
+    layout files) only imports the standard library, so it imports in milliseconds
+    with no Maya, Qt or numpy installed. Maya is imported by scene.MayaBackend when the
+    first scene call is made, Qt and the Maya UI modules when the GUI is opened and
+    numpy through get_numpy when a vectorized path first runs.
+    Reloading the tools after editing them is only done in development mode, which is
+    turned on by setting the TD_MAYA_TOOLS_DEV environment variable. The GUI then
+    reloads every loaded module of the tools, in dependency order, each time it is
+    imported again.
+
+        import os
+        os.environ['TD_MAYA_TOOLS_DEV'] = '1'
+
+:applications:
+    Maya, standalone Python
+
+:see_also:
+    scene.py
+    builder_gui.py
+    bench.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+import os
+import sys
+
+try:
+    from importlib import reload as reload_module
+except ImportError:
+    reload_module = reload
+
+# Imports That You Wrote
+# N/A
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+DEV_ENV = 'TD_MAYA_TOOLS_DEV'
+
+# The modules that import without Maya or Qt, each after the modules it imports
+CORE_MODULES = ('td_maya_tools.scene',
+                'td_maya_tools.instrument',
+                'td_maya_tools.validation',
+                'td_maya_tools.stacker',
+                'td_maya_tools.arrange',
+                'td_maya_tools.metrics',
+                'td_maya_tools.contact',
+                'td_maya_tools.recipes',
+                'td_maya_tools.gen_utils',
+                'td_maya_tools.layout',
+                'td_maya_tools.templates',
+                'td_maya_tools.builder',
+                'td_maya_tools.journal')
+
+GUI_MODULES = ('td_maya_tools.guis.stack_model',)
+
+_numpy = False
+
+
+def get_numpy():
+    """
+    Imports numpy the first time it is asked for, since importing it takes longer
+    than importing all of the core.
+
+    :return: The numpy module, or None if it isn't installed
+    :type: module
+    """
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+def is_dev_mode():
+    """
+    :return: Whether the TD_MAYA_TOOLS_DEV environment variable is set to something
+    other than '' or '0'
+    :type: bool
+    """
+    return os.environ.get(DEV_ENV, '') not in ('', '0')
+
+
+def reload_modules(names=CORE_MODULES + GUI_MODULES):
+    """
+    Reloads the modules that have already been imported, in the order given, so
+    edits to them take effect without restarting Maya.
+
+    :param names: The full names of the modules to reload. (Def=every core and GUI
+    module)
+    :type: list of strings
+
+    :return: The names of the modules that were reloaded
+    :type: list of strings
+    """
+    reloaded = []
+    for name in names:
+        module = sys.modules.get(name)
+        if module is not None:
+            reload_module(module)
+            reloaded.append(name)
+    return reloaded
+
+
+def reload_if_dev_mode():
+    """
+    Reloads every loaded module of the tools while in development mode, and does
+    nothing otherwise.
+
+    :return: The names of the modules that were reloaded
+    :type: list of strings
+    """
+    if not is_dev_mode():
+        return []
+    return reload_modules()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Remembers the bounds of the source parts of a build.
+
+:description:
+    This module queries the bounding box and translation of every source part once, so
+    the final place of every copy can be worked out without querying the copies. A
+    copy starts with the same bounding box as its source part and moving it shifts the
+    bounding box by the same amount, so the moves that stack the copies and the bounds
+    of the finished stack follow from the source bounds alone.
+
+:applications:
+    Maya, standalone Python
+
+:see_also:
+    builder.py
+    stacker.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+# N/A
+
+# Imports That You Wrote
+from td_maya_tools import scene
+from td_maya_tools import stacker
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+
+def shift_bbox(bounding_box, offset):
+    """
+    :param bounding_box: A bounding box as returned by a bounding box query.
+    :type: list (xmin, ymin, zmin, xmax, ymax, zmax)
+
+    :param offset: The relative (x, y, z) move.
+    :type: list
+
+    :return: The bounding box after moving it by the offset
+    :type: list
+    """
+    return [bounding_box[index] + offset[index % 3] for index in range(6)]
+
+
+def merge_bboxes(bounding_boxes):
+    """
+    :param bounding_boxes: The bounding boxes to merge.
+    :type: list of lists (xmin, ymin, zmin, xmax, ymax, zmax)
+
+    :return: The bounding box around all of them
+    :type: list
+    """
+    return [min(bbox[index] for bbox in bounding_boxes) for index in range(3)] + \
+           [max(bbox[index] for bbox in bounding_boxes) for index in range(3, 6)]
+
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- CLASSES --#
+
+
+class PartMetrics(object):
+    """
+    The bounding box and translation of each source part, queried once.
+    """
+    def __init__(self, parts, backend=None):
+        """
+        :param parts: The source parts. Parts listed more than once are queried once.
+        :type: list of strings
+
+        :param backend: The backend to query. (Def=the active backend)
+        :type: scene.SceneBackend
+        """
+        backend = backend or scene.get_backend()
+
+        unique = []
+        seen = set()
+        for part in parts:
+            if part not in seen:
+                seen.add(part)
+                unique.append(part)
+
+        self._bboxes = {}
+        self._translations = {}
+        self._query(unique, backend)
+
+    def _query(self, parts, backend):
+        for part, translation in zip(parts, backend.translations(parts)):
+            self._bboxes[part] = list(backend.bounding_box(part))
+            self._translations[part] = translation
+
+    def bounding_box(self, part):
+        """
+        :return: The world space bounding box of a source part
+        :type: list (xmin, ymin, zmin, xmax, ymax, zmax)
+        """
+        return self._bboxes[part]
+
+    def translation(self, part):
+        """
+        :return: The world space translation of a source part
+        :type: list (x, y, z)
+        """
+        return self._translations[part]
+
+    def width(self, part):
+        """
+        :return: The size of a source part in x
+        :type: float
+        """
+        bounding_box = self._bboxes[part]
+        return bounding_box[3] - bounding_box[0]
+
+    def height(self, part):
+        """
+        :return: The size of a source part in y
+        :type: float
+        """
+        bounding_box = self._bboxes[part]
+        return bounding_box[4] - bounding_box[1]
+
+    def center_offset(self, part):
+        """
+        :return: How far the bottom center of a source part is from its translation
+        :type: list (x, y, z)
+        """
+        bottom = stacker.get_bbox_center(self._bboxes[part], bottom=True)
+        return [bottom[axis] - self._translations[part][axis] for axis in range(3)]
+
+    def plan_stack(self, parts):
+        """
+        Works out the moves that stack copies of source parts, the same way placing the
+        base on the grid and stacker.stack_objs would.
+
+        :param parts: The source part of each copy in the stack, from the base up.
+        :type: list of strings
+
+        :return: The absolute translation of the base, the relative move of every part
+        (the first is always zero) and the bounding box of the finished stack
+        :type: tuple (list, list of lists, list)
+        """
+        base_bbox = self._bboxes[parts[0]]
+        base_translation = [0.0, -base_bbox[1], 0.0]
+
+        # The base moves from its source translation to the grid
+        source = self._translations[parts[0]]
+        base_shift = [base_translation[axis] - source[axis] for axis in range(3)]
+
+        bounding_boxes = [shift_bbox(base_bbox, base_shift)] + \
+                         [self._bboxes[part] for part in parts[1:]]
+        offsets = self._stack_offsets(parts, bounding_boxes)
+        stack_bbox = merge_bboxes([shift_bbox(bbox, offset)
+                                   for bbox, offset in zip(bounding_boxes, offsets)])
+        return base_translation, offsets, stack_bbox
+
+    def copy_translations(self, parts, base_translation, offsets):
+        """
+        :param parts: The source part of each copy in a stack, from the base up.
+        :type: list of strings
+
+        :param base_translation: Where the base is moved to.
+        :type: list (x, y, z)
+
+        :param offsets: The relative move of every part, as planned for the stack.
+        :type: list of lists
+
+        :return: The world space translation of every copy once the stack is made,
+        three values per copy
+        :type: list of floats
+        """
+        translations = list(base_translation)
+        for part, offset in zip(parts[1:], offsets[1:]):
+            source = self._translations[part]
+            translations.extend(source[axis] + offset[axis] for axis in range(3))
+        return translations
+
+    def _stack_offsets(self, parts, bounding_boxes):
+        # Bounding box centers meet, the way stacker.stack_objs stacks
+        return stacker.get_stack_offsets(bounding_boxes)
+
+    def __contains__(self, part):
+        return part in self._bboxes
+
+    def __len__(self):
+        return len(self._bboxes)
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Picks the parts of every stack from a seed.
+
+:description:
+    This module samples stack recipes: which base part, how many and which middle parts
+    and which top part each stack gets. Every pick is a hash of the seed and the pick's
+    position, so all the picks of a build are made in one batch (vectorized with numpy
+    when it is installed), any range of stacks can be sampled on its own, and the same
+    seed always gives the same recipes with or without numpy. Recipes are kept as
+    compact arrays of indices into the part pools.
+
+:applications:
+    Maya, standalone Python
+
+:see_also:
+    builder.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+from array import array
+import random
+
+# Imports That You Wrote
+from td_maya_tools import lazy
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+MASK64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+MIX_1 = 0xBF58476D1CE4E5B9
+MIX_2 = 0x94D049BB133111EB
+MAX_SEED = (1 << 31) - 1
+
+
+def random_seed():
+    """
+    :return: A new seed for builds that don't ask for one
+    :type: int
+    """
+    return random.SystemRandom().randint(0, MAX_SEED)
+
+
+def sample_recipes(top_count, mid_count, base_count, stack_count, max_height, seed,
+                   start=0):
+    """
+    Picks the parts of a batch of stacks. Each stack gets a base part, between one and
+    max_height middle parts and a top part.
+
+    :param top_count: The number of parts in the top pool.
+    :type: int
+
+    :param mid_count: The number of parts in the middle pool.
+    :type: int
+
+    :param base_count: The number of parts in the base pool.
+    :type: int
+
+    :param stack_count: The number of stacks to pick parts for.
+    :type: int
+
+    :param max_height: The most middle parts a stack can have.
+    :type: int
+
+    :param seed: The seed of the build.
+    :type: int
+
+    :param start: The index of the first stack, so a build can be sampled in pieces
+    that match sampling it all at once. (Def=0)
+    :type: int
+
+    :return: The recipes
+    :type: RecipeBatch
+    """
+    # Column 0 picks the base, 1 the number of middle parts, then one column per middle
+    # part and the last column picks the top
+    width = max_height + 3
+    pool_sizes = [base_count, max_height] + [mid_count] * max_height + [top_count]
+    key = _mix(seed & MASK64)
+
+    numpy = lazy.get_numpy()
+    if numpy is not None:
+        picks = _sample_numpy(numpy, key, start, stack_count, width, pool_sizes)
+    else:
+        picks = _sample_python(key, start, stack_count, width, pool_sizes)
+
+    return RecipeBatch(stack_count, max_height, seed, picks)
+
+
+def _mix(value):
+    # The splitmix64 finalizer
+    value = ((value ^ (value >> 30)) * MIX_1) & MASK64
+    value = ((value ^ (value >> 27)) * MIX_2) & MASK64
+    return value ^ (value >> 31)
+
+
+def _sample_python(key, start, stack_count, width, pool_sizes):
+    picks = array('l', [0]) * (stack_count * width)
+    position = 0
+    for stack in range(start, start + stack_count):
+        counter = stack * width
+        for column in range(width):
+            value = _mix((key + (counter + column) * GOLDEN_GAMMA) & MASK64)
+
+            # Scale the top 32 bits to the pool size, one multiply per pick
+            picks[position] = ((value >> 32) * pool_sizes[column]) >> 32
+            position += 1
+    return picks
+
+
+def _sample_numpy(numpy, key, start, stack_count, width, pool_sizes):
+    uint = numpy.uint64
+    counters = numpy.arange(start * width, (start + stack_count) * width, dtype=uint)
+
+    # uint64 arithmetic wraps the same way as the masked Python version
+    with numpy.errstate(over='ignore'):
+        value = uint(key) + counters * uint(GOLDEN_GAMMA)
+        value = (value ^ (value >> uint(30))) * uint(MIX_1)
+        value = (value ^ (value >> uint(27))) * uint(MIX_2)
+        value = value ^ (value >> uint(31))
+
+        sizes = numpy.tile(numpy.array(pool_sizes, dtype=uint), stack_count)
+        picks = ((value >> uint(32)) * sizes) >> uint(32)
+    return picks.astype(numpy.int32)
+
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- CLASSES --#
+
+
+class RecipeBatch(object):
+    """
+    The picks of a batch of stacks, stored as one flat array of indices into the part
+    pools with max_height + 3 columns per stack: the base, the number of middle parts
+    minus one, a middle part per possible slot and the top.
+    """
+    __slots__ = ('count', 'max_height', 'seed', 'picks')
+
+    def __init__(self, count, max_height, seed, picks):
+        self.count = count
+        self.max_height = max_height
+        self.seed = seed
+        self.picks = picks
+
+    def recipe(self, index):
+        """
+        :param index: The index of a stack in the batch.
+        :type: int
+
+        :return: The pool indices of the stack's base part, middle parts and top part
+        :type: tuple (int, list of ints, int)
+        """
+        width = self.max_height + 3
+        row = self.picks[index * width:(index + 1) * width]
+        mids = [int(value) for value in row[2:2 + int(row[1]) + 1]]
+        return int(row[0]), mids, int(row[width - 1])
+
+    def parts(self, index, top_objs, mid_objs, base_objs):
+        """
+        :param index: The index of a stack in the batch.
+        :type: int
+
+        :param top_objs: The top part pool.
+        :type: list of strings
+
+        :param mid_objs: The middle part pool.
+        :type: list of strings
+
+        :param base_objs: The base part pool.
+        :type: list of strings
+
+        :return: The parts of the stack, from the base up
+        :type: list of strings
+        """
+        base, mids, top = self.recipe(index)
+        return [base_objs[base]] + [mid_objs[mid] for mid in mids] + [top_objs[top]]
+
+    def __len__(self):
+        return self.count
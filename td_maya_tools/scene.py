@@ -0,0 +1,953 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Scene backends used by the stacker tools.
+
+:description:
+    This module wraps the handful of scene calls the stacker tools make (bounding box
+    and vertex queries, single and bulk moves, duplicates, instances, groups,
+    parenting, deletes, existence checks and selection) behind a small backend
+    interface. The Maya backend forwards them to maya.cmds, and the memory backend
+    keeps a pure Python scene graph of transforms and bounding boxes, with optional
+    vertex positions, so stacks can be built, profiled and benchmarked without a Maya
+    session.
+    The tools ask for the active backend with get_backend(), which is the Maya backend
+    unless another one has been set with set_backend().
+
+:applications:
+    Maya, standalone Python
+
+:see_also:
+    stacker.py
+    builder.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+from array import array
+import collections
+import contextlib
+import math
+import re
+
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
+
+# Imports That You Wrote
+# N/A
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+_backend = None
+
+# The most nodes the Maya backend moves with one MEL script
+MEL_BATCH_SIZE = 1000
+
+
+def get_backend():
+    """
+    Returns the backend the tools should send their scene calls to. A Maya backend is
+    created the first time if none has been set.
+
+    :return: The active backend
+    :type: SceneBackend
+    """
+    global _backend
+    if _backend is None:
+        _backend = MayaBackend()
+    return _backend
+
+
+def set_backend(backend):
+    """
+    Sets the backend the tools send their scene calls to.
+
+    :param backend: The backend to use, or None to go back to the Maya backend.
+    :type: SceneBackend
+
+    :return: The backend that was active before
+    :type: SceneBackend
+    """
+    global _backend
+    previous = _backend
+    _backend = backend
+    return previous
+
+
+def get_finite_translation(name, translation):
+    """
+    :param name: The name of the transform node the translation is for.
+    :type: str
+
+    :param translation: An (x, y, z) translation.
+    :type: list of floats
+
+    :return: The translation as floats. Raises a ValueError naming the node if any
+    value is NaN or infinite.
+    :type: tuple (x, y, z)
+    """
+    values = (float(translation[0]), float(translation[1]), float(translation[2]))
+    for value in values:
+        if math.isnan(value) or math.isinf(value):
+            raise ValueError('Cannot move %s to %r, %r, %r' % ((name,) + values))
+    return values
+
+
+@contextlib.contextmanager
+def use_backend(backend):
+    """
+    Makes a backend active for the duration of a with block.
+
+    :param backend: The backend to use inside the block.
+    :type: SceneBackend
+
+    :return: The backend
+    :type: SceneBackend
+    """
+    previous = set_backend(backend)
+    try:
+        yield backend
+    finally:
+        set_backend(previous)
+
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- CLASSES --#
+
+
+class SceneBackend(object):
+    """
+    The scene calls made by the stacker tools. Every backend implements these.
+    """
+    def bounding_box(self, name):
+        """
+        :param name: The name of a transform node.
+        :type: str
+
+        :return: The world space bounding box of the node and everything under it
+        :type: list (xmin, ymin, zmin, xmax, ymax, zmax)
+        """
+        raise NotImplementedError
+
+    def vertices(self, name):
+        """
+        Queries the world space positions of every vertex of the meshes under a
+        transform node at once.
+
+        :param name: The name of a transform node.
+        :type: str
+
+        :return: The x, y and z of each vertex one after the other, in one buffer
+        :type: array of doubles
+        """
+        raise NotImplementedError
+
+    def translations(self, names):
+        """
+        Queries the world space translations of many transform nodes at once.
+
+        :param names: The names of the transform nodes.
+        :type: list of strings
+
+        :return: The (x, y, z) translation of each node, or None for a node that doesn't
+        exist
+        :type: list of lists
+        """
+        raise NotImplementedError
+
+    def move(self, name, translation, relative=False):
+        """
+        Moves a transform node.
+
+        :param name: The name of a transform node.
+        :type: str
+
+        :param translation: The (x, y, z) to move by or to. With an absolute move, an
+        axis set to None is left where it is.
+        :type: list
+
+        :param relative: Move by the translation instead of to it. (Def=False)
+        :type: bool
+
+        :return: N/A
+        """
+        raise NotImplementedError
+
+    def set_translations(self, names, translations):
+        """
+        Moves many transform nodes to world space translations at once. Nothing is
+        moved if any translation is NaN or infinite, which raises a ValueError.
+
+        :param names: The names of the transform nodes.
+        :type: list of strings
+
+        :param translations: The (x, y, z) to move each node to.
+        :type: list of lists
+
+        :return: N/A
+        """
+        raise NotImplementedError
+
+    def duplicate(self, names):
+        """
+        Duplicates one or more transform nodes with a single call. A name that is listed
+        more than once is duplicated once per entry.
+
+        :param names: The name or names of the transform nodes to duplicate.
+        :type: str or list of strings
+
+        :return: The name of each new transform node, or a single name if a single name
+        was passed in
+        :type: str or list of strings
+        """
+        raise NotImplementedError
+
+    def instance(self, names):
+        """
+        Instances one or more transform nodes with a single call. The new transform nodes
+        share the shape nodes of the originals instead of copying them. A name that is
+        listed more than once is instanced once per entry.
+
+        :param names: The name or names of the transform nodes to instance.
+        :type: str or list of strings
+
+        :return: The name of each new transform node, or a single name if a single name
+        was passed in
+        :type: str or list of strings
+        """
+        raise NotImplementedError
+
+    def duplicate_group(self, name, new_name, instance_leaf=False):
+        """
+        Duplicates a group and everything under it with a single call.
+
+        :param name: The name of the group to duplicate.
+        :type: str
+
+        :param new_name: The name to give the new group.
+        :type: str
+
+        :param instance_leaf: Share the shapes under the group with the new group
+        instead of copying them. (Def=False)
+        :type: bool
+
+        :return: The name of the new group and the names of the transforms directly
+        under it, in the same order as under the original
+        :type: tuple (str, list of strings)
+        """
+        raise NotImplementedError
+
+    def group(self, name):
+        """
+        Creates an empty group at the origin.
+
+        :param name: The name to give the group.
+        :type: str
+
+        :return: The name the group was given
+        :type: str
+        """
+        raise NotImplementedError
+
+    def parent(self, children, parent):
+        """
+        Parents one or more transform nodes under another one with a single call, keeping
+        their world positions.
+
+        :param children: The name or names of the nodes to parent.
+        :type: str or list of strings
+
+        :param parent: The name of the new parent node.
+        :type: str
+
+        :return: N/A
+        """
+        raise NotImplementedError
+
+    def delete(self, names):
+        """
+        Deletes one or more nodes and everything under them with a single call.
+
+        :param names: The name or names of the nodes to delete.
+        :type: str or list of strings
+
+        :return: N/A
+        """
+        raise NotImplementedError
+
+    def obj_exists(self, name):
+        """
+        :param name: The name of a node.
+        :type: str
+
+        :return: Whether the node exists
+        :type: bool
+        """
+        raise NotImplementedError
+
+    def objs_exist(self, names):
+        """
+        Checks whether many nodes exist with one query.
+
+        :param names: The names of the nodes.
+        :type: list of strings
+
+        :return: Whether each node exists
+        :type: list of bools
+        """
+        raise NotImplementedError
+
+    def ls(self, selection=False):
+        """
+        :param selection: Only list the selected nodes. (Def=False)
+        :type: bool
+
+        :return: The names of the nodes
+        :type: list of strings
+        """
+        raise NotImplementedError
+
+    def select(self, names):
+        """
+        Replaces the selection.
+
+        :param names: The name or names of the nodes to select.
+        :type: str or list of strings
+
+        :return: N/A
+        """
+        raise NotImplementedError
+
+    # noinspection PyMethodMayBeStatic
+    @contextlib.contextmanager
+    def undo_chunk(self, name='td_maya_tools'):
+        """
+        Makes every scene call inside a with block a single undo step. Backends without
+        an undo queue don't need to override this.
+
+        :param name: The name of the undo step. (Def='td_maya_tools')
+        :type: str
+
+        :return: N/A
+        """
+        yield
+
+
+class MayaBackend(SceneBackend):
+    """
+    Sends the scene calls to maya.cmds.
+    """
+    def __init__(self):
+        import maya.cmds as cmds
+        self.cmds = cmds
+
+    def bounding_box(self, name):
+        return self.cmds.xform(name, boundingBox=True, query=True)
+
+    def vertices(self, name):
+        # One xform call per mesh returns all of its vertices as a flat list
+        cmds = self.cmds
+        shapes = cmds.listRelatives(name, allDescendents=True, type='mesh',
+                                    fullPath=True) or []
+        points = array('d')
+        for shape in cmds.ls(shapes, noIntermediate=True) if shapes else []:
+            points.extend(cmds.xform(shape + '.vtx[*]', query=True, worldSpace=True,
+                                     translation=True))
+        return points
+
+    def translations(self, names):
+        # One pass through the API is much cheaper than an xform call per node
+        import maya.api.OpenMaya as om
+
+        result = []
+        for name in names:
+            selection = om.MSelectionList()
+            try:
+                selection.add(name)
+            except RuntimeError:
+                result.append(None)
+                continue
+            transform = om.MFnTransform(selection.getDagPath(0))
+            translation = transform.translation(om.MSpace.kWorld)
+            result.append([translation.x, translation.y, translation.z])
+        return result
+
+    def move(self, name, translation, relative=False):
+        if relative:
+            self.cmds.move(translation[0], translation[1], translation[2], name,
+                           relative=True)
+            return
+
+        # Only pass the axis flags when some of the axes are left alone
+        axes = [value is not None for value in translation]
+        values = [value or 0 for value in translation]
+        if all(axes):
+            self.cmds.move(values[0], values[1], values[2], name, absolute=True)
+        else:
+            self.cmds.move(values[0], values[1], values[2], name, absolute=True,
+                           moveX=axes[0], moveY=axes[1], moveZ=axes[2])
+
+    def set_translations(self, names, translations):
+        # A MEL script of moves per batch of nodes costs far less than a Python command
+        # call per node, and every move is still part of the undo step. Every line is
+        # made before any is run, since MEL can't parse NaN or infinite values and a
+        # bad one must not leave the scene half moved.
+        import maya.mel as mel
+
+        lines = ['move -absolute %r %r %r "%s";'
+                 % (get_finite_translation(name, translation) + (name,))
+                 for name, translation in zip(names, translations)]
+        for start in range(0, len(lines), MEL_BATCH_SIZE):
+            mel.eval('\n'.join(lines[start:start + MEL_BATCH_SIZE]))
+
+    def duplicate(self, names):
+        if isinstance(names, string_types):
+            return self.cmds.duplicate(names, returnRootsOnly=True)[0]
+        return self._copy_in_rounds(names, self.cmds.duplicate, returnRootsOnly=True)
+
+    def instance(self, names):
+        if isinstance(names, string_types):
+            return self.cmds.instance(names)[0]
+        return self._copy_in_rounds(names, self.cmds.instance)
+
+    def duplicate_group(self, name, new_name, instance_leaf=False):
+        group = self.cmds.duplicate(name, name=new_name, renameChildren=True,
+                                    instanceLeaf=instance_leaf, returnRootsOnly=True)[0]
+        return group, self.cmds.listRelatives(group, children=True,
+                                              type='transform') or []
+
+    # noinspection PyMethodMayBeStatic
+    def _copy_in_rounds(self, names, command, **kwargs):
+        # Maya copies a node once per call however often it is listed, so repeated
+        # names are copied in rounds. Every round copies the sources and the copies made
+        # so far, which doubles the copies of each name until there are enough.
+        needed = collections.Counter(names)
+        copies = dict((name, []) for name in needed)
+        while True:
+            owners = []
+            sources = []
+            for name, count in needed.items():
+                made = copies[name]
+                batch = ([name] + made)[:count - len(made)]
+                owners.extend([name] * len(batch))
+                sources.extend(batch)
+            if not sources:
+                break
+            new_names = command(sources, **kwargs)
+            for name, new_name in zip(owners, new_names):
+                copies[name].append(new_name)
+
+        # Hand the copies out in the order the names were given
+        copies = dict((name, iter(made)) for name, made in copies.items())
+        return [next(copies[name]) for name in names]
+
+    def group(self, name):
+        return self.cmds.group(empty=True, name=name)
+
+    def parent(self, children, parent):
+        self.cmds.parent(children, parent)
+
+    def delete(self, names):
+        self.cmds.delete(names)
+
+    def obj_exists(self, name):
+        return self.cmds.objExists(name)
+
+    def objs_exist(self, names):
+        if not names:
+            return []
+        # ls hands back the full path of each node it finds, whatever part of the path
+        # it was asked for, so a name exists if it is the end of one of those paths
+        found = set()
+        for path in self.cmds.ls(names, long=True) or []:
+            parts = path.split('|')
+            found.update('|'.join(parts[index:]) for index in range(len(parts)))
+        return [name in found for name in names]
+
+    def ls(self, selection=False):
+        return self.cmds.ls(selection=selection)
+
+    def select(self, names):
+        self.cmds.select(names)
+
+    @contextlib.contextmanager
+    def undo_chunk(self, name='td_maya_tools'):
+        self.cmds.undoInfo(openChunk=True, chunkName=name)
+        try:
+            yield
+        finally:
+            self.cmds.undoInfo(closeChunk=True)
+
+
+class MemoryBackend(SceneBackend):
+    """
+    A pure Python scene graph of transform nodes. Each node has a translation, an
+    optional shape with an object space bounding box and a list of children, which is
+    all the stacker tools need to lay out stacks. A shape can also have vertex
+    positions, standing in for a mesh; one without them has the corners of its
+    bounding box as its vertices.
+    """
+    def __init__(self):
+        self._nodes = {}
+        self._selection = []
+        self._name_counters = {}
+
+    def create_part(self, name, bounding_box=None, translation=(0.0, 0.0, 0.0),
+                    points=None):
+        """
+        Creates a transform node with a shape, the way a modelled part would be.
+
+        :param name: The name to give the part.
+        :type: str
+
+        :param bounding_box: The object space bounding box of the part's shape.
+        (Def=the bounds of the points)
+        :type: list (xmin, ymin, zmin, xmax, ymax, zmax)
+
+        :param translation: The translation of the part. (Def=origin)
+        :type: list
+
+        :param points: The object space x, y and z of each vertex of the shape, one
+        after the other. (Def=None)
+        :type: list of floats
+
+        :return: The name the part was given
+        :type: str
+        """
+        if points is not None:
+            points = array('d', points)
+        if bounding_box is None:
+            bounding_box = [min(points[axis::3]) for axis in range(3)] + \
+                           [max(points[axis::3]) for axis in range(3)]
+        node = self._add_node(name, translation)
+        node.shape = _Shape([float(value) for value in bounding_box], points)
+        return node.name
+
+    def translation(self, name):
+        """
+        :param name: The name of a transform node.
+        :type: str
+
+        :return: The local translation of the node
+        :type: list
+        """
+        return list(self._get_node(name).translation)
+
+    def parent_of(self, name):
+        """
+        :param name: The name of a transform node.
+        :type: str
+
+        :return: The name of the node's parent, or None if it is under the world
+        :type: str
+        """
+        parent = self._get_node(name).parent
+        return parent.name if parent is not None else None
+
+    def bounding_box(self, name):
+        node = self._get_node(name)
+        bounding_box = self._node_bbox(node, self._world_translation(node.parent))
+        if bounding_box is None:
+            return [0.0] * 6
+        return bounding_box
+
+    def vertices(self, name):
+        node = self._get_node(name)
+        points = array('d')
+        self._node_vertices(node, self._world_translation(node.parent), points)
+        return points
+
+    def translations(self, names):
+        nodes = self._nodes
+        return [self._world_translation(nodes[name]) if name in nodes else None
+                for name in names]
+
+    def move(self, name, translation, relative=False):
+        node = self._get_node(name)
+        if relative:
+            for axis in range(3):
+                node.translation[axis] += translation[axis]
+            return
+
+        # Absolute moves are in world space, so take the parent's position off
+        parent_translation = self._world_translation(node.parent)
+        for axis in range(3):
+            if translation[axis] is not None:
+                node.translation[axis] = translation[axis] - parent_translation[axis]
+
+    def set_translations(self, names, translations):
+        nodes = [self._get_node(name) for name in names]
+        translations = [get_finite_translation(node.name, translation)
+                        for node, translation in zip(nodes, translations)]
+        for node, translation in zip(nodes, translations):
+            parent_translation = self._world_translation(node.parent)
+            node.translation = [translation[axis] - parent_translation[axis]
+                                for axis in range(3)]
+
+    def duplicate(self, names):
+        if isinstance(names, string_types):
+            node = self._get_node(names)
+            return self._copy_node(node, node.parent).name
+
+        nodes = [self._get_node(name) for name in names]
+        return [self._copy_node(node, node.parent).name for node in nodes]
+
+    def instance(self, names):
+        if isinstance(names, string_types):
+            return self.instance([names])[0]
+
+        new_names = []
+        for node in [self._get_node(name) for name in names]:
+            # The new transform shares the shape of the original
+            copy = self._add_node(node.name, node.translation, node.parent)
+            copy.shape = node.shape
+            new_names.append(copy.name)
+        return new_names
+
+    def duplicate_group(self, name, new_name, instance_leaf=False):
+        node = self._get_node(name)
+        copy = self._copy_node(node, node.parent, new_name, instance_leaf)
+        return copy.name, [child.name for child in copy.children]
+
+    def node_count(self):
+        """
+        :return: The number of transform and shape nodes in the scene, counting a
+        shape shared by instances once
+        :type: int
+        """
+        shapes = set(id(node.shape) for node in self._nodes.values()
+                     if node.shape is not None)
+        return len(self._nodes) + len(shapes)
+
+    def group(self, name):
+        return self._add_node(name).name
+
+    def parent(self, children, parent):
+        if isinstance(children, string_types):
+            children = [children]
+        child_nodes = [self._get_node(child) for child in children]
+        parent_node = self._get_node(parent)
+        parent_world = self._world_translation(parent_node)
+
+        for child_node in child_nodes:
+            # Keep the world position of the child
+            world = self._world_translation(child_node)
+            child_node.translation = [world[axis] - parent_world[axis]
+                                      for axis in range(3)]
+
+            if child_node.parent is not None:
+                child_node.parent.children.remove(child_node)
+            child_node.parent = parent_node
+            parent_node.children.append(child_node)
+
+    def delete(self, names):
+        if isinstance(names, string_types):
+            names = [names]
+        nodes = [self._get_node(name) for name in names]
+
+        for node in nodes:
+            # A node deleted with a parent earlier in the list is already gone, which
+            # Maya allows too
+            if self._nodes.get(node.name) is not node:
+                continue
+            if node.parent is not None:
+                node.parent.children.remove(node)
+                node.parent = None
+            self._remove_node(node)
+        self._selection = [name for name in self._selection if name in self._nodes]
+
+    def obj_exists(self, name):
+        return name in self._nodes
+
+    def objs_exist(self, names):
+        nodes = self._nodes
+        return [name in nodes for name in names]
+
+    def ls(self, selection=False):
+        if selection:
+            return list(self._selection)
+        return list(self._nodes)
+
+    def select(self, names):
+        if not isinstance(names, (list, tuple)):
+            names = [names]
+        for name in names:
+            self._get_node(name)
+        self._selection = list(names)
+
+    def _get_node(self, name):
+        try:
+            return self._nodes[name]
+        except KeyError:
+            raise ValueError("No object matches name: %s" % name)
+
+    def _add_node(self, name, translation=(0.0, 0.0, 0.0), parent=None):
+        node = _Node(self._unique_name(name), [float(value) for value in translation])
+        self._nodes[node.name] = node
+        if parent is not None:
+            node.parent = parent
+            parent.children.append(node)
+        return node
+
+    def _remove_node(self, node):
+        del self._nodes[node.name]
+        for child in node.children:
+            self._remove_node(child)
+
+    def _copy_node(self, node, parent, name=None, instance_leaf=False):
+        copy = self._add_node(name or node.name, node.translation, parent)
+        if instance_leaf or node.shape is None:
+            copy.shape = node.shape
+        else:
+            copy.shape = node.shape.copy()
+        for child in node.children:
+            self._copy_node(child, copy, instance_leaf=instance_leaf)
+        return copy
+
+    def _unique_name(self, name):
+        # Names are unique, so clashes get the next free number like Maya does
+        if name not in self._nodes:
+            return name
+        match = re.match(r'^(.*?)(\d*)$', name)
+        base, digits = match.group(1), match.group(2)
+        number = max(self._name_counters.get(base, 0), int(digits or 0))
+        while True:
+            number += 1
+            candidate = base + str(number).zfill(len(digits))
+            if candidate not in self._nodes:
+                self._name_counters[base] = number
+                return candidate
+
+    # noinspection PyMethodMayBeStatic
+    def _world_translation(self, node):
+        world = [0.0, 0.0, 0.0]
+        while node is not None:
+            for axis in range(3):
+                world[axis] += node.translation[axis]
+            node = node.parent
+        return world
+
+    def _node_vertices(self, node, parent_translation, points):
+        translation = [parent_translation[axis] + node.translation[axis]
+                       for axis in range(3)]
+        shape = node.shape
+        if shape is not None:
+            local = shape.points
+            if local is None:
+                # A shape without vertices is a box
+                box = shape.bounding_box
+                local = []
+                for x in (box[0], box[3]):
+                    for y in (box[1], box[4]):
+                        for z in (box[2], box[5]):
+                            local.extend((x, y, z))
+            offset = len(points)
+            points.extend(local)
+            if any(translation):
+                for index in range(offset, len(points)):
+                    points[index] += translation[(index - offset) % 3]
+        for child in node.children:
+            self._node_vertices(child, translation, points)
+
+    def _node_bbox(self, node, parent_translation):
+        translation = [parent_translation[axis] + node.translation[axis]
+                       for axis in range(3)]
+        bounding_box = None
+        if node.shape is not None:
+            local = node.shape.bounding_box
+            bounding_box = [local[index] + translation[index % 3] for index in range(6)]
+        for child in node.children:
+            child_bbox = self._node_bbox(child, translation)
+            if child_bbox is None:
+                continue
+            if bounding_box is None:
+                bounding_box = child_bbox
+            else:
+                bounding_box = [min(bounding_box[index], child_bbox[index])
+                                for index in range(3)] + \
+                               [max(bounding_box[index], child_bbox[index])
+                                for index in range(3, 6)]
+        return bounding_box
+
+
+class SceneBatch(object):
+    """
+    Collects the changes made while building stacks and makes them with as few scene
+    calls as possible. Used as a context manager, everything inside the with block is
+    a single undo step and the queued changes are made when the block ends.
+    Parenting is queued so each parent gets all of its children in one call, and
+    duplicates are made in bulk straight away since their names are needed.
+    """
+    def __init__(self, backend=None, undo_name='td_maya_tools'):
+        self.backend = backend or get_backend()
+        self.undo_name = undo_name
+        self._parents = collections.OrderedDict()
+        self._undo_chunk = None
+
+    def __enter__(self):
+        self._undo_chunk = self.backend.undo_chunk(self.undo_name)
+        self._undo_chunk.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self._undo_chunk.__exit__(exc_type, exc_value, traceback)
+            self._undo_chunk = None
+
+    def duplicate(self, names):
+        """
+        Duplicates a list of transform nodes with one call.
+
+        :param names: The names of the transform nodes to duplicate.
+        :type: list of strings
+
+        :return: The name of each new transform node
+        :type: list of strings
+        """
+        return self.backend.duplicate(list(names))
+
+    def instance(self, names):
+        """
+        Instances a list of transform nodes with one call.
+
+        :param names: The names of the transform nodes to instance.
+        :type: list of strings
+
+        :return: The name of each new transform node
+        :type: list of strings
+        """
+        return self.backend.instance(list(names))
+
+    def group(self, name):
+        """
+        Creates an empty group at the origin.
+
+        :param name: The name to give the group.
+        :type: str
+
+        :return: The name the group was given
+        :type: str
+        """
+        return self.backend.group(name)
+
+    def parent(self, children, parent):
+        """
+        Queues transform nodes to be parented under another one.
+
+        :param children: The name or names of the nodes to parent.
+        :type: str or list of strings
+
+        :param parent: The name of the new parent node.
+        :type: str
+
+        :return: N/A
+        """
+        if isinstance(children, string_types):
+            children = [children]
+        self._parents.setdefault(parent, []).extend(children)
+
+    def flush(self):
+        """
+        Makes the queued changes, one parent call per parent node.
+
+        :return: N/A
+        """
+        parents = self._parents
+        self._parents = collections.OrderedDict()
+        for parent, children in parents.items():
+            self.backend.parent(children, parent)
+
+
+class CountingBackend(object):
+    """
+    Wraps another backend and counts the scene calls made through it by name. Every
+    public method of the wrapped backend counts, the queries (translations,
+    objs_exist, ls and so on) as well as the edits, apart from undo_chunk, which only
+    groups other calls for undo and so is counted on its own in undo_chunks.
+    """
+    def __init__(self, backend):
+        self.backend = backend
+        self.counts = {}
+        self.undo_chunks = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self.backend, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        counts = self.counts
+
+        def counted(*args, **kwargs):
+            # Undo chunks aren't scene commands, they only group them for undo
+            if name == 'undo_chunk':
+                self.undo_chunks += 1
+            else:
+                counts[name] = counts.get(name, 0) + 1
+            return attr(*args, **kwargs)
+
+        # Keep the wrapper so later calls skip __getattr__
+        setattr(self, name, counted)
+        return counted
+
+    def total(self):
+        """
+        :return: The number of scene calls made so far, not counting undo chunks
+        :type: int
+        """
+        return sum(self.counts.values())
+
+    def reset(self):
+        """
+        Clears the counters.
+
+        :return: N/A
+        """
+        self.counts.clear()
+        self.undo_chunks = 0
+
+
+class _Node(object):
+    """
+    A transform node in the memory backend.
+    """
+    __slots__ = ('name', 'translation', 'parent', 'children', 'shape')
+
+    def __init__(self, name, translation):
+        self.name = name
+        self.translation = translation
+        self.parent = None
+        self.children = []
+        self.shape = None
+
+
+class _Shape(object):
+    """
+    The geometry under a transform node in the memory backend.
+    """
+    __slots__ = ('bounding_box', 'points')
+
+    def __init__(self, bounding_box, points=None):
+        self.bounding_box = bounding_box
+        self.points = points
+
+    def copy(self):
+        points = array('d', self.points) if self.points is not None else None
+        return _Shape(list(self.bounding_box), points)
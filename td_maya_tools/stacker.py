@@ -17,27 +17,33 @@
     This module takes a list of named objects, finds the top and bottom center points of
     each, and stacks each one on top of the other by moving them a relative distance from
     their bottom center point to the top center point of the previous object.
+    Stacks and rows of stacks can also be kept as models that remember their bounding
+    boxes, so after a part changes only the objects above it, and only the stacks to the
+    right of it, are moved again.
 
 :applications:
-    Maya
+    Maya, standalone Python
 
 :see_also:
-    N/A
+    scene.py
 """
 
 #----------------------------------------------------------------------------------------#
 #----------------------------------------------------------------------------- IMPORTS --#
 
 # Default Python Imports
-import maya.cmds as cmds
+# N/A
 
 # Imports That You Wrote
-# N/A
+from td_maya_tools import instrument
+from td_maya_tools import scene
+from td_maya_tools import validation
 
 #----------------------------------------------------------------------------------------#
 #--------------------------------------------------------------------------- FUNCTIONS --#
 
 
+@instrument.timed('x_offset')
 def offset_objs_in_x(static_name, moved_name, offset):
     """
     This function offsets one object by 'x' amount from another one.
@@ -55,31 +61,42 @@ def offset_objs_in_x(static_name, moved_name, offset):
     :return: N/A
     """
 
+    backend = scene.get_backend()
+
     # Get the bounding boxes of the two objects passed in.
-    bb_static = cmds.xform(static_name, boundingBox=True, query=True)
-    bb_moved = cmds.xform(moved_name, boundingBox=True, query=True)
+    bb_static = backend.bounding_box(static_name)
+    bb_moved = backend.bounding_box(moved_name)
 
     # Calculate position to move object
     x_move = bb_static[3] + offset + abs((bb_moved[3] - bb_moved[0]) / 2)
 
     # Move object along x-axis
-    cmds.move(x_move, 0, 0, moved_name, moveX=True)
+    backend.move(moved_name, [x_move, None, None])
 
 
-def stack_objs(objects):
+@instrument.timed('stacking')
+def stack_objs(objects, single_pass=False, validated=False):
     """
     This function stacks a list of named objects one on top of the other according to
     their order in the list.
 
     :param objects: A list containing all the objects to be stacked.
     :type: list of strings
-    
+
+    :param single_pass: Query each bounding box once and apply every move afterwards
+    instead of re-querying both objects of each adjacent pair. (Def=False)
+    :type: bool
+
+    :param validated: The objects have already been checked, e.g. by a
+    validation.Validator, so they aren't checked again. (Def=False)
+    :type: bool
+
     :return: Success of stacking objects
     :type: bool
     """
 
     # Get result of verifying arguments
-    verification = verify_args(objects)
+    verification = True if validated else verify_args(objects)
 
     # If verification failed, error is printed and script returns None
     if verification is None:
@@ -87,6 +104,17 @@ def stack_objs(objects):
         return None
 
     try:
+        # Work out every offset from one bounding box query per object
+        if single_pass:
+            backend = scene.get_backend()
+            bounding_boxes = [backend.bounding_box(obj) for obj in objects]
+            offsets = get_stack_offsets(bounding_boxes)
+
+            # Apply the moves once all the queries are done
+            for obj, offset in zip(objects[1:], offsets[1:]):
+                backend.move(obj, offset, relative=True)
+            return True
+
         # Loop for length of objects list
         for i in range(len(objects) - 1):
 
@@ -105,6 +133,68 @@ def stack_objs(objects):
     return True
 
 
+def get_stack_offsets(bounding_boxes):
+    """
+    This function calculates the relative move of every object in a stack from the
+    bounding boxes they have before stacking. Moving an object shifts its bounding box by
+    the same amount, so each offset builds on the one below it and no bounding box has to
+    be queried again.
+
+    :param bounding_boxes: The bounding box of each object, from the bottom of the stack
+    to the top, as returned by a bounding box query.
+    :type: list of lists (xmin, ymin, zmin, xmax, ymax, zmax)
+
+    :return: The relative (x, y, z) move of each object. The first one is always zero.
+    :type: list of lists
+    """
+
+    offsets = [[0.0, 0.0, 0.0]]
+
+    for i in range(len(bounding_boxes) - 1):
+        # Top center of the current object once it has been moved
+        current_top = get_bbox_center(bounding_boxes[i], top=True)
+        current_top = [current_top[axis] + offsets[i][axis] for axis in range(3)]
+
+        # Bottom center of the next object where it is now
+        next_bottom = get_bbox_center(bounding_boxes[i + 1], bottom=True)
+
+        offsets.append([current_top[axis] - next_bottom[axis] for axis in range(3)])
+
+    return offsets
+
+
+def get_row_positions(bounding_boxes, separation, start=0.0):
+    """
+    This function calculates the x position of every group in a row the same way
+    chaining offset_objs_in_x along the row would, as a running sum over the bounding
+    boxes the groups have at the origin.
+
+    :param bounding_boxes: The bounding box of each group while it is at the origin,
+    from left to right.
+    :type: list of lists (xmin, ymin, zmin, xmax, ymax, zmax)
+
+    :param separation: The distance in x between the bounding boxes of two groups.
+    :type: float
+
+    :param start: The x position of the first group. (Def=0.0)
+    :type: float
+
+    :return: The x position of each group, starting with the first one's
+    :type: list of floats
+    """
+
+    positions = [start]
+
+    for i in range(len(bounding_boxes) - 1):
+        # Right side of the current group once it has been moved
+        static_xmax = positions[i] + bounding_boxes[i][3]
+
+        moved = bounding_boxes[i + 1]
+        positions.append(static_xmax + separation + abs((moved[3] - moved[0]) / 2))
+
+    return positions
+
+
 def create_stack(obj_name, transform_from, transform_to):
     """
     This function calculates relative distance between two points and moves the object
@@ -128,7 +218,7 @@ def create_stack(obj_name, transform_from, transform_to):
     z_move = transform_to[2] - transform_from[2]
 
     # Move object
-    cmds.move(x_move, y_move, z_move, obj_name, relative=True)
+    scene.get_backend().move(obj_name, [x_move, y_move, z_move], relative=True)
 
 
 def get_center_point(obj_name, top=False, bottom=False):
@@ -150,7 +240,28 @@ def get_center_point(obj_name, top=False, bottom=False):
     """
 
     # Get list of values from bounding box
-    bounding_box = cmds.xform(obj_name, boundingBox=True, query=True)
+    bounding_box = scene.get_backend().bounding_box(obj_name)
+
+    return get_bbox_center(bounding_box, top=top, bottom=bottom)
+
+
+def get_bbox_center(bounding_box, top=False, bottom=False):
+    """
+    This function returns the top center or bottom center x y z coordinates of a bounding
+    box depending on the selected flag.
+
+    :param bounding_box: A bounding box as returned by a bounding box query.
+    :type: list (xmin, ymin, zmin, xmax, ymax, zmax)
+
+    :param top: A flag that indicates if it is getting the top center. (Def=False)
+    :type: bool
+
+    :param bottom: A flag that indicates if it is getting the bottom center. (Def=False)
+    :type: bool
+
+    :return: A list with the top/bottom center coordinates based on flag.
+    :type: list
+    """
 
     # If top, calculate x and z averages then return top center coordinates
     if top:
@@ -167,30 +278,204 @@ def get_center_point(obj_name, top=False, bottom=False):
         return [x, y, z]
 
 
-def verify_args(objects):
+@instrument.timed('validation')
+def verify_args(objects, validator=None):
     """
     This function verifies the names of objects in the list and returns the result
 
     :param objects: A list containing all the objects to be stacked.
     :type: list of strings
 
+    :param validator: A validator that may already know about some of the objects.
+    (Def=None)
+    :type: validation.Validator
+
     :return: Whether or not any/all of the arguments have a value.
     :type: bool
     """
 
-    objs_clear = True
+    validator = validator or validation.Validator()
 
-    for obj in objects:
-        if not cmds.objExists(obj):
-            print("Object " + obj + " does not have a value")
-            objs_clear = False
+    # Check every object with one query
+    missing = validator.check([('objects', objects)]).missing['objects']
+    if missing:
+        print("Objects " + validation.format_names(missing) + " do not have a value")
+        return None
 
     # If all of the arguments have a value return True
-    if objs_clear:
-        return True
-    # If one or more arguments don't have a value return None
-    else:
-        return None
+    return True
 
 #----------------------------------------------------------------------------------------#
 #----------------------------------------------------------------------------- CLASSES --#
+
+
+class StackModel(object):
+    """
+    Remembers the order and bounding boxes of the objects in one stack so that after a
+    part is swapped or rescaled only the objects above it are stacked again. Objects
+    that change are marked dirty, and restack() queries only the dirty objects and moves
+    only the ones that end up out of place.
+    """
+    def __init__(self, objects, bounding_boxes=None, tolerance=1e-9):
+        """
+        :param objects: The objects of the stack, from the bottom up.
+        :type: list of strings
+
+        :param bounding_boxes: The current bounding box of each object, if known. When
+        it isn't, every object starts dirty. (Def=None)
+        :type: list of lists
+
+        :param tolerance: How far an object can be from its place and not be moved.
+        (Def=1e-9)
+        :type: float
+        """
+        self.objects = list(objects)
+        self.tolerance = tolerance
+        if bounding_boxes is None:
+            self.bounding_boxes = [None] * len(self.objects)
+            self.dirty = set(range(len(self.objects)))
+        else:
+            self.bounding_boxes = [list(bounding_box) for bounding_box in bounding_boxes]
+            self.dirty = set()
+
+    def mark_dirty(self, obj):
+        """
+        Marks an object whose bounding box has changed.
+
+        :param obj: The object, or its index in the stack.
+        :type: str or int
+
+        :return: N/A
+        """
+        index = obj if isinstance(obj, int) else self.objects.index(obj)
+        self.dirty.add(index)
+
+    def replace(self, index, obj):
+        """
+        Swaps the object at an index for another one and marks it dirty.
+
+        :param index: The index of the object in the stack.
+        :type: int
+
+        :param obj: The new object.
+        :type: str
+
+        :return: N/A
+        """
+        self.objects[index] = obj
+        self.dirty.add(index)
+
+    @instrument.timed('restack')
+    def restack(self):
+        """
+        Stacks the objects from the first dirty one up again.
+
+        :return: The objects that were moved
+        :type: list of strings
+        """
+        if not self.dirty:
+            return []
+
+        backend = scene.get_backend()
+        start = min(self.dirty)
+
+        # Only the dirty objects need querying, the others are where the cache says
+        for index in sorted(self.dirty):
+            self.bounding_boxes[index] = backend.bounding_box(self.objects[index])
+        self.dirty.clear()
+
+        moved = []
+        for i in range(max(start, 1), len(self.objects)):
+            current_top = get_bbox_center(self.bounding_boxes[i - 1], top=True)
+            next_bottom = get_bbox_center(self.bounding_boxes[i], bottom=True)
+            offset = [current_top[axis] - next_bottom[axis] for axis in range(3)]
+            if all(abs(value) <= self.tolerance for value in offset):
+                continue
+
+            # Move the object and shift its cached bounding box with it
+            backend.move(self.objects[i], offset, relative=True)
+            self.bounding_boxes[i] = [value + offset[index % 3] for index, value
+                                      in enumerate(self.bounding_boxes[i])]
+            moved.append(self.objects[i])
+
+        return moved
+
+
+class StackRow(object):
+    """
+    Remembers the bounding boxes and x positions of stack groups spaced out along the
+    x-axis, as offset_objs_in_x spaces them. Groups whose width changes are marked dirty,
+    and respace() only moves the groups to the right of the first dirty one that end up
+    out of place.
+    """
+    def __init__(self, groups, separation, tolerance=1e-9):
+        """
+        :param groups: The stack groups, from left to right.
+        :type: list of strings
+
+        :param separation: The distance in x between the bounding boxes of two groups.
+        :type: float
+
+        :param tolerance: How far a group can be from its place and not be moved.
+        (Def=1e-9)
+        :type: float
+        """
+        self.groups = list(groups)
+        self.separation = separation
+        self.tolerance = tolerance
+        self.bounding_boxes = [None] * len(self.groups)
+        self.x_positions = [None] * len(self.groups)
+        self.dirty = set(range(len(self.groups)))
+
+    def mark_dirty(self, group):
+        """
+        Marks a group whose bounding box has changed, e.g. after it was restacked.
+
+        :param group: The group, or its index in the row.
+        :type: str or int
+
+        :return: N/A
+        """
+        index = group if isinstance(group, int) else self.groups.index(group)
+        self.dirty.add(index)
+
+    @instrument.timed('respace')
+    def respace(self):
+        """
+        Spaces the groups from the first dirty one to the right out again.
+
+        :return: The groups that were moved
+        :type: list of strings
+        """
+        if not self.dirty:
+            return []
+
+        backend = scene.get_backend()
+        start = min(self.dirty)
+
+        # Only the dirty groups need querying, the others are where the cache says
+        dirty = sorted(self.dirty)
+        translations = backend.translations([self.groups[index] for index in dirty])
+        for index, translation in zip(dirty, translations):
+            self.bounding_boxes[index] = backend.bounding_box(self.groups[index])
+            self.x_positions[index] = translation[0]
+        self.dirty.clear()
+
+        moved = []
+        for i in range(max(start, 1), len(self.groups)):
+            bb_static = self.bounding_boxes[i - 1]
+            bb_moved = self.bounding_boxes[i]
+
+            # The same position offset_objs_in_x would move the group to
+            x_move = bb_static[3] + self.separation + abs((bb_moved[3] - bb_moved[0]) / 2)
+            shift = x_move - self.x_positions[i]
+            if abs(shift) <= self.tolerance:
+                continue
+
+            backend.move(self.groups[i], [x_move, None, None])
+            self.x_positions[i] = x_move
+            bb_moved[0] += shift
+            bb_moved[3] += shift
+            moved.append(self.groups[i])
+
+        return moved
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Remembers the stacks a build has made so stacks with the same parts are copied.
+
+:description:
+    With small part lists and short stacks many stacks of a build have the same parts
+    in the same order. This module keys the stacks a build makes by their parts. The
+    first stack made from a list of parts is built and stacked as usual and becomes the
+    template for those parts. Every later stack with the same parts is a copy of the
+    template's group, made with one scene call and then only moved into place.
+    A copy holds the same parts in the same places as a stack built from scratch, so
+    the scene is the same apart from the names of the copied parts.
+    The cache counts its hits and misses and times both, to report how much time the
+    copies saved.
+
+:applications:
+    Maya, standalone Python
+
+:see_also:
+    builder.py
+    scene.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+# N/A
+
+# Imports That You Wrote
+# N/A
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+# N/A
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- CLASSES --#
+
+
+class TemplateCache(object):
+    """
+    The template stack of each list of parts a build has seen, with hit and time
+    counts.
+    The parts in a copy of a template are named by the copy, after the parts of the
+    template, rather than in the order a build from scratch would have made them. So a
+    build with templates, and a replay of its journal, puts every part in the same place
+    as a build from scratch but can give the copied parts different names.
+    Matching those names would mean renaming almost every copy, since each backend
+    names copies in the order it makes them, which costs more calls than copying saves,
+    so templates are off unless a build asks for them.
+    """
+    def __init__(self, instance=False, duplicate_parts=None):
+        """
+        :param instance: The build makes instances of the parts. (Def=False)
+        :type: bool
+
+        :param duplicate_parts: Parts the build always fully duplicates. (Def=None)
+        :type: list of strings
+        """
+        self.instance = instance
+        self.duplicate_parts = set(duplicate_parts or []) if instance else set()
+        self.hits = 0
+        self.misses = 0
+        self.uncached = 0
+        self.build_seconds = 0.0
+        self.copy_seconds = 0.0
+        self._templates = {}
+
+    def key(self, parts):
+        """
+        :param parts: The source parts of a stack, from the base up.
+        :type: list of strings
+
+        :return: The key of the stack's template, or None if the stack can't be copied.
+        Copying a group of instances instances every part in it, so stacks of
+        instances with parts that are always duplicated are built from scratch.
+        :type: tuple
+        """
+        if self.duplicate_parts and not self.duplicate_parts.isdisjoint(parts):
+            return None
+        return tuple(parts)
+
+    def get(self, key):
+        """
+        :param key: The key of a template.
+        :type: tuple
+
+        :return: The group of the template and the bounding box it has while at the
+        origin, or None if there is no template for the key yet
+        :type: tuple (str, list)
+        """
+        return self._templates.get(key)
+
+    def add(self, key, group, stack_bbox):
+        """
+        Makes a stack the template for its parts.
+
+        :param key: The key of the template.
+        :type: tuple
+
+        :param group: The group of the stack.
+        :type: str
+
+        :param stack_bbox: The bounding box of the stack while it is at the origin.
+        :type: list (xmin, ymin, zmin, xmax, ymax, zmax)
+
+        :return: N/A
+        """
+        self._templates[key] = (group, stack_bbox)
+
+    def clear(self):
+        """
+        Forgets every template, e.g. once their stacks have been deleted.
+
+        :return: N/A
+        """
+        self._templates.clear()
+
+    def hit_rate(self):
+        """
+        :return: The share of stacks that were copied from a template
+        :type: float
+        """
+        total = self.hits + self.misses + self.uncached
+        return self.hits / float(total) if total else 0.0
+
+    def time_saved(self):
+        """
+        :return: The seconds building the copied stacks from scratch would have taken,
+        at the average time of the stacks that were built, less the time the copies
+        took
+        :type: float
+        """
+        built = self.misses + self.uncached
+        if not built:
+            return 0.0
+        return self.hits * self.build_seconds / built - self.copy_seconds
+
+    def summary(self):
+        """
+        :return: A one line summary of the hits and the time saved
+        :type: str
+        """
+        return 'Stack templates: %d copied, %d built (%d could not be copied), ' \
+               '%d templates, %.0f%% hit rate, %.3fs saved' % (
+                   self.hits, self.misses + self.uncached, self.uncached,
+                   len(self._templates), self.hit_rate() * 100, self.time_saved())
+
+    def __len__(self):
+        return len(self._templates)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Checks that the parts of a build exist.
+
+:description:
+    This module checks the names given to the stacker tools against the scene. Every
+    name that hasn't been checked yet is looked up with one bulk query and the answer is
+    remembered, so a validator kept for one build never asks about the same name twice
+    and code that is handed one can skip its own checks. The result is a report of the
+    missing names in each group of names.
+
+:applications:
+    Maya, standalone Python
+
+:see_also:
+    scene.py
+    builder.py
+    stacker.py
+    builder_gui.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+import collections
+
+# Imports That You Wrote
+from td_maya_tools import scene
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+
+def format_names(names, limit=5):
+    """
+    :param names: The names to list.
+    :type: list of strings
+
+    :param limit: The most names to show. (Def=5)
+    :type: int
+
+    :return: The names joined with commas, ending with '...' if some were left out
+    :type: str
+    """
+    text = ', '.join(names[:limit])
+    if len(names) > limit:
+        text += ', ...'
+    return text
+
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- CLASSES --#
+
+
+class Validator(object):
+    """
+    Checks whether names exist in the scene, remembering every answer. Keep one for the
+    length of a build, since the scene can change between builds.
+    """
+    def __init__(self, backend=None):
+        """
+        :param backend: The backend to query. (Def=the active backend)
+        :type: scene.SceneBackend
+        """
+        self.backend = backend or scene.get_backend()
+        self.queries = 0
+        self._exists = {}
+
+    def check(self, groups):
+        """
+        Checks groups of names, with one query for all the names that haven't been
+        checked before.
+
+        :param groups: A label and the names of each group, e.g. ('top', top_objs).
+        :type: list of tuples (str, list of strings)
+
+        :return: The missing names of each group
+        :type: ValidationReport
+        """
+        exists = self._exists
+        unchecked = []
+        for label, names in groups:
+            for name in names:
+                if name not in exists:
+                    # Mark it so a name listed twice is only asked about once
+                    exists[name] = None
+                    unchecked.append(name)
+
+        if unchecked:
+            self.queries += 1
+            for name, found in zip(unchecked, self.backend.objs_exist(unchecked)):
+                exists[name] = bool(found)
+
+        report = ValidationReport()
+        for label, names in groups:
+            if not names:
+                report.empty.append(label)
+            missing = [name for name in collections.OrderedDict.fromkeys(names)
+                       if not exists[name]]
+            report.missing[label] = missing
+        return report
+
+    def clear(self):
+        """
+        Forgets every answer, so the next check asks the scene again.
+
+        :return: N/A
+        """
+        self._exists.clear()
+
+
+class ValidationReport(object):
+    """
+    The outcome of checking groups of names.
+    """
+    def __init__(self):
+        self.missing = collections.OrderedDict()
+        self.empty = []
+
+    def is_valid(self):
+        """
+        :return: Whether every group has names and all of them exist
+        :type: bool
+        """
+        return not self.empty and not any(self.missing.values())
+
+    def missing_names(self):
+        """
+        :return: Every missing name, once each
+        :type: list of strings
+        """
+        names = collections.OrderedDict()
+        for missing in self.missing.values():
+            names.update((name, None) for name in missing)
+        return list(names)
+
+    def summary(self):
+        """
+        :return: One line for each group that is empty or has missing names
+        :type: str
+        """
+        lines = ['No %s names were given' % label for label in self.empty]
+        lines += ['Missing %s names: %s' % (label, format_names(missing))
+                  for label, missing in self.missing.items() if missing]
+        return '\n'.join(lines)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    The pytest fixtures shared by the tests.
+
+:description:
+    Every test gets a fresh memory backend made active for the length of the test, so
+    the tools send their scene calls to it instead of Maya, and the part pools made in
+    it by scenes.make_parts.
+
+:applications:
+    Standalone Python
+
+:see_also:
+    scenes.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+import pytest
+
+# Imports That You Wrote
+from td_maya_tools import scene
+from tests import scenes
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+
+@pytest.fixture
+def backend():
+    """
+    :return: An empty memory backend, active until the test ends
+    :type: scene.MemoryBackend
+    """
+    memory = scene.MemoryBackend()
+    with scene.use_backend(memory):
+        yield memory
+
+
+@pytest.fixture
+def parts(backend):
+    """
+    :return: The top, mid and base parts, made in the test's backend
+    :type: tuple of lists of strings
+    """
+    return scenes.make_parts(backend)
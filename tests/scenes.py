@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Builds the part pools the tests stack and reads back what a build made.
+
+:description:
+    The tests run against scene.MemoryBackend, so none of them need Maya. make_parts
+    fills a memory scene with top, mid and base pools of boxes of random sizes, away
+    from the origin, the same way every time for the same seed. snapshot reads back
+    where every stack group and every part in it ended up, to compare two builds.
+
+:applications:
+    Standalone Python
+
+:see_also:
+    scene.py
+    conftest.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+import random
+
+# Imports That You Wrote
+# N/A
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+
+def make_parts(backend, seed=0, pool_size=4):
+    """
+    Creates the top, mid and base pools of parts.
+
+    :param backend: The memory backend to create the parts in.
+    :type: scene.MemoryBackend
+
+    :param seed: The seed the sizes and places of the parts are picked with. (Def=0)
+    :type: int
+
+    :param pool_size: The number of parts in each pool. (Def=4)
+    :type: int
+
+    :return: The top, mid and base parts
+    :type: tuple of lists of strings
+    """
+    rand = random.Random(seed)
+    pools = []
+    for kind in ('top', 'mid', 'base'):
+        names = []
+        for index in range(pool_size):
+            width = rand.uniform(0.5, 2.0)
+            height = rand.uniform(0.2, 1.0)
+            depth = rand.uniform(0.5, 2.0)
+            x_offset = rand.uniform(-0.3, 0.3)
+            z_offset = rand.uniform(-0.3, 0.3)
+            bounding_box = [x_offset - width / 2, 0.0, z_offset - depth / 2,
+                            x_offset + width / 2, height, z_offset + depth / 2]
+            translation = [rand.uniform(-9, 9), rand.uniform(0, 3), rand.uniform(-9, 9)]
+            names.append(backend.create_part('%s%d' % (kind, index), bounding_box,
+                                             translation))
+        pools.append(names)
+    return tuple(pools)
+
+
+def snapshot(backend, stacks, names=True):
+    """
+    :param backend: The backend the stacks are in.
+    :type: scene.SceneBackend
+
+    :param stacks: The name of each stack group with the transforms inside it.
+    :type: list of tuples (str, list of strings)
+
+    :param names: Keep the names of the parts, which differ between builds that copy
+    parts in a different order. (Def=True)
+    :type: bool
+
+    :return: Each stack group with its world translation, and the world bounding box
+    of every part in it, rounded so float noise doesn't count
+    :type: list of tuples
+    """
+    result = []
+    for group, transforms in stacks:
+        translation = [round(value, 9) for value in backend.translations([group])[0]]
+        parts = [[round(value, 9) for value in backend.bounding_box(transform)]
+                 for transform in transforms]
+        if names:
+            parts = list(zip(transforms, parts))
+        result.append((group, translation, parts))
+    return result
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Tests building stacks in the memory backend.
+
+:applications:
+    Standalone Python
+
+:see_also:
+    builder.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+import pytest
+
+# Imports That You Wrote
+from td_maya_tools import arrange
+from td_maya_tools import builder
+from td_maya_tools import scene
+from tests import scenes
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+
+def build_in_chunks(parts, chunk_size, **kwargs):
+    """
+    :return: The stacks of a build made chunk_size stacks at a time
+    :type: list of tuples (str, list of strings)
+    """
+    top, mid, base = parts
+    build = builder.StackBuild(top, mid, base, 40, 4, 0.2, seed=7, **kwargs)
+    while not build.is_finished():
+        build.step(chunk_size)
+    return build.stacks
+
+
+@pytest.mark.parametrize('layout_mode', arrange.LAYOUT_MODES)
+def test_chunked_build_matches_one_shot_build(layout_mode):
+    """A build made in chunks makes the same scene as one made in one go."""
+    one_shot = scene.MemoryBackend()
+    top, mid, base = scenes.make_parts(one_shot)
+    with scene.use_backend(one_shot):
+        stacks = builder.build_stacks(top, mid, base, 40, 4, 0.2, seed=7,
+                                      layout_mode=layout_mode)
+
+    chunked = scene.MemoryBackend()
+    parts = scenes.make_parts(chunked)
+    with scene.use_backend(chunked):
+        chunked_stacks = build_in_chunks(parts, 7, layout_mode=layout_mode)
+
+    assert scenes.snapshot(chunked, chunked_stacks) == scenes.snapshot(one_shot, stacks)
+
+
+def test_same_seed_makes_same_stacks(backend, parts):
+    """Two builds with the same seed pick the same parts in the same places."""
+    first = builder.build_stacks(parts[0], parts[1], parts[2], 20, 3, 0.1, seed=3)
+    second = builder.build_stacks(parts[0], parts[1], parts[2], 20, 3, 0.1, seed=3)
+
+    first_shapes = scenes.snapshot(backend, first, names=False)
+    second_shapes = scenes.snapshot(backend, second, names=False)
+    assert [stack[1:] for stack in first_shapes] == \
+        [stack[1:] for stack in second_shapes]
+
+
+def test_stacks_rest_on_each_other(backend, parts):
+    """Each part in a stack starts where the part under it ends."""
+    stacks = builder.build_stacks(parts[0], parts[1], parts[2], 10, 4, 0.1, seed=1)
+    for group, transforms in stacks:
+        boxes = [backend.bounding_box(transform) for transform in transforms]
+        for below, above in zip(boxes, boxes[1:]):
+            assert above[1] == pytest.approx(below[4])
+
+
+def test_rollback_restores_scene(backend, parts):
+    """Cancelling a build part way deletes everything it made."""
+    before = sorted(backend.ls())
+    build = builder.StackBuild(parts[0], parts[1], parts[2], 30, 3, 0.1, seed=2)
+    build.step(10)
+    build.step(10)
+    build.rollback()
+
+    assert sorted(backend.ls()) == before
+    assert build.stacks == []
+
+
+def test_rollback_after_failed_chunk_deletes_its_groups(backend, parts, monkeypatch):
+    """Groups made by a chunk that failed before they were filled are rolled back."""
+    before = sorted(backend.ls())
+    build = builder.StackBuild(parts[0], parts[1], parts[2], 30, 3, 0.1, seed=2)
+    build.step(10)
+
+    def fail(children, parent):
+        raise RuntimeError('parent failed')
+    monkeypatch.setattr(backend, 'parent', fail)
+    with pytest.raises(RuntimeError):
+        build.step(10)
+    monkeypatch.undo()
+
+    build.rollback()
+    assert sorted(backend.ls()) == before
+
+
+def test_rollback_after_chunk_failed_part_way_through_grouping(backend, parts,
+                                                               monkeypatch):
+    """Groups a failed chunk had filled are rolled back along with the copies in them."""
+    before = sorted(backend.ls())
+    build = builder.StackBuild(parts[0], parts[1], parts[2], 30, 3, 0.1, seed=2)
+    parent = backend.parent
+    calls = []
+
+    def fail_third(children, group):
+        calls.append(group)
+        if len(calls) == 3:
+            raise RuntimeError('parent failed')
+        parent(children, group)
+    monkeypatch.setattr(backend, 'parent', fail_third)
+    with pytest.raises(RuntimeError):
+        build.step(10)
+    monkeypatch.undo()
+
+    build.rollback()
+    assert sorted(backend.ls()) == before
+
+
+def test_templates_place_parts_like_scratch_build():
+    """Stacks copied from templates put every part where a build from scratch does."""
+    results = []
+    for use_templates in (False, True):
+        memory = scene.MemoryBackend()
+        top, mid, base = scenes.make_parts(memory, pool_size=2)
+        with scene.use_backend(memory):
+            stacks = builder.build_stacks(top, mid, base, 60, 2, 0.1, seed=4,
+                                          layout_mode='grid',
+                                          use_templates=use_templates)
+        results.append(scenes.snapshot(memory, stacks, names=False))
+
+    assert results[0] == results[1]
+
+
+def test_templates_only_rename_copied_parts():
+    """Template builds name stacks like scratch builds but give copies other names."""
+    results = []
+    for use_templates in (False, True):
+        memory = scene.MemoryBackend()
+        top, mid, base = scenes.make_parts(memory, pool_size=2)
+        with scene.use_backend(memory):
+            build = builder.StackBuild(top, mid, base, 60, 2, 0.1, seed=4,
+                                       use_templates=use_templates)
+            build.step(60)
+        results.append(build.stacks)
+
+    scratch, templated = results
+    assert [group for group, transforms in templated] == \
+        [group for group, transforms in scratch]
+    assert [transforms for group, transforms in templated] != \
+        [transforms for group, transforms in scratch]
+
+
+def test_templates_are_off_by_default(backend, parts):
+    """Builds only copy templates, and rename parts, when they ask to."""
+    build = builder.StackBuild(parts[0], parts[1], parts[2], 10, 2, 0.1, seed=4)
+    assert build.template_cache is None
+
+
+def test_instances_share_shapes(backend, parts):
+    """Instanced builds make fewer shape nodes than duplicated ones."""
+    start = backend.node_count()
+    builder.build_stacks(parts[0], parts[1], parts[2], 20, 3, 0.1, seed=5,
+                         instance=True, duplicate_parts=[parts[1][0]])
+    instanced = backend.node_count() - start
+
+    start = backend.node_count()
+    builder.build_stacks(parts[0], parts[1], parts[2], 20, 3, 0.1, seed=5)
+    duplicated = backend.node_count() - start
+
+    assert instanced < duplicated
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Tests that layouts generated without Maya match the ones a build in the scene
+    would export.
+
+:applications:
+    Standalone Python
+
+:see_also:
+    cli.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+import json
+import os
+
+import pytest
+
+# Imports That You Wrote
+from td_maya_tools import arrange
+from td_maya_tools import builder
+from td_maya_tools import cli
+from td_maya_tools import gen_utils
+from td_maya_tools import layout
+from td_maya_tools import scene
+from tests import scenes
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+# The separation every set is built with
+SEPARATION = 0.25
+
+
+def make_set(name, layout_mode, stack_count):
+    """
+    :return: The config of a set with the parts scenes.make_parts makes
+    :type: dict
+    """
+    backend = scene.MemoryBackend()
+    settings = {'name': name, 'seed': 11, 'stack_count': stack_count, 'max_height': 3,
+                'layout_mode': layout_mode}
+    for pool, names in zip(('top', 'mid', 'base'), scenes.make_parts(backend)):
+        settings[pool] = [{'name': part, 'translation': backend.translations([part])[0],
+                           'bbox': backend.bounding_box(part)} for part in names]
+    return settings
+
+
+def export_reference(settings, xml_path):
+    """
+    Builds a set in a memory scene and exports its layout.
+
+    :return: The bytes of the exported layout
+    :type: bytes
+    """
+    backend = scene.MemoryBackend()
+    top, mid, base = scenes.make_parts(backend)
+    with scene.use_backend(backend):
+        builder.build_stacks(top, mid, base, settings['stack_count'],
+                             settings['max_height'], SEPARATION, seed=settings['seed'],
+                             layout_mode=settings['layout_mode'])
+        layout.export_layout(xml_path)
+    with open(xml_path, 'rb') as xml_fh:
+        return xml_fh.read()
+
+
+@pytest.fixture(scope='module')
+def layout_sets(tmpdir_factory):
+    """
+    :return: A set per layout mode, with the layout a build in the scene exports
+    :type: list of tuples (dict, bytes)
+    """
+    reference_dir = tmpdir_factory.mktemp('reference')
+    result = []
+    for layout_mode in arrange.LAYOUT_MODES:
+        settings = make_set(layout_mode, layout_mode, 90)
+        result.append((settings, export_reference(
+            settings, str(reference_dir.join(layout_mode + '.xml')))))
+    return result
+
+
+@pytest.mark.parametrize('processes, shard_size, compress', [(1, 1000, False),
+                                                             (1, 16, True),
+                                                             (2, 25, False)])
+def test_merged_files_match_export(tmpdir, layout_sets, processes, shard_size,
+                                   compress):
+    """Each merged file holds the same bytes export_layout writes, however sharded."""
+    config = {'separation': SEPARATION,
+              'sets': [settings for settings, expected in layout_sets]}
+    summary = cli.generate_layouts(cli.parse_config(config), str(tmpdir), processes,
+                                   shard_size, compress=compress)
+
+    for result, (settings, expected) in zip(summary['sets'], layout_sets):
+        assert result['stacks'] == settings['stack_count']
+        assert len(result['paths']) == 1
+        assert gen_utils.open_layout_file(result['paths'][0]).read() == expected
+    assert sorted(os.listdir(str(tmpdir))) == \
+        sorted(settings['name'] + ('.xml.gz' if compress else '.xml')
+               for settings, expected in layout_sets)
+
+
+def test_shard_files_hold_every_stack(tmpdir, layout_sets):
+    """Per shard files hold the stacks of the merged file between them."""
+    settings, expected = layout_sets[0]
+    config = {'separation': SEPARATION, 'sets': [settings]}
+    summary = cli.generate_layouts(cli.parse_config(config), str(tmpdir), 1, 40,
+                                   merge=False)
+
+    result = summary['sets'][0]
+    assert result['shards'] == 3
+    stacks = []
+    for xml_path in result['paths']:
+        stacks.extend(gen_utils.read_stack_xml(xml_path).items())
+    reference_path = str(tmpdir.join('reference.xml'))
+    with open(reference_path, 'wb') as reference_fh:
+        reference_fh.write(expected)
+    assert stacks == list(gen_utils.read_stack_xml(reference_path).items())
+
+
+def test_main_writes_config_layouts(tmpdir, layout_sets):
+    """The command line writes the layouts of a config file."""
+    settings, expected = layout_sets[1]
+    config_path = str(tmpdir.join('config.json'))
+    with open(config_path, 'w') as config_fh:
+        json.dump({'separation': SEPARATION, 'sets': [settings]}, config_fh)
+    output_dir = str(tmpdir.join('out'))
+
+    assert cli.main([config_path, '--output-dir', output_dir, '--processes', '1']) == 0
+    with open(os.path.join(output_dir, settings['name'] + '.xml'), 'rb') as xml_fh:
+        assert xml_fh.read() == expected
+
+
+@pytest.mark.parametrize('change', [{'stack_count': -1}, {'layout_mode': 'spiral'},
+                                    {'name': '../escape'}, {'top': []}])
+def test_invalid_sets_raise(layout_sets, change):
+    """Settings that can't be laid out are refused with a ValueError."""
+    settings = dict(layout_sets[0][0])
+    settings.update(change)
+    with pytest.raises(ValueError):
+        cli.parse_config({'sets': [settings]})
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Tests finding the points parts rest on and hold other parts up at.
+
+:applications:
+    Standalone Python
+
+:see_also:
+    contact.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+import math
+import random
+
+import pytest
+
+# Imports That You Wrote
+from td_maya_tools import contact
+from td_maya_tools import lazy
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+
+def make_points(count, seed=0):
+    """
+    :return: The x, y and z of count vertices of a lopsided blob, one after the other
+    :type: list of floats
+    """
+    rand = random.Random(seed)
+    points = []
+    for index in range(count):
+        angle = rand.uniform(0.0, 2.0 * math.pi)
+        radius = rand.uniform(0.0, 1.0) ** 0.5
+        y = rand.choice([0.0, 0.0, 1.0, rand.uniform(0.0, 1.0)])
+        points.extend([radius * math.cos(angle) + 0.4 * y,
+                       y, 0.5 * radius * math.sin(angle)])
+    return points
+
+
+def test_convex_hull_drops_inner_and_edge_points():
+    """The hull keeps only the corners, counter clockwise from the lowest x."""
+    square = [(0.0, 0.0), (2.0, 0.0), (2.0, 2.0), (0.0, 2.0)]
+    inside = [(1.0, 1.0), (0.5, 1.5), (1.0, 0.0), (2.0, 1.0)]
+    assert contact.convex_hull(inside + square) == square
+
+
+def test_centroid_of_a_flat_hull_is_the_mean_of_its_corners():
+    """Points on a line have no area, so their centroid is the mean of the ends."""
+    assert contact.support_centroid([(0.0, 1.0), (1.0, 1.0), (4.0, 1.0)]) == (2.0, 1.0)
+
+
+def test_support_points_of_a_box():
+    """A box rests on, and holds up at, the middle of its bottom and top faces."""
+    corners = []
+    for x in (1.0, 3.0):
+        for y in (0.0, 2.0):
+            for z in (-1.0, 1.0):
+                corners.extend([x, y, z])
+
+    profile = contact.get_support_profile(corners)
+    assert profile.bounding_box == [1.0, 0.0, -1.0, 3.0, 2.0, 1.0]
+    assert profile.bottom == [2.0, 0.0, 0.0]
+    assert profile.top == [2.0, 2.0, 0.0]
+    assert profile.vertex_count == 8
+
+
+@pytest.mark.parametrize('count', [5, 500])
+def test_numpy_and_python_profiles_agree(monkeypatch, count):
+    """The numpy and pure Python paths find the same support points."""
+    pytest.importorskip('numpy')
+    points = make_points(count)
+    with_numpy = contact.get_support_profile(points)
+
+    monkeypatch.setattr(lazy, 'get_numpy', lambda: None)
+    without_numpy = contact.get_support_profile(points)
+
+    assert with_numpy.bounding_box == without_numpy.bounding_box
+    for name in ('bottom', 'top'):
+        assert getattr(with_numpy, name) == \
+            pytest.approx(getattr(without_numpy, name), abs=1e-12)
+
+
+def test_no_points_has_no_profile():
+    """Parts without vertices have no support profile."""
+    assert contact.get_support_profile([]) is None
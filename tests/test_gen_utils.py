@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Tests reading and writing layout files and caching parsed layouts.
+
+:applications:
+    Standalone Python
+
+:see_also:
+    gen_utils.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+import math
+import os
+import pickle
+
+import pytest
+
+# Imports That You Wrote
+from td_maya_tools import gen_utils
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+
+def make_layout(count=50):
+    """
+    :return: A layout of stacks that set every axis, and one that only sets ty
+    :type: gen_utils.StackLayout
+    """
+    layout = gen_utils.StackLayout()
+    for index in range(1, count + 1):
+        layout.add('stack%03d' % index, tx=index * 1.5, ty=0.0, tz=-index / 3.0)
+    layout.add('lifted', ty=2.25)
+    return layout
+
+
+def assert_same_layout(layout, expected):
+    """
+    Checks two layouts hold the same stacks, in the same order, with the same axes set.
+    """
+    assert list(layout.items()) == list(expected.items())
+
+
+@pytest.mark.parametrize('file_name', ['layout.xml', 'layout.xml.gz'])
+def test_xml_round_trip(tmpdir, file_name):
+    """Layouts read back from XML, plain or gzipped, exactly as written."""
+    xml_path = str(tmpdir.join(file_name))
+    gen_utils.write_stack_xml(make_layout(), xml_path)
+
+    assert_same_layout(gen_utils.read_stack_xml(xml_path), make_layout())
+    with open(xml_path, 'rb') as xml_fh:
+        is_gzip = xml_fh.read(2) == gen_utils.GZIP_MAGIC
+    assert is_gzip == file_name.endswith('.gz')
+
+
+def test_streamed_xml_matches_read(tmpdir):
+    """Streaming the stacks out of a file gives the same stacks as reading it."""
+    xml_path = str(tmpdir.join('layout.xml'))
+    gen_utils.write_stack_xml(make_layout(), xml_path)
+
+    streamed = list(gen_utils.iter_stack_xml(xml_path, chunk_size=64))
+    assert streamed == list(make_layout().items())
+
+
+def test_binary_round_trip(tmpdir):
+    """Binary layouts map back in with the same stacks, and convert to XML."""
+    binary_path = str(tmpdir.join('layout.stkl'))
+    gen_utils.write_stack_binary(make_layout(), binary_path)
+    assert gen_utils.is_stack_binary(binary_path)
+
+    mapped = gen_utils.read_stack_binary(binary_path)
+    assert_same_layout(mapped, make_layout())
+    assert math.isnan(mapped.translation('lifted')[0])
+
+    xml_path = str(tmpdir.join('layout.xml'))
+    gen_utils.binary_to_xml(binary_path, xml_path)
+    assert_same_layout(gen_utils.read_stack_layout(xml_path), make_layout())
+    mapped.close()
+
+
+def test_binary_copy_and_close_release_the_file(tmpdir):
+    """A copied or closed binary layout no longer holds its file open."""
+    binary_path = str(tmpdir.join('layout.stkl'))
+    gen_utils.write_stack_binary(make_layout(), binary_path)
+
+    copied = gen_utils.read_stack_binary(binary_path, copy=True)
+    mapped = gen_utils.read_stack_binary(binary_path)
+    mapped.close()
+    os.remove(binary_path)
+
+    assert_same_layout(copied, make_layout())
+    assert_same_layout(mapped, make_layout())
+    mapped.add('stack001', tx=0.0)
+    assert mapped.translation('stack001')[0] == 0.0
+
+
+@pytest.mark.parametrize('copy', [True, False])
+@pytest.mark.parametrize('cut', [8, 1300])
+def test_truncated_binary_raises(tmpdir, copy, cut):
+    """A binary file cut short in its columns or names raises, mapped or copied."""
+    binary_path = str(tmpdir.join('layout.stkl'))
+    gen_utils.write_stack_binary(make_layout(), binary_path)
+    with open(binary_path, 'rb') as binary_fh:
+        data = binary_fh.read()
+    with open(binary_path, 'wb') as binary_fh:
+        binary_fh.write(data[:-cut])
+
+    with pytest.raises(ValueError) as error:
+        gen_utils.read_stack_binary(binary_path, copy=copy)
+    assert 'cut short' in str(error.value)
+
+
+def test_layouts_pickle(tmpdir):
+    """Layouts, mapped ones included, survive being pickled."""
+    binary_path = str(tmpdir.join('layout.stkl'))
+    gen_utils.write_stack_binary(make_layout(), binary_path)
+    mapped = gen_utils.read_stack_binary(binary_path)
+
+    for layout in (make_layout(), mapped):
+        assert_same_layout(pickle.loads(pickle.dumps(layout, 2)), make_layout())
+    mapped.close()
+
+
+def test_layout_cache_hits_until_file_changes(tmpdir):
+    """The cache hands back the parsed layout until the file is changed."""
+    xml_path = str(tmpdir.join('layout.xml'))
+    gen_utils.write_stack_xml(make_layout(5), xml_path)
+    cache = gen_utils.LayoutCache()
+
+    first = cache.load(xml_path)
+    assert cache.load(xml_path) is first
+    assert cache.stats()['hits'] == 1
+
+    gen_utils.write_stack_xml(make_layout(8), xml_path)
+    changed = cache.load(xml_path)
+    assert changed is not first
+    assert len(changed) == 9
+    assert cache.stats()['misses'] == 2
+
+
+def test_layout_cache_evicts_least_recently_used(tmpdir):
+    """The cache holds at most max_entries layouts, dropping the oldest first."""
+    cache = gen_utils.LayoutCache(max_entries=2)
+    paths = []
+    for index in range(3):
+        paths.append(str(tmpdir.join('layout%d.xml' % index)))
+        gen_utils.write_stack_xml(make_layout(index + 1), paths[-1])
+        cache.load(paths[-1])
+
+    assert cache.stats()['evictions'] == 1
+    cache.load(paths[0])
+    assert cache.stats()['misses'] == 4
+
+
+def test_layout_cache_dir_is_read_by_new_caches(tmpdir):
+    """Layouts parsed once are read from the cache directory by later caches."""
+    xml_path = str(tmpdir.join('layout.xml'))
+    gen_utils.write_stack_xml(make_layout(), xml_path)
+    cache_dir = str(tmpdir.join('cache'))
+
+    gen_utils.LayoutCache(cache_dir=cache_dir).load(xml_path)
+    later = gen_utils.LayoutCache(cache_dir=cache_dir)
+    assert_same_layout(later.load(xml_path), make_layout())
+    assert later.stats()['disk_hits'] == 1
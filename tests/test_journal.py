@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Tests recording builds in a journal and replaying them.
+
+:applications:
+    Standalone Python
+
+:see_also:
+    journal.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+import pytest
+
+# Imports That You Wrote
+from td_maya_tools import builder
+from td_maya_tools import journal
+from td_maya_tools import scene
+from tests import scenes
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+
+def build_with_journal(journal_path, chunk_size=None, **kwargs):
+    """
+    :return: The backend a journaled build was made in and its stacks
+    :type: tuple (scene.MemoryBackend, list of tuples)
+    """
+    memory = scene.MemoryBackend()
+    top, mid, base = scenes.make_parts(memory)
+    with scene.use_backend(memory):
+        build = builder.StackBuild(top, mid, base, 30, 4, 0.2, seed=9,
+                                   journal=journal.BuildJournal(journal_path), **kwargs)
+        while not build.is_finished():
+            build.step(chunk_size or build.stack_count)
+    return memory, build.stacks
+
+
+def replay(journal_path):
+    """
+    :return: The backend a journal was replayed into, with the same parts as the
+    build, and the replayed stacks
+    :type: tuple (scene.MemoryBackend, list of tuples)
+    """
+    memory = scene.MemoryBackend()
+    scenes.make_parts(memory)
+    with scene.use_backend(memory):
+        return memory, journal.replay_journal(journal_path)
+
+
+@pytest.mark.parametrize('settings', [
+    {},
+    {'layout_mode': 'grid'},
+    {'layout_mode': 'scatter', 'instance': True},
+    {'instance': True, 'duplicate_parts': ['mid1'], 'chunk_size': 7},
+    {'contact_stacking': True, 'chunk_size': 11}])
+def test_replay_reproduces_build(tmpdir, settings):
+    """Replaying a journal makes the same scene as the build that wrote it."""
+    journal_path = str(tmpdir.join('build.jsonl'))
+    settings = dict(settings)
+    chunk_size = settings.pop('chunk_size', None)
+    built, stacks = build_with_journal(journal_path, chunk_size, **settings)
+    replayed, replayed_stacks = replay(journal_path)
+
+    assert scenes.snapshot(replayed, replayed_stacks) == scenes.snapshot(built, stacks)
+    assert sorted(replayed.ls()) == sorted(built.ls())
+
+
+def test_replay_of_template_build_places_parts_the_same(tmpdir):
+    """A build that used templates replays with every part in the same place."""
+    journal_path = str(tmpdir.join('build.jsonl'))
+    built, stacks = build_with_journal(journal_path, use_templates=True)
+    replayed, replayed_stacks = replay(journal_path)
+
+    assert scenes.snapshot(replayed, replayed_stacks, names=False) == \
+        scenes.snapshot(built, stacks, names=False)
+
+
+def test_rolled_back_builds_replay_nothing(tmpdir, backend, parts):
+    """A rolled back build is kept in the journal with none of its stacks."""
+    journal_path = str(tmpdir.join('build.jsonl'))
+    build_journal = journal.BuildJournal(journal_path)
+    build = builder.StackBuild(parts[0], parts[1], parts[2], 20, 3, 0.1, seed=1,
+                               journal=build_journal)
+    build.step(10)
+    build.rollback()
+    builder.build_stacks(parts[0], parts[1], parts[2], 5, 3, 0.1, seed=2,
+                         journal=build_journal)
+
+    builds = journal.read_journal(journal_path)
+    assert [len(journal_build.stacks) for journal_build in builds] == [0, 5]
+    assert not builds[0].is_complete()
+    assert builds[1].is_complete()
+
+
+def test_truncated_last_line_is_skipped(tmpdir, backend, parts):
+    """A journal cut short by a crash still reads every finished record."""
+    journal_path = str(tmpdir.join('build.jsonl'))
+    builder.build_stacks(parts[0], parts[1], parts[2], 5, 3, 0.1, seed=2,
+                         journal=journal.BuildJournal(journal_path))
+    with open(journal_path, 'a') as journal_fh:
+        journal_fh.write('{"type":"stacks","names":["stack0')
+
+    builds = journal.read_journal(journal_path)
+    assert len(builds) == 1 and len(builds[0].stacks) == 5
+
+
+def test_builds_appended_after_a_truncated_line_are_kept(tmpdir, backend, parts):
+    """A line cut short by a crash is dropped so later records start their own line."""
+    journal_path = str(tmpdir.join('build.jsonl'))
+    builder.build_stacks(parts[0], parts[1], parts[2], 5, 3, 0.1, seed=2,
+                         journal=journal.BuildJournal(journal_path))
+    with open(journal_path, 'a') as journal_fh:
+        journal_fh.write('{"type":"stacks","names":["stack0')
+
+    builder.build_stacks(parts[0], parts[1], parts[2], 4, 3, 0.1, seed=3,
+                         journal=journal.BuildJournal(journal_path))
+    builds = journal.read_journal(journal_path)
+    assert [len(journal_build.stacks) for journal_build in builds] == [5, 4]
+    assert all(journal_build.is_complete() for journal_build in builds)
+
+
+def test_whole_last_record_without_newline_is_kept(tmpdir):
+    """A last record that only lost its newline is kept when the journal is added to."""
+    journal_path = str(tmpdir.join('build.jsonl'))
+    with open(journal_path, 'w') as journal_fh:
+        journal_fh.write('{"type":"rollback"}\n{"type":"rollback"}')
+
+    journal.end_last_line(journal_path)
+    with open(journal_path) as journal_fh:
+        assert journal_fh.read() == '{"type":"rollback"}\n{"type":"rollback"}\n'
+
+
+def test_bad_line_in_the_middle_raises(tmpdir):
+    """Only the last line of a journal may be unreadable."""
+    journal_path = str(tmpdir.join('build.jsonl'))
+    with open(journal_path, 'w') as journal_fh:
+        journal_fh.write('not json\n{"type":"rollback"}\n')
+
+    with pytest.raises(ValueError):
+        journal.read_journal(journal_path)
+
+
+def test_replay_raises_for_missing_parts(tmpdir):
+    """Replaying into a scene without the source parts makes nothing."""
+    journal_path = str(tmpdir.join('build.jsonl'))
+    build_with_journal(journal_path)
+
+    empty = scene.MemoryBackend()
+    with pytest.raises(ValueError):
+        journal.replay_journal(journal_path, empty)
+    assert empty.ls() == []
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Tests exporting layouts from the scene, applying them and merging layout files.
+
+:applications:
+    Standalone Python
+
+:see_also:
+    layout.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+import pytest
+
+# Imports That You Wrote
+from td_maya_tools import builder
+from td_maya_tools import gen_utils
+from td_maya_tools import layout
+from td_maya_tools import lazy
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+
+@pytest.fixture
+def groups(backend, parts):
+    """
+    :return: The stack groups of a small build in the test's backend
+    :type: list of strings
+    """
+    stacks = builder.build_stacks(parts[0], parts[1], parts[2], 12, 3, 0.2, seed=5)
+    return [group for group, transforms in stacks]
+
+
+def test_export_then_apply_moves_stacks_back(tmpdir, backend, groups):
+    """Applying an exported layout puts moved stacks back and leaves the rest."""
+    xml_path = str(tmpdir.join('layout.xml'))
+    assert layout.export_layout(xml_path) == len(groups)
+    before = backend.translations(groups)
+
+    backend.move(groups[0], [50.0, 0.0, 0.0])
+    backend.move(groups[3], [None, 4.0, None])
+    report = layout.apply_layout(gen_utils.read_stack_layout(xml_path))
+
+    assert (report.moved, report.unchanged, report.missing) == (2, len(groups) - 2, [])
+    assert backend.translations(groups) == before
+    assert layout.apply_layout(gen_utils.read_stack_layout(xml_path)).moved == 0
+
+
+def test_apply_reports_missing_stacks(backend, groups):
+    """Stacks in the layout that aren't in the scene are reported, not moved."""
+    stacks = gen_utils.StackLayout()
+    stacks.add(groups[0], tx=1.0)
+    stacks.add('stack9999', tx=1.0)
+
+    report = layout.apply_layout(stacks)
+    assert report.moved == 1
+    assert report.missing == ['stack9999']
+
+
+def test_unset_axes_are_left_alone(backend, groups):
+    """Axes the layout doesn't set keep their current value."""
+    before = backend.translations([groups[1]])[0]
+    stacks = gen_utils.StackLayout()
+    stacks.add(groups[1], ty=before[1] + 2.0)
+
+    layout.apply_layout(stacks)
+    assert backend.translations([groups[1]])[0] == [before[0], before[1] + 2.0,
+                                                    before[2]]
+
+
+def test_numpy_and_python_find_the_same_changes(monkeypatch):
+    """The numpy and pure Python comparisons find the same stacks out of place."""
+    numpy = pytest.importorskip('numpy')
+    stacks = gen_utils.StackLayout()
+    current = []
+    for index in range(200):
+        stacks.add('stack%d' % index, tx=float(index % 7), tz=index * 0.5)
+        offset = 1e-3 if index % 3 == 0 else 1e-9
+        current.append(None if index % 11 == 0
+                       else [index % 7 + offset, 2.0, index * 0.5])
+
+    with_numpy = layout._find_changes_numpy(numpy, stacks, current,
+                                            layout.DEFAULT_TOLERANCE)
+    monkeypatch.setattr(lazy, 'get_numpy', lambda: None)
+    assert layout.find_changes(stacks, current) == with_numpy
+    assert with_numpy
+
+
+def write_layout(path, **stacks):
+    """
+    Writes a layout file placing each stack at a tx.
+    """
+    stack_layout = gen_utils.StackLayout()
+    for name in sorted(stacks):
+        stack_layout.add(name, tx=stacks[name])
+    gen_utils.write_stack_xml(stack_layout, path)
+    return path
+
+
+@pytest.mark.parametrize('conflict, expected_tx', [('last', 2.0), ('first', 1.0)])
+def test_conflicting_files_are_settled_by_policy(tmpdir, backend, groups, conflict,
+                                                  expected_tx):
+    """A stack placed differently by two files takes the tx the policy picks."""
+    first = write_layout(str(tmpdir.join('a.xml')), **{groups[0]: 1.0, groups[1]: 3.0})
+    second = write_layout(str(tmpdir.join('b.xml')), **{groups[0]: 2.0, groups[1]: 3.0})
+
+    report = layout.apply_layout_files(str(tmpdir), conflict=conflict, workers=2)
+    assert report.conflicts == [(groups[0], first, second)]
+    assert report.stack_count == 2
+    assert backend.translations([groups[0]])[0][0] == expected_tx
+
+
+def test_error_policy_applies_nothing(tmpdir, backend, groups):
+    """With the 'error' policy a conflict stops every file from being applied."""
+    write_layout(str(tmpdir.join('a.xml')), **{groups[0]: 1.0, groups[1]: 3.0})
+    write_layout(str(tmpdir.join('b.xml')), **{groups[0]: 2.0})
+    before = backend.translations(groups)
+
+    report = layout.apply_layout_files(str(tmpdir), conflict='error', workers=1)
+    assert report.applied is None
+    assert backend.translations(groups) == before
+
+
+def test_bad_files_are_reported_and_others_applied(tmpdir, backend, groups):
+    """A file that can't be read is reported and the others still apply."""
+    write_layout(str(tmpdir.join('a.xml')), **{groups[0]: 6.0})
+    tmpdir.join('b.xml').write('<stacks><stack name=')
+
+    report = layout.apply_layout_files(str(tmpdir), workers=2)
+    assert [layout_file.path for layout_file in report.failed()] == \
+        [str(tmpdir.join('b.xml'))]
+    assert report.applied.moved == 1
+    assert backend.translations([groups[0]])[0][0] == 6.0
+
+
+def test_unknown_conflict_policy_raises(tmpdir):
+    """Conflict policies that don't exist are refused before any file is read."""
+    with pytest.raises(ValueError):
+        layout.apply_layout_files(str(tmpdir), conflict='newest')
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Tests picking the parts of each stack from a seed.
+
+:applications:
+    Standalone Python
+
+:see_also:
+    recipes.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+import pytest
+
+# Imports That You Wrote
+from td_maya_tools import lazy
+from td_maya_tools import recipes
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+
+def all_recipes(batch):
+    """
+    :return: The recipe of every stack in a batch
+    :type: list of tuples
+    """
+    return [batch.recipe(index) for index in range(len(batch))]
+
+
+def test_recipes_stay_in_their_pools():
+    """Every pick is inside its pool and each stack has 1 to max_height middles."""
+    for base, mids, top in all_recipes(recipes.sample_recipes(3, 5, 2, 500, 4, 11)):
+        assert 0 <= base < 2
+        assert 0 <= top < 3
+        assert 1 <= len(mids) <= 4
+        assert all(0 <= mid < 5 for mid in mids)
+
+
+def test_pieces_match_sampling_all_at_once():
+    """Sampling a build in pieces with start gives the same stacks as in one go."""
+    whole = all_recipes(recipes.sample_recipes(3, 5, 2, 100, 4, 11))
+    pieces = []
+    for start in range(0, 100, 30):
+        count = min(30, 100 - start)
+        pieces.extend(all_recipes(recipes.sample_recipes(3, 5, 2, count, 4, 11,
+                                                         start=start)))
+    assert pieces == whole
+
+
+def test_seeds_pick_different_stacks():
+    """Different seeds don't pick the same parts."""
+    assert all_recipes(recipes.sample_recipes(3, 5, 2, 50, 4, 1)) != \
+        all_recipes(recipes.sample_recipes(3, 5, 2, 50, 4, 2))
+
+
+def test_numpy_and_python_pick_the_same_parts(monkeypatch):
+    """Recipes are the same with or without numpy."""
+    pytest.importorskip('numpy')
+    seed = recipes.MAX_SEED - 3
+    with_numpy = all_recipes(recipes.sample_recipes(7, 9, 4, 300, 6, seed, start=17))
+
+    monkeypatch.setattr(lazy, 'get_numpy', lambda: None)
+    assert all_recipes(recipes.sample_recipes(7, 9, 4, 300, 6, seed, start=17)) == \
+        with_numpy
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+#SETMODE 777
+
+#----------------------------------------------------------------------------------------#
+#------------------------------------------------------------------------------ HEADER --#
+
+"""
+:author:
+    asy160030
+    bkp170130
+    bmc180001
+
+:synopsis:
+    Tests the memory scene backend and the wrappers that batch and count scene calls.
+
+:applications:
+    Standalone Python
+
+:see_also:
+    scene.py
+"""
+
+#----------------------------------------------------------------------------------------#
+#----------------------------------------------------------------------------- IMPORTS --#
+
+# Default Python Imports
+import pytest
+
+# Imports That You Wrote
+from td_maya_tools import scene
+
+#----------------------------------------------------------------------------------------#
+#--------------------------------------------------------------------------- FUNCTIONS --#
+
+
+def test_parenting_keeps_world_position(backend):
+    """Parts keep their world bounds when put in a group that has been moved."""
+    part = backend.create_part('part', [0.0, 0.0, 0.0, 1.0, 1.0, 1.0], [2.0, 3.0, 4.0])
+    group = backend.group('group')
+    backend.move(group, [10.0, 0.0, 0.0])
+
+    backend.parent(part, group)
+    assert backend.translation(part) == [-8.0, 3.0, 4.0]
+    assert backend.bounding_box(part) == [2.0, 3.0, 4.0, 3.0, 4.0, 5.0]
+    assert backend.bounding_box(group) == [2.0, 3.0, 4.0, 3.0, 4.0, 5.0]
+
+
+def test_duplicates_get_unique_names(backend):
+    """Copies of a node are named like Maya names them, never reusing a name."""
+    part = backend.create_part('part', [0.0, 0.0, 0.0, 1.0, 1.0, 1.0])
+    copies = backend.duplicate([part, part])
+    assert len(set(copies + [part])) == 3
+    assert all(backend.obj_exists(name) for name in copies)
+
+
+def test_instances_share_their_shape(backend):
+    """An instance adds a transform node but no shape node."""
+    part = backend.create_part('part', [0.0, 0.0, 0.0, 1.0, 1.0, 1.0])
+    before = backend.node_count()
+    backend.instance(part)
+    assert backend.node_count() == before + 1
+
+
+@pytest.mark.parametrize('bad_value', [float('nan'), float('inf'), float('-inf')])
+def test_set_translations_rejects_values_that_are_not_finite(backend, bad_value):
+    """Non finite translations raise before any node is moved."""
+    first = backend.create_part('first', [0.0, 0.0, 0.0, 1.0, 1.0, 1.0])
+    second = backend.create_part('second', [0.0, 0.0, 0.0, 1.0, 1.0, 1.0])
+
+    with pytest.raises(ValueError) as error:
+        backend.set_translations([first, second],
+                                 [[1.0, 2.0, 3.0], [0.0, bad_value, 0.0]])
+    assert second in str(error.value)
+    assert backend.translations([first, second]) == [[0.0, 0.0, 0.0],
+                                                     [0.0, 0.0, 0.0]]
+
+
+def test_deleted_nodes_read_as_missing(backend):
+    """Translations of nodes that don't exist come back as None."""
+    part = backend.create_part('part', [0.0, 0.0, 0.0, 1.0, 1.0, 1.0])
+    backend.delete(part)
+    assert backend.translations([part]) == [None]
+    assert backend.objs_exist([part]) == [False]
+
+
+def test_deleting_a_group_with_its_children(backend):
+    """A group and its children can be deleted in one call, in either order."""
+    for order in (1, -1):
+        part = backend.create_part('part', [0.0, 0.0, 0.0, 1.0, 1.0, 1.0])
+        group = backend.group('group')
+        backend.parent(part, group)
+
+        backend.delete([group, part][::order])
+        assert backend.objs_exist([group, part]) == [False, False]
+
+
+def test_batch_parents_once_per_parent(backend):
+    """A batch makes one parent call per group, when its block ends."""
+    counting = scene.CountingBackend(backend)
+    parts = [backend.create_part('part', [0.0, 0.0, 0.0, 1.0, 1.0, 1.0])
+             for index in range(4)]
+
+    with scene.SceneBatch(counting) as batch:
+        group = batch.group('group')
+        for part in parts:
+            batch.parent(part, group)
+        assert counting.counts.get('parent', 0) == 0
+
+    assert counting.counts['parent'] == 1
+    assert backend.parent_of(parts[-1]) == group
+
+
+def test_counting_backend_leaves_out_undo_chunks(backend):
+    """Undo chunks are counted on their own and not as scene calls."""
+    counting = scene.CountingBackend(backend)
+    with counting.undo_chunk('test'):
+        counting.ls()
+
+    assert counting.counts == {'ls': 1}
+    assert counting.total() == 1
+    assert counting.undo_chunks == 1
+
+    counting.reset()
+    assert (counting.total(), counting.undo_chunks) == (0, 0)